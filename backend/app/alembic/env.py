@@ -12,6 +12,7 @@ from app.core.database import Base
 import app.models.user  # importa todos os models
 import app.models.sensors
 import app.models.sensor_reading
+import app.models.sensor_reading_rollup
 
 config = context.config
 
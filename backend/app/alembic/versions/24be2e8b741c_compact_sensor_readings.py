@@ -0,0 +1,239 @@
+"""compact sensor_readings: (sensor_id, timestamp) key, real, timestamptz
+
+Revision ID: 24be2e8b741c
+Revises: 8d9645fc10d7
+Create Date: 2026-02-03 09:12:37.664205
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '24be2e8b741c'
+down_revision = '8d9645fc10d7'
+branch_labels = None
+depends_on = None
+
+
+# Mesmas funções da d99be77b505b, parametrizadas pelo tipo da coluna.
+# Com timestamptz os limites das partições são meia-noite UTC explícita,
+# independente do TimeZone da sessão que cria a partição.
+def _create_partition_function(ts_type, to_ts):
+    return f"""
+CREATE OR REPLACE FUNCTION sensor_readings_create_partition(month_start date)
+RETURNS text AS $$
+DECLARE
+    start_ts {ts_type} := {to_ts.format("date_trunc('month', month_start::timestamp)")};
+    end_ts {ts_type} := {to_ts.format("date_trunc('month', month_start::timestamp) + interval '1 month'")};
+    part_name text := 'sensor_readings_' || to_char(month_start, 'YYYY_MM');
+BEGIN
+    IF to_regclass(part_name) IS NOT NULL THEN
+        RETURN part_name;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM sensor_readings_default
+        WHERE "timestamp" >= start_ts AND "timestamp" < end_ts
+    ) THEN
+        EXECUTE format(
+            'CREATE TABLE %I (LIKE sensor_readings INCLUDING DEFAULTS)',
+            part_name
+        );
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM sensor_readings_default '
+            'WHERE "timestamp" >= %L AND "timestamp" < %L RETURNING *) '
+            'INSERT INTO %I SELECT * FROM moved',
+            start_ts, end_ts, part_name
+        );
+        EXECUTE format(
+            'ALTER TABLE sensor_readings ATTACH PARTITION %I '
+            'FOR VALUES FROM (%L) TO (%L)',
+            part_name, start_ts, end_ts
+        );
+    ELSE
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF sensor_readings '
+            'FOR VALUES FROM (%L) TO (%L)',
+            part_name, start_ts, end_ts
+        );
+    END IF;
+
+    RETURN part_name;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def _drop_partitions_function(ts_type, to_ts):
+    return f"""
+CREATE OR REPLACE FUNCTION sensor_readings_drop_partitions(older_than {ts_type})
+RETURNS SETOF text AS $$
+DECLARE
+    part_name text;
+BEGIN
+    FOR part_name IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'sensor_readings'::regclass
+          AND c.relname ~ '^sensor_readings_[0-9]{{4}}_[0-9]{{2}}$'
+          AND {to_ts.format("to_date(substr(c.relname, 17), 'YYYY_MM') + interval '1 month'")}
+              <= older_than
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('DROP TABLE %I', part_name);
+        RETURN NEXT part_name;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+NAIVE = ("timestamp", "{}")
+UTC = ("timestamptz", "({}) AT TIME ZONE 'UTC'")
+
+# Renomeia a tabela, as partições e os índices atuais com sufixo _old,
+# liberando os nomes para a tabela nova
+RENAME_TO_OLD = """
+DO $$
+DECLARE
+    r record;
+BEGIN
+    FOR r IN
+        WITH tables AS (
+            SELECT 'sensor_readings'::regclass::oid AS oid
+            UNION ALL
+            SELECT inhrelid FROM pg_inherits
+            WHERE inhparent = 'sensor_readings'::regclass
+        )
+        SELECT c.relname, c.relkind
+        FROM pg_class c
+        WHERE c.oid IN (SELECT oid FROM tables)
+           OR c.oid IN (SELECT indexrelid FROM pg_index
+                        WHERE indrelid IN (SELECT oid FROM tables))
+        ORDER BY c.relkind
+    LOOP
+        IF r.relkind IN ('i', 'I') THEN
+            EXECUTE format('ALTER INDEX %I RENAME TO %I', r.relname, left(r.relname, 59) || '_old');
+        ELSE
+            EXECUTE format('ALTER TABLE %I RENAME TO %I', r.relname, left(r.relname, 59) || '_old');
+        END IF;
+    END LOOP;
+END;
+$$;
+"""
+
+# Partições do primeiro mês com dados até 3 meses à frente
+CREATE_PARTITIONS = """
+SELECT sensor_readings_create_partition(month::date)
+FROM generate_series(
+    date_trunc('month', LEAST(
+        (SELECT min("timestamp") FROM sensor_readings_old){cast},
+        now() AT TIME ZONE 'utc'
+    )),
+    date_trunc('month', now() AT TIME ZONE 'utc') + interval '3 months',
+    interval '1 month'
+) AS month
+"""
+
+
+def _default_partition():
+    op.execute(
+        'CREATE TABLE sensor_readings_default '
+        'PARTITION OF sensor_readings DEFAULT'
+    )
+
+
+def _rollup_bucket_type(type_, using):
+    for table in ('sensor_readings_hourly', 'sensor_readings_daily'):
+        op.alter_column(
+            table, 'bucket',
+            type_=type_,
+            postgresql_using=using,
+            existing_nullable=False
+        )
+
+
+def upgrade():
+    # A PK nova (sensor_id, timestamp) substitui o índice de cobertura
+    op.drop_index('ix_sensor_readings_sensor_id_timestamp', table_name='sensor_readings')
+    op.execute(RENAME_TO_OLD)
+
+    # Ordem das colunas sem padding: uuid, timestamptz, 4 x real, bigint
+    op.create_table('sensor_readings',
+    sa.Column('sensor_id', sa.UUID(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('energy_kwh', sa.REAL(), nullable=True),
+    sa.Column('current_a', sa.REAL(), nullable=True),
+    sa.Column('voltage_v', sa.REAL(), nullable=True),
+    sa.Column('power_w', sa.REAL(), nullable=True),
+    sa.Column('seq', sa.BigInteger(), nullable=True),
+    sa.ForeignKeyConstraint(['sensor_id'], ['sensors.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('sensor_id', 'timestamp'),
+    postgresql_partition_by='RANGE ("timestamp")'
+    )
+    _default_partition()
+
+    op.execute('DROP FUNCTION IF EXISTS sensor_readings_drop_partitions(timestamp)')
+    op.execute(_create_partition_function(*UTC))
+    op.execute(_drop_partitions_function(*UTC))
+    op.execute(CREATE_PARTITIONS.format(cast=""))
+
+    # Cópia em ordem da PK: índice compacto, sem page splits aleatórios
+    op.execute("""
+        INSERT INTO sensor_readings
+            (sensor_id, "timestamp", energy_kwh, current_a, voltage_v, power_w, seq)
+        SELECT sensor_id, "timestamp" AT TIME ZONE 'UTC',
+               energy_kwh, current_a, voltage_v, power_w, seq
+        FROM sensor_readings_old
+        ORDER BY sensor_id, "timestamp"
+    """)
+    op.execute('DROP TABLE sensor_readings_old CASCADE')
+
+    _rollup_bucket_type(sa.DateTime(timezone=True), "bucket AT TIME ZONE 'UTC'")
+
+
+def downgrade():
+    _rollup_bucket_type(sa.DateTime(), "bucket AT TIME ZONE 'UTC'")
+
+    op.execute(RENAME_TO_OLD)
+
+    op.create_table('sensor_readings',
+    sa.Column('id', sa.UUID(), server_default=sa.text('gen_random_uuid()'), nullable=False),
+    sa.Column('sensor_id', sa.UUID(), nullable=False),
+    sa.Column('energy_kwh', sa.Float(), nullable=True),
+    sa.Column('current_a', sa.Float(), nullable=True),
+    sa.Column('voltage_v', sa.Float(), nullable=True),
+    sa.Column('power_w', sa.Float(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('seq', sa.BigInteger(), nullable=True),
+    sa.ForeignKeyConstraint(['sensor_id'], ['sensors.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', 'timestamp'),
+    postgresql_partition_by='RANGE ("timestamp")'
+    )
+    _default_partition()
+
+    op.execute('DROP FUNCTION IF EXISTS sensor_readings_drop_partitions(timestamptz)')
+    op.execute(_create_partition_function(*NAIVE))
+    op.execute(_drop_partitions_function(*NAIVE))
+    op.execute(CREATE_PARTITIONS.format(cast=" AT TIME ZONE 'UTC'"))
+
+    op.create_index(
+        'ix_sensor_readings_sensor_id_timestamp',
+        'sensor_readings',
+        ['sensor_id', sa.text('"timestamp" DESC')],
+        unique=True,
+        postgresql_include=['energy_kwh', 'power_w', 'voltage_v', 'current_a']
+    )
+
+    op.execute("""
+        INSERT INTO sensor_readings
+            (sensor_id, energy_kwh, current_a, voltage_v, power_w, "timestamp", seq)
+        SELECT sensor_id, energy_kwh, current_a, voltage_v, power_w,
+               "timestamp" AT TIME ZONE 'UTC', seq
+        FROM sensor_readings_old
+    """)
+    op.execute('DROP TABLE sensor_readings_old CASCADE')
+    op.alter_column('sensor_readings', 'id', server_default=None)
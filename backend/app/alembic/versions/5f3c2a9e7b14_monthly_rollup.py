@@ -0,0 +1,59 @@
+"""monthly rollup of sensor_readings and index on sensors.user_id
+
+Revision ID: 5f3c2a9e7b14
+Revises: 24be2e8b741c
+Create Date: 2026-02-10 14:03:51.284617
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f3c2a9e7b14'
+down_revision = '24be2e8b741c'
+branch_labels = None
+depends_on = None
+
+
+# Meses existentes montados a partir da tabela diária
+BACKFILL_MONTHLY = """
+INSERT INTO sensor_readings_monthly (
+    sensor_id, bucket, sample_count,
+    energy_kwh_sum, energy_kwh_count,
+    power_w_sum, power_w_count, power_w_min, power_w_max
+)
+SELECT
+    sensor_id,
+    date_trunc('month', bucket, 'UTC'),
+    sum(sample_count),
+    sum(energy_kwh_sum), sum(energy_kwh_count),
+    sum(power_w_sum), sum(power_w_count), min(power_w_min), max(power_w_max)
+FROM sensor_readings_daily
+GROUP BY 1, 2
+"""
+
+
+def upgrade():
+    op.create_table('sensor_readings_monthly',
+    sa.Column('sensor_id', sa.UUID(), nullable=False),
+    sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('sample_count', sa.Integer(), nullable=False),
+    sa.Column('energy_kwh_sum', sa.Float(), nullable=False),
+    sa.Column('energy_kwh_count', sa.Integer(), nullable=False),
+    sa.Column('power_w_sum', sa.Float(), nullable=False),
+    sa.Column('power_w_count', sa.Integer(), nullable=False),
+    sa.Column('power_w_min', sa.Float(), nullable=True),
+    sa.Column('power_w_max', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['sensor_id'], ['sensors.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('sensor_id', 'bucket')
+    )
+    op.execute(BACKFILL_MONTHLY)
+
+    op.create_index(op.f('ix_sensors_user_id'), 'sensors', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_sensors_user_id'), table_name='sensors')
+    op.drop_table('sensor_readings_monthly')
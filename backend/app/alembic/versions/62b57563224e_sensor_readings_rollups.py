@@ -0,0 +1,44 @@
+"""hourly and daily rollups of sensor_readings
+
+Revision ID: 62b57563224e
+Revises: d99be77b505b
+Create Date: 2026-01-20 10:41:27.118934
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '62b57563224e'
+down_revision = 'd99be77b505b'
+branch_labels = None
+depends_on = None
+
+
+def _rollup_table(name):
+    op.create_table(name,
+    sa.Column('sensor_id', sa.UUID(), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('sample_count', sa.Integer(), nullable=False),
+    sa.Column('energy_kwh_sum', sa.Float(), nullable=False),
+    sa.Column('energy_kwh_count', sa.Integer(), nullable=False),
+    sa.Column('power_w_sum', sa.Float(), nullable=False),
+    sa.Column('power_w_count', sa.Integer(), nullable=False),
+    sa.Column('power_w_min', sa.Float(), nullable=True),
+    sa.Column('power_w_max', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['sensor_id'], ['sensors.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('sensor_id', 'bucket')
+    )
+
+
+def upgrade():
+    _rollup_table('sensor_readings_hourly')
+    _rollup_table('sensor_readings_daily')
+    # Dados existentes: python manage_rollups.py backfill INICIO FIM
+
+
+def downgrade():
+    op.drop_table('sensor_readings_daily')
+    op.drop_table('sensor_readings_hourly')
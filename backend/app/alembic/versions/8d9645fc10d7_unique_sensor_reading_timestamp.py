@@ -0,0 +1,132 @@
+"""device timestamps: seq column and unique (sensor_id, timestamp)
+
+Revision ID: 8d9645fc10d7
+Revises: 62b57563224e
+Create Date: 2026-01-27 16:22:48.530917
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d9645fc10d7'
+down_revision = '62b57563224e'
+branch_labels = None
+depends_on = None
+
+
+INDEX_NAME = 'ix_sensor_readings_sensor_id_timestamp'
+INDEX_INCLUDE = ['energy_kwh', 'power_w', 'voltage_v', 'current_a']
+
+# Agregados recalculados a partir das leituras cruas, só onde havia colisão
+RECOMPUTE_ROLLUPS = """
+DELETE FROM sensor_readings_hourly h
+USING reading_dup_hours d
+WHERE h.sensor_id = d.sensor_id AND h.bucket = d.bucket;
+
+INSERT INTO sensor_readings_hourly (
+    sensor_id, bucket, sample_count,
+    energy_kwh_sum, energy_kwh_count,
+    power_w_sum, power_w_count, power_w_min, power_w_max
+)
+SELECT
+    r.sensor_id,
+    date_trunc('hour', r."timestamp"),
+    count(*),
+    coalesce(sum(r.energy_kwh), 0), count(r.energy_kwh),
+    coalesce(sum(r.power_w), 0), count(r.power_w), min(r.power_w), max(r.power_w)
+FROM sensor_readings r
+JOIN reading_dup_hours d
+  ON d.sensor_id = r.sensor_id AND d.bucket = date_trunc('hour', r."timestamp")
+GROUP BY 1, 2;
+
+DELETE FROM sensor_readings_daily dd
+USING (SELECT DISTINCT sensor_id, date_trunc('day', bucket) AS bucket
+       FROM reading_dup_hours) d
+WHERE dd.sensor_id = d.sensor_id AND dd.bucket = d.bucket;
+
+INSERT INTO sensor_readings_daily (
+    sensor_id, bucket, sample_count,
+    energy_kwh_sum, energy_kwh_count,
+    power_w_sum, power_w_count, power_w_min, power_w_max
+)
+SELECT
+    h.sensor_id,
+    date_trunc('day', h.bucket),
+    sum(h.sample_count),
+    sum(h.energy_kwh_sum), sum(h.energy_kwh_count),
+    sum(h.power_w_sum), sum(h.power_w_count), min(h.power_w_min), max(h.power_w_max)
+FROM sensor_readings_hourly h
+JOIN (SELECT DISTINCT sensor_id, date_trunc('day', bucket) AS bucket
+      FROM reading_dup_hours) d
+  ON d.sensor_id = h.sensor_id AND d.bucket = date_trunc('day', h.bucket)
+GROUP BY 1, 2;
+"""
+
+
+def upgrade():
+    op.add_column('sensor_readings', sa.Column('seq', sa.BigInteger(), nullable=True))
+
+    op.execute("""
+        CREATE TEMP TABLE reading_dups ON COMMIT DROP AS
+        SELECT sensor_id, "timestamp"
+        FROM sensor_readings
+        GROUP BY 1, 2
+        HAVING count(*) > 1
+    """)
+    op.execute("""
+        CREATE TEMP TABLE reading_dup_hours ON COMMIT DROP AS
+        SELECT DISTINCT sensor_id, date_trunc('hour', "timestamp") AS bucket
+        FROM reading_dups
+    """)
+
+    # Reenvios: mesma amostra gravada mais de uma vez
+    op.execute("""
+        DELETE FROM sensor_readings r
+        USING sensor_readings k
+        WHERE r.sensor_id = k.sensor_id
+          AND r."timestamp" = k."timestamp"
+          AND r.id > k.id
+          AND r.energy_kwh IS NOT DISTINCT FROM k.energy_kwh
+          AND r.current_a IS NOT DISTINCT FROM k.current_a
+          AND r.voltage_v IS NOT DISTINCT FROM k.voltage_v
+          AND r.power_w IS NOT DISTINCT FROM k.power_w
+    """)
+
+    # Lotes antigos recebiam o mesmo horário do servidor para todos os itens:
+    # valores diferentes são amostras distintas, separadas por 1 µs
+    op.execute("""
+        UPDATE sensor_readings r
+        SET "timestamp" = r."timestamp" + (n.rn - 1) * interval '1 microsecond'
+        FROM (
+            SELECT s.id, s."timestamp",
+                   row_number() OVER (PARTITION BY s.sensor_id, s."timestamp" ORDER BY s.id) AS rn
+            FROM sensor_readings s
+            JOIN reading_dups d ON d.sensor_id = s.sensor_id AND d."timestamp" = s."timestamp"
+        ) n
+        WHERE r.id = n.id AND r."timestamp" = n."timestamp" AND n.rn > 1
+    """)
+
+    op.execute(RECOMPUTE_ROLLUPS)
+
+    op.drop_index(INDEX_NAME, table_name='sensor_readings')
+    op.create_index(
+        INDEX_NAME,
+        'sensor_readings',
+        ['sensor_id', sa.text('"timestamp" DESC')],
+        unique=True,
+        postgresql_include=INDEX_INCLUDE
+    )
+
+
+def downgrade():
+    op.drop_index(INDEX_NAME, table_name='sensor_readings')
+    op.create_index(
+        INDEX_NAME,
+        'sensor_readings',
+        ['sensor_id', sa.text('"timestamp" DESC')],
+        postgresql_include=INDEX_INCLUDE
+    )
+    op.drop_column('sensor_readings', 'seq')
@@ -0,0 +1,27 @@
+"""per-sensor sampling policy for the ingest rate limit
+
+Revision ID: a3c7e1f09b52
+Revises: 5f3c2a9e7b14
+Create Date: 2026-10-18 10:41:07.512903
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c7e1f09b52'
+down_revision = '5f3c2a9e7b14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('sensors', sa.Column('max_samples_per_s', sa.Float(), nullable=True))
+    op.add_column('sensors', sa.Column('sample_burst', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('sensors', 'sample_burst')
+    op.drop_column('sensors', 'max_samples_per_s')
@@ -0,0 +1,179 @@
+"""partition sensor_readings by month and index (sensor_id, timestamp)
+
+Revision ID: d99be77b505b
+Revises: 251066a47372
+Create Date: 2026-01-12 19:05:11.402318
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd99be77b505b'
+down_revision = '251066a47372'
+branch_labels = None
+depends_on = None
+
+
+# Cria (se ainda não existir) a partição mensal que contém month_start.
+# Linhas desse mês que tenham caído na partição DEFAULT são movidas para ela.
+CREATE_PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION sensor_readings_create_partition(month_start date)
+RETURNS text AS $$
+DECLARE
+    start_ts timestamp := date_trunc('month', month_start::timestamp);
+    end_ts timestamp := date_trunc('month', month_start::timestamp) + interval '1 month';
+    part_name text := 'sensor_readings_' || to_char(month_start, 'YYYY_MM');
+BEGIN
+    IF to_regclass(part_name) IS NOT NULL THEN
+        RETURN part_name;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM sensor_readings_default
+        WHERE "timestamp" >= start_ts AND "timestamp" < end_ts
+    ) THEN
+        EXECUTE format(
+            'CREATE TABLE %I (LIKE sensor_readings INCLUDING DEFAULTS)',
+            part_name
+        );
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM sensor_readings_default '
+            'WHERE "timestamp" >= %L AND "timestamp" < %L RETURNING *) '
+            'INSERT INTO %I SELECT * FROM moved',
+            start_ts, end_ts, part_name
+        );
+        EXECUTE format(
+            'ALTER TABLE sensor_readings ATTACH PARTITION %I '
+            'FOR VALUES FROM (%L) TO (%L)',
+            part_name, start_ts, end_ts
+        );
+    ELSE
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF sensor_readings '
+            'FOR VALUES FROM (%L) TO (%L)',
+            part_name, start_ts, end_ts
+        );
+    END IF;
+
+    RETURN part_name;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Remove as partições mensais que terminam antes de older_than (retenção).
+DROP_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION sensor_readings_drop_partitions(older_than timestamp)
+RETURNS SETOF text AS $$
+DECLARE
+    part_name text;
+BEGIN
+    FOR part_name IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'sensor_readings'::regclass
+          AND c.relname ~ '^sensor_readings_[0-9]{4}_[0-9]{2}$'
+          AND to_date(substr(c.relname, 17), 'YYYY_MM') + interval '1 month'
+              <= older_than
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('DROP TABLE %I', part_name);
+        RETURN NEXT part_name;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade():
+    op.execute('ALTER TABLE sensor_readings RENAME TO sensor_readings_old')
+    op.execute(
+        'ALTER TABLE sensor_readings_old '
+        'RENAME CONSTRAINT sensor_readings_pkey TO sensor_readings_old_pkey'
+    )
+    op.execute(
+        'UPDATE sensor_readings_old SET "timestamp" = now() AT TIME ZONE \'utc\' '
+        'WHERE "timestamp" IS NULL'
+    )
+
+    # A chave de partição precisa fazer parte da PK
+    op.create_table('sensor_readings',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('sensor_id', sa.UUID(), nullable=False),
+    sa.Column('energy_kwh', sa.Float(), nullable=True),
+    sa.Column('current_a', sa.Float(), nullable=True),
+    sa.Column('voltage_v', sa.Float(), nullable=True),
+    sa.Column('power_w', sa.Float(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['sensor_id'], ['sensors.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', 'timestamp'),
+    postgresql_partition_by='RANGE ("timestamp")'
+    )
+    op.execute(
+        'CREATE TABLE sensor_readings_default '
+        'PARTITION OF sensor_readings DEFAULT'
+    )
+
+    op.execute(CREATE_PARTITION_FUNCTION)
+    op.execute(DROP_PARTITIONS_FUNCTION)
+
+    # Partições do primeiro mês com dados até 3 meses à frente
+    op.execute("""
+        SELECT sensor_readings_create_partition(month::date)
+        FROM generate_series(
+            date_trunc('month', LEAST(
+                (SELECT min("timestamp") FROM sensor_readings_old),
+                now() AT TIME ZONE 'utc'
+            )),
+            date_trunc('month', now() AT TIME ZONE 'utc') + interval '3 months',
+            interval '1 month'
+        ) AS month
+    """)
+
+    op.create_index(
+        'ix_sensor_readings_sensor_id_timestamp',
+        'sensor_readings',
+        ['sensor_id', sa.text('"timestamp" DESC')],
+        postgresql_include=['energy_kwh', 'power_w', 'voltage_v', 'current_a']
+    )
+
+    op.execute("""
+        INSERT INTO sensor_readings
+            (id, sensor_id, energy_kwh, current_a, voltage_v, power_w, "timestamp")
+        SELECT id, sensor_id, energy_kwh, current_a, voltage_v, power_w, "timestamp"
+        FROM sensor_readings_old
+    """)
+    op.drop_table('sensor_readings_old')
+
+
+def downgrade():
+    op.execute('ALTER TABLE sensor_readings RENAME TO sensor_readings_partitioned')
+
+    op.create_table('sensor_readings',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('sensor_id', sa.UUID(), nullable=False),
+    sa.Column('energy_kwh', sa.Float(), nullable=True),
+    sa.Column('current_a', sa.Float(), nullable=True),
+    sa.Column('voltage_v', sa.Float(), nullable=True),
+    sa.Column('power_w', sa.Float(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['sensor_id'], ['sensors.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name='sensor_readings_pkey_unpartitioned')
+    )
+    op.execute("""
+        INSERT INTO sensor_readings
+            (id, sensor_id, energy_kwh, current_a, voltage_v, power_w, "timestamp")
+        SELECT id, sensor_id, energy_kwh, current_a, voltage_v, power_w, "timestamp"
+        FROM sensor_readings_partitioned
+    """)
+
+    op.execute('DROP TABLE sensor_readings_partitioned CASCADE')
+    op.execute('DROP FUNCTION IF EXISTS sensor_readings_drop_partitions(timestamp)')
+    op.execute('DROP FUNCTION IF EXISTS sensor_readings_create_partition(date)')
+    op.execute(
+        'ALTER TABLE sensor_readings RENAME CONSTRAINT '
+        'sensor_readings_pkey_unpartitioned TO sensor_readings_pkey'
+    )
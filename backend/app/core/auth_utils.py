@@ -1,20 +1,72 @@
-from fastapi import Depends, HTTPException, status
+from uuid import UUID
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.core.security import SECRET_KEY, ALGORITHM
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.models.user import User
+from app.models.sensors import Sensor
 
 # Define o esquema HTTP Bearer (token no header)
 bearer_scheme = HTTPBearer()
+optional_bearer_scheme = HTTPBearer(auto_error=False)
+
+# sub do token -> CurrentUser (por worker, vida curta)
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL
+)
+
+
+class CurrentUser:
+    # O que as rotas precisam saber do usuário autenticado, sem ir ao banco
+    __slots__ = ("id", "is_active", "sensor_ids")
+
+    def __init__(self, id: UUID, is_active: bool, sensor_ids: frozenset):
+        self.id = id
+        self.is_active = is_active
+        self.sensor_ids = sensor_ids
+
+
+def _current_user_query(user_id: UUID):
+    # Usuário e ids dos seus sensores numa única consulta
+    return (
+        select(User.id, User.is_active, Sensor.id)
+        .outerjoin(Sensor, Sensor.user_id == User.id)
+        .where(User.id == user_id)
+    )
+
+
+def _build_current_user(rows) -> CurrentUser | None:
+    if not rows:
+        return None
+
+    return CurrentUser(
+        id=rows[0][0],
+        is_active=rows[0][1] is not False,
+        sensor_ids=frozenset(row[2] for row in rows if row[2] is not None)
+    )
+
+
+def load_current_user(db: Session, user_id: UUID) -> CurrentUser | None:
+    return _build_current_user(db.execute(_current_user_query(user_id)).all())
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    db: Session = Depends(get_db)
-):
-    token = credentials.credentials
 
+async def load_current_user_async(db: AsyncSession, user_id: UUID) -> CurrentUser | None:
+    result = await db.execute(_current_user_query(user_id))
+    return _build_current_user(result.all())
+
+
+def invalidate_current_user(user_id):
+    principal_cache.invalidate(str(user_id))
+
+
+def _token_subject(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
@@ -22,12 +74,104 @@ def get_current_user(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Token inválido")
 
-    except JWTError:
+        UUID(user_id)
+
+    except (JWTError, ValueError):
         raise HTTPException(status_code=401, detail="Token inválido")
 
-    user = db.query(User).filter(User.id == user_id).first()
+    return user_id
+
 
+def _check_loaded_user(user_id: str, user: CurrentUser | None) -> CurrentUser:
     if not user:
         raise HTTPException(status_code=401, detail="Usuário não encontrado")
 
+    principal_cache.set(user_id, user)
     return user
+
+
+def _check_active(user: CurrentUser) -> CurrentUser:
+    if not user.is_active:
+        raise HTTPException(status_code=401, detail="Usuário inativo")
+
+    return user
+
+
+def _user_from_token(db: Session, token: str) -> CurrentUser:
+    user_id = _token_subject(token)
+    user = principal_cache.get(user_id)
+
+    if user is None:
+        user = _check_loaded_user(user_id, load_current_user(db, UUID(user_id)))
+
+    return _check_active(user)
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: Session = Depends(get_db)
+):
+    return _user_from_token(db, credentials.credentials)
+
+
+def get_current_user_stream(
+    access_token: str | None = Query(None, description="Para EventSource, que não envia headers"),
+    credentials: HTTPAuthorizationCredentials | None = Depends(optional_bearer_scheme),
+    db: Session = Depends(get_db)
+):
+    # Streams (SSE): header Authorization ou ?access_token=
+    token = credentials.credentials if credentials else access_token
+    if not token:
+        raise HTTPException(status_code=401, detail="Não autenticado")
+
+    return _user_from_token(db, token)
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user_id = _token_subject(credentials.credentials)
+    user = principal_cache.get(user_id)
+
+    if user is None:
+        loaded = await load_current_user_async(db, UUID(user_id))
+        user = _check_loaded_user(user_id, loaded)
+
+    return _check_active(user)
+
+
+def _owned_sensor_query(user: CurrentUser, sensor_id: UUID):
+    return select(Sensor.id).where(
+        Sensor.id == sensor_id,
+        Sensor.user_id == user.id
+    )
+
+
+def user_sensor_ids(user: CurrentUser):
+    # Subconsulta com os sensores do usuário, para `sensor_id IN (...)`.
+    # Listagens usam esta e não user.sensor_ids: o cache só é invalidado no
+    # worker que criou o sensor, e nos outros o sensor ficaria de fora
+    return select(Sensor.id).where(Sensor.user_id == user.id)
+
+
+def _check_owned(user: CurrentUser, owned):
+    if owned is None:
+        raise HTTPException(404, "Sensor não encontrado ou não pertence ao usuário")
+
+    invalidate_current_user(user.id)
+
+
+def ensure_sensor_owner(db: Session, user: CurrentUser, sensor_id: UUID):
+    if sensor_id in user.sensor_ids:
+        return
+
+    # O cache pode não conhecer um sensor criado em outro worker
+    _check_owned(user, db.scalar(_owned_sensor_query(user, sensor_id)))
+
+
+async def ensure_sensor_owner_async(db: AsyncSession, user: CurrentUser, sensor_id: UUID):
+    if sensor_id in user.sensor_ids:
+        return
+
+    _check_owned(user, await db.scalar(_owned_sensor_query(user, sensor_id)))
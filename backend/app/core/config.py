@@ -3,7 +3,155 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def _env_bool(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+def _async_database_url(url: str | None) -> str | None:
+    # postgresql://... -> postgresql+asyncpg://...
+    if not url or "+asyncpg" in url:
+        return url
+    scheme, sep, rest = url.partition("://")
+    return f"postgresql+asyncpg{sep}{rest}" if scheme.startswith("postgres") else url
+
+
 class Settings:
     DATABASE_URL: str = os.getenv("DATABASE_URL")
 
+    # Pool de conexões (engine síncrona e assíncrona)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = _env_bool("DB_POOL_PRE_PING", "true")
+
+    # Modo assíncrono (asyncpg): rotas de ingestão e leitura sem threadpool
+    DB_ASYNC_ENABLED: bool = _env_bool("DB_ASYNC_ENABLED")
+    ASYNC_DATABASE_URL: str = os.getenv(
+        "ASYNC_DATABASE_URL", _async_database_url(DATABASE_URL)
+    )
+    ASYNC_DB_POOL_SIZE: int = int(os.getenv("ASYNC_DB_POOL_SIZE", "20"))
+    ASYNC_DB_MAX_OVERFLOW: int = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "40"))
+
+    # Particionamento mensal de sensor_readings. Retenção 0 = guardar tudo.
+    READINGS_PARTITIONS_AHEAD: int = int(os.getenv("READINGS_PARTITIONS_AHEAD", "3"))
+    READINGS_RETENTION_MONTHS: int = int(os.getenv("READINGS_RETENTION_MONTHS", "0"))
+    PARTITION_MAINTENANCE_ON_STARTUP: bool = _env_bool(
+        "PARTITION_MAINTENANCE_ON_STARTUP", "true"
+    )
+    PARTITION_MAINTENANCE_INTERVAL_HOURS: float = float(
+        os.getenv("PARTITION_MAINTENANCE_INTERVAL_HOURS", "24")
+    )
+
+    # Máximo de amostras aceitas por chamada em /device/send-readings
+    DEVICE_BATCH_MAX_SIZE: int = int(os.getenv("DEVICE_BATCH_MAX_SIZE", "5000"))
+    # Tamanho máximo do corpo de /device (depois de descomprimido)
+    DEVICE_BODY_MAX_BYTES: int = int(os.getenv("DEVICE_BODY_MAX_BYTES", str(4 * 1024 * 1024)))
+
+    # Limite de amostras por sensor (token bucket em memória, por worker):
+    # DEVICE_RATE_LIMIT_SAMPLES_PER_S = 0 deixa sem limite quem não tem
+    # política própria (colunas max_samples_per_s/sample_burst do sensor).
+    # Excesso: "reject" responde 429 com Retry-After; "coalesce" aceita a
+    # leitura avulsa sem gravar (a última gravada vale pelo intervalo).
+    # Lotes acima do limite sempre recebem 429; cada leitura do lote conta,
+    # e lote maior que o burst recebe 413.
+    DEVICE_RATE_LIMIT_SAMPLES_PER_S: float = float(os.getenv("DEVICE_RATE_LIMIT_SAMPLES_PER_S", "0"))
+    DEVICE_RATE_LIMIT_BURST: int = int(os.getenv("DEVICE_RATE_LIMIT_BURST", "300"))
+    DEVICE_RATE_LIMIT_MODE: str = os.getenv("DEVICE_RATE_LIMIT_MODE", "reject")
+    DEVICE_RATE_LIMIT_KEYS: int = int(os.getenv("DEVICE_RATE_LIMIT_KEYS", "100000"))
+
+    # Buffer de escrita das leituras dos dispositivos (por worker): a rota
+    # responde ao enfileirar e uma thread grava em lotes. Fila cheia = 429.
+    INGEST_BUFFER_ENABLED: bool = _env_bool("INGEST_BUFFER_ENABLED")
+    INGEST_BUFFER_CAPACITY: int = int(os.getenv("INGEST_BUFFER_CAPACITY", "100000"))
+    INGEST_BUFFER_BATCH_SIZE: int = int(os.getenv("INGEST_BUFFER_BATCH_SIZE", "5000"))
+    INGEST_BUFFER_FLUSH_INTERVAL: float = float(os.getenv("INGEST_BUFFER_FLUSH_INTERVAL", "1"))
+    INGEST_BUFFER_RETRY_AFTER: int = int(os.getenv("INGEST_BUFFER_RETRY_AFTER", "2"))
+    INGEST_BUFFER_MAX_RETRY_DELAY: float = float(os.getenv("INGEST_BUFFER_MAX_RETRY_DELAY", "10"))
+    INGEST_BUFFER_DRAIN_TIMEOUT: float = float(os.getenv("INGEST_BUFFER_DRAIN_TIMEOUT", "30"))
+
+    # Leituras recusadas pelo banco por erro de dados (não de conexão), no
+    # buffer ou no spool: vão para este NDJSON em vez de serem repetidas
+    INGEST_DEAD_LETTER_PATH: str = os.getenv("INGEST_DEAD_LETTER_PATH", "./dead-letter/readings.ndjson")
+
+    # Spool em disco das leituras. "fallback": só quando o banco está fora
+    # (ou o flush do buffer falha); "always": toda leitura passa pelo spool
+    # e o reprocessador é quem grava no banco.
+    INGEST_SPOOL_ENABLED: bool = _env_bool("INGEST_SPOOL_ENABLED")
+    INGEST_SPOOL_MODE: str = os.getenv("INGEST_SPOOL_MODE", "fallback")
+    INGEST_SPOOL_DIR: str = os.getenv("INGEST_SPOOL_DIR", "./spool")
+    INGEST_SPOOL_SEGMENT_BYTES: int = int(os.getenv("INGEST_SPOOL_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+    # fsync em grupo do spool. O dispositivo recebe o OK depois do write e
+    # do flush, mas antes do fsync: se o servidor desligar (queda de energia,
+    # pane do kernel) perdem-se até INGEST_SPOOL_FSYNC_INTERVAL segundos de
+    # leituras já confirmadas. Queda só do processo não perde nada (os dados
+    # já estão no cache do SO). 0 = fsync a cada gravação, antes do OK.
+    INGEST_SPOOL_FSYNC_INTERVAL: float = float(os.getenv("INGEST_SPOOL_FSYNC_INTERVAL", "0.2"))
+    INGEST_SPOOL_REPLAY_INTERVAL: float = float(os.getenv("INGEST_SPOOL_REPLAY_INTERVAL", "5"))
+    INGEST_SPOOL_REPLAY_BATCH: int = int(os.getenv("INGEST_SPOOL_REPLAY_BATCH", "5000"))
+
+    # Máximo de linhas (grupos x baldes) em /consumption/report
+    CONSUMPTION_REPORT_MAX_ROWS: int = int(os.getenv("CONSUMPTION_REPORT_MAX_ROWS", "100000"))
+
+    # Leituras em tempo real (SSE) via LISTEN/NOTIFY. O NOTIFY entra na
+    # transação de cada gravação e serializa esses commits no Postgres.
+    LIVE_ENABLED: bool = _env_bool("LIVE_ENABLED")
+    LIVE_QUEUE_SIZE: int = int(os.getenv("LIVE_QUEUE_SIZE", "100"))
+    LIVE_MAX_SUBSCRIBERS: int = int(os.getenv("LIVE_MAX_SUBSCRIBERS", "10000"))
+    LIVE_HEARTBEAT_INTERVAL: float = float(os.getenv("LIVE_HEARTBEAT_INTERVAL", "15"))
+
+    # Cache de respostas das rotas de gráfico/dashboard (ETag / 304).
+    # "memory" é por worker; "redis" (pacote redis) é compartilhado.
+    RESPONSE_CACHE_ENABLED: bool = _env_bool("RESPONSE_CACHE_ENABLED", "true")
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_REDIS_URL: str = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+
+    # Cache token do dispositivo -> sensor (por worker). O TTL limita por
+    # quanto tempo um token revogado ainda é aceito pelos outros workers.
+    DEVICE_TOKEN_CACHE_SIZE: int = int(os.getenv("DEVICE_TOKEN_CACHE_SIZE", "10000"))
+    DEVICE_TOKEN_CACHE_TTL: float = float(os.getenv("DEVICE_TOKEN_CACHE_TTL", "60"))
+
+    # Hash de senha (Argon2) num pool de processos dedicado, fora do
+    # threadpool das rotas. Com 0 workers roda numa thread do event loop.
+    # Acima de PASSWORD_HASH_MAX_PENDING pedidos na fila, o login dá 503.
+    # Mudar o custo vale para hashes novos; os antigos são refeitos no
+    # próximo login de cada usuário.
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+    ARGON2_TIME_COST: int = int(os.getenv("ARGON2_TIME_COST", "3"))
+    ARGON2_MEMORY_COST: int = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+    ARGON2_PARALLELISM: int = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+    # Limite de tentativas de login (token bucket por IP e por email, por
+    # worker), aplicado antes de qualquer hash. Atrás de proxy, o IP vem de
+    # uvicorn --proxy-headers.
+    LOGIN_RATE_LIMIT_ENABLED: bool = _env_bool("LOGIN_RATE_LIMIT_ENABLED", "true")
+    LOGIN_IP_RATE_PER_MINUTE: float = float(os.getenv("LOGIN_IP_RATE_PER_MINUTE", "30"))
+    LOGIN_IP_BURST: float = float(os.getenv("LOGIN_IP_BURST", "10"))
+    LOGIN_EMAIL_RATE_PER_MINUTE: float = float(os.getenv("LOGIN_EMAIL_RATE_PER_MINUTE", "5"))
+    LOGIN_EMAIL_BURST: float = float(os.getenv("LOGIN_EMAIL_BURST", "5"))
+    LOGIN_RATE_LIMIT_KEYS: int = int(os.getenv("LOGIN_RATE_LIMIT_KEYS", "100000"))
+
+    # Cache do usuário autenticado (ativo + ids dos sensores), por sub do JWT
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+    PRINCIPAL_CACHE_TTL: float = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+
+    # Métricas por rota e por consulta SQL, expostas em /metrics
+    # (formato Prometheus, por worker). Log de requisições lentas com o
+    # SQL emitido: METRICS_SLOW_REQUEST_MS > 0 liga.
+    METRICS_ENABLED: bool = _env_bool("METRICS_ENABLED", "true")
+    METRICS_SLOW_REQUEST_MS: float = float(os.getenv("METRICS_SLOW_REQUEST_MS", "0"))
+    METRICS_SLOW_REQUEST_MAX_STATEMENTS: int = int(
+        os.getenv("METRICS_SLOW_REQUEST_MAX_STATEMENTS", "50")
+    )
+
+    # /metrics e /ingest-buffer, /ingest-spool, /response-cache e /live
+    # /stats: desligados por padrão. Ligados, com token exigem
+    # "Authorization: Bearer <token>"; sem token, restrinja na rede (porta
+    # interna, proxy) antes de expor.
+    EXPOSE_INTERNAL_ENDPOINTS: bool = _env_bool("EXPOSE_INTERNAL_ENDPOINTS")
+    INTERNAL_ENDPOINTS_TOKEN: str | None = os.getenv("INTERNAL_ENDPOINTS_TOKEN") or None
+
 settings = Settings()
@@ -2,15 +2,55 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-import os
+from app.core.config import settings
+from app.core.metrics import InstrumentedAsyncPool, InstrumentedQueuePool, instrument_engine
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(DATABASE_URL)
+# Sessões em UTC: timestamptz volta como datetime UTC e date_trunc/casts
+# no SQL não dependem do TimeZone configurado no servidor
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"options": "-c timezone=UTC"},
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    poolclass=InstrumentedQueuePool if settings.METRICS_ENABLED else None,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+if settings.METRICS_ENABLED:
+    instrument_engine(engine, "sync")
+
+# Engine assíncrona só existe com DB_ASYNC_ENABLED (depende de asyncpg)
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.DB_ASYNC_ENABLED:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(
+        settings.ASYNC_DATABASE_URL,
+        connect_args={"server_settings": {"timezone": "UTC"}},
+        pool_size=settings.ASYNC_DB_POOL_SIZE,
+        max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        poolclass=InstrumentedAsyncPool if settings.METRICS_ENABLED else None,
+    )
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
+    if settings.METRICS_ENABLED:
+        instrument_engine(async_engine.sync_engine, "async")
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -20,3 +60,15 @@ def get_db():
         raise
     finally:
         db.close()
+
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("DB_ASYNC_ENABLED está desligado")
+
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except SQLAlchemyError:
+            await db.rollback()
+            raise
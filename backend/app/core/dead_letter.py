@@ -0,0 +1,61 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.timeutils import utc_now
+
+logger = logging.getLogger(__name__)
+
+# Leituras que o banco recusou por erro de dados (sensor excluído depois de
+# enfileirar, valor fora do intervalo do REAL...). Repetir não adianta:
+# ficam num NDJSON à parte, uma linha por leitura com o motivo, para
+# inspeção manual, em vez de travar a fila ou o spool.
+
+
+class DeadLetter:
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+        self.rows = 0
+        self.write_failures = 0
+
+    def add(self, rows: list[dict], reason: str):
+        data = b"".join(
+            json.dumps(
+                {"at": utc_now().isoformat(), "reason": reason, "row": row},
+                default=str, separators=(",", ":")
+            ).encode() + b"\n"
+            for row in rows
+        )
+
+        with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "ab") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError:
+                # Último recurso: as leituras ficam só no log
+                self.write_failures += 1
+                logger.exception("Falha ao gravar o dead-letter; leituras descartadas: %s",
+                                 data.decode(errors="replace"))
+                return
+            self.rows += len(rows)
+
+        logger.error("%s leituras foram para o dead-letter %s: %s",
+                     len(rows), self.path, reason)
+
+    def stats(self) -> dict:
+        return {
+            "path": str(self.path),
+            "rows": self.rows,
+            "write_failures": self.write_failures,
+        }
+
+
+dead_letter = DeadLetter(settings.INGEST_DEAD_LETTER_PATH)
@@ -1,20 +1,90 @@
+from typing import NamedTuple
+from uuid import UUID
 from fastapi import Header, HTTPException, Depends
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.models.sensor import Sensor
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import get_db, get_async_db
+from app.models.sensors import Sensor
 
-def get_current_sensor(
-    x_device_token: str = Header(...),
+class DeviceIdentity(NamedTuple):
+    sensor_id: UUID
+    # Política de amostragem do sensor (None = padrão da configuração)
+    max_samples_per_s: float | None
+    sample_burst: int | None
+
+
+# token do dispositivo -> DeviceIdentity
+device_token_cache = TTLCache(
+    maxsize=settings.DEVICE_TOKEN_CACHE_SIZE,
+    ttl=settings.DEVICE_TOKEN_CACHE_TTL
+)
+
+
+def _invalid_token():
+    return HTTPException(
+        status_code=401,
+        detail="Token do dispositivo inválido"
+    )
+
+
+def _identity_query(token: str):
+    return select(
+        Sensor.id, Sensor.max_samples_per_s, Sensor.sample_burst
+    ).where(Sensor.device_token == token)
+
+
+def get_device_by_token(db: Session, token: str) -> DeviceIdentity:
+    device = device_token_cache.get(token)
+
+    if device is None:
+        row = db.execute(_identity_query(token)).first()
+
+        if row is None:
+            raise _invalid_token()
+
+        device = DeviceIdentity(*row)
+        device_token_cache.set(token, device)
+
+    return device
+
+
+async def get_device_by_token_async(db: AsyncSession, token: str) -> DeviceIdentity:
+    device = device_token_cache.get(token)
+
+    if device is None:
+        row = (await db.execute(_identity_query(token))).first()
+
+        if row is None:
+            raise _invalid_token()
+
+        device = DeviceIdentity(*row)
+        device_token_cache.set(token, device)
+
+    return device
+
+
+def invalidate_device_token(token: str | None):
+    if token:
+        device_token_cache.invalidate(token)
+
+
+def invalidate_sensor_tokens(sensor_id: UUID):
+    # Também após mudar a política do sensor
+    device_token_cache.invalidate_where(lambda device: device.sensor_id == sensor_id)
+
+
+def get_current_device(
+    x_device_token: str = Header(..., alias="X-Device-Token"),
     db: Session = Depends(get_db)
-):
-    sensor = db.query(Sensor).filter(
-        Sensor.device_token == x_device_token
-    ).first()
-
-    if not sensor:
-        raise HTTPException(
-            status_code=401,
-            detail="Invalid device token"
-        )
-
-    return sensor
+) -> DeviceIdentity:
+    return get_device_by_token(db, x_device_token)
+
+
+async def get_current_device_async(
+    x_device_token: str = Header(..., alias="X-Device-Token"),
+    db: AsyncSession = Depends(get_async_db)
+) -> DeviceIdentity:
+    return await get_device_by_token_async(db, x_device_token)
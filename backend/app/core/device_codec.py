@@ -0,0 +1,195 @@
+import math
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.schemas.sensor_reading import INT64_MAX, INT64_MIN, REAL_MAX, fits_real
+
+# Formato compacto para dispositivos com pouca banda/bateria: MessagePack
+# ou CBOR (Content-Type application/msgpack ou application/cbor), com o
+# corpo opcionalmente comprimido (Content-Encoding gzip ou deflate).
+#
+#   {"t": <ms desde a época, UTC>,
+#    "r": [[dt_ms, energy_kwh, current_a, voltage_v, power_w, seq], ...]}
+#
+# dt_ms é o intervalo desde a amostra anterior (a primeira conta a partir
+# de "t"). Campos do fim da linha podem ser omitidos (= null). Sem "t", as
+# leituras recebem o horário do servidor, como no JSON sem timestamp.
+#
+# A decodificação gera CompactReading (tupla simples) em vez de um modelo
+# Pydantic por amostra; reading_row lê os mesmos atributos. Os limites são
+# os mesmos do schema JSON (REAL nas medidas, 64 bits no seq).
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+CBOR_TYPES = ("application/cbor",)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_FIELDS = ("energy_kwh", "current_a", "voltage_v", "power_w")
+
+# Tipos exatos (bool é subclasse de int e não vale como número)
+_NUMBER_TYPES = frozenset({int, float, type(None)})
+_INT_TYPES = frozenset({int, type(None)})
+
+# Completa linhas curtas até 6 campos; linha vazia é erro
+_PADDING = [None] + [[None] * (6 - n) for n in range(1, 7)]
+
+
+class CompactReading(NamedTuple):
+    timestamp: datetime | None
+    energy_kwh: float | None
+    current_a: float | None
+    voltage_v: float | None
+    power_w: float | None
+    seq: int | None
+
+
+def media_type(content_type: str) -> str:
+    return content_type.split(";", 1)[0].strip().lower()
+
+
+def is_compact(content_type: str) -> bool:
+    return media_type(content_type) in MSGPACK_TYPES + CBOR_TYPES
+
+
+def _too_large():
+    return HTTPException(
+        status_code=413,
+        detail=f"Corpo maior que {settings.DEVICE_BODY_MAX_BYTES} bytes"
+    )
+
+
+def decode_content(body: bytes, content_encoding: str | None) -> bytes:
+    # Descompressão limitada: um corpo pequeno não pode virar gigabytes
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "identity":
+        if len(body) > settings.DEVICE_BODY_MAX_BYTES:
+            raise _too_large()
+        return body
+
+    if encoding in ("gzip", "x-gzip"):
+        wbits = [16 + zlib.MAX_WBITS]
+    elif encoding == "deflate":
+        # "deflate" no HTTP é zlib, mas há clientes que mandam deflate cru
+        wbits = [zlib.MAX_WBITS, -zlib.MAX_WBITS]
+    else:
+        raise HTTPException(415, f"Content-Encoding não suportado: {encoding}")
+
+    for bits in wbits:
+        decompressor = zlib.decompressobj(bits)
+        try:
+            data = decompressor.decompress(body, settings.DEVICE_BODY_MAX_BYTES)
+        except zlib.error:
+            continue
+        if decompressor.unconsumed_tail:
+            raise _too_large()
+        if not decompressor.eof:
+            raise HTTPException(400, "Corpo comprimido incompleto")
+        return data
+
+    raise HTTPException(400, f"Corpo {encoding} inválido")
+
+
+def _loads(content_type: str, data: bytes):
+    if media_type(content_type) in CBOR_TYPES:
+        try:
+            import cbor2
+        except ImportError:
+            raise HTTPException(415, "CBOR não disponível neste servidor (pacote cbor2)")
+        errors = (cbor2.CBORDecodeError, ValueError)
+        loads = cbor2.loads
+    else:
+        try:
+            import msgpack
+        except ImportError:
+            raise HTTPException(415, "MessagePack não disponível neste servidor (pacote msgpack)")
+        errors = (ValueError,)
+        loads = msgpack.unpackb
+
+    try:
+        return loads(data)
+    except errors:
+        raise HTTPException(400, "Corpo binário inválido")
+
+
+def _invalid(detail: str):
+    return HTTPException(status_code=422, detail=detail)
+
+
+def _row_error(index: int, row, timed: bool) -> HTTPException:
+    # Só no caminho de erro: descobre qual campo da linha é inválido
+    if type(row) is not list or not 1 <= len(row) <= 6:
+        return _invalid(
+            f"Leitura {index}: esperado [dt_ms, energy_kwh, current_a, voltage_v, power_w, seq]"
+        )
+
+    row = row + _PADDING[len(row)]
+    if timed and (type(row[0]) is not int or row[0] < 0):
+        return _invalid(f"Leitura {index}: dt_ms deve ser inteiro >= 0")
+    for value, name in zip(row[1:5], _FIELDS):
+        if type(value) not in _NUMBER_TYPES:
+            return _invalid(f"Leitura {index}: {name} deve ser número ou null")
+        if type(value) is float and not math.isfinite(value):
+            return _invalid(f"Leitura {index}: {name} não pode ser NaN nem infinito")
+        if value is not None and not fits_real(value):
+            return _invalid(f"Leitura {index}: {name} fora do intervalo do tipo REAL (±{REAL_MAX:g})")
+    if type(row[5]) not in _INT_TYPES:
+        return _invalid(f"Leitura {index}: seq deve ser inteiro ou null")
+    return _invalid(f"Leitura {index}: seq fora do intervalo de 64 bits")
+
+
+def _fits(value) -> bool:
+    # isfinite só em float: int enorme (CBOR bignum) não converte
+    if value is None:
+        return True
+    if type(value) is float and not math.isfinite(value):
+        return False
+    return fits_real(value)
+
+
+def decode_compact(content_type: str, data: bytes) -> list[CompactReading]:
+    message = _loads(content_type, data)
+
+    if type(message) is not dict or type(message.get("r")) is not list:
+        raise _invalid('Formato compacto: esperado {"t": ..., "r": [[...], ...]}')
+
+    t = message.get("t")
+    if type(t) not in _INT_TYPES:
+        raise _invalid('"t" deve ser inteiro (ms desde a época) ou ausente')
+
+    numbers, ints = _NUMBER_TYPES, _INT_TYPES
+    readings = []
+    append = readings.append
+
+    for i, row in enumerate(message["r"]):
+        try:
+            if len(row) < 6:
+                row = row + _PADDING[len(row)]
+            dt, energy, current, voltage, power, seq = row
+        except (TypeError, ValueError):
+            raise _row_error(i, row, t is not None)
+
+        if not (type(energy) in numbers and type(current) in numbers
+                and type(voltage) in numbers and type(power) in numbers
+                and type(seq) in ints and type(row) is list):
+            raise _row_error(i, row, t is not None)
+
+        if not (_fits(energy) and _fits(current) and _fits(voltage) and _fits(power)
+                and (seq is None or INT64_MIN <= seq <= INT64_MAX)):
+            raise _row_error(i, row, t is not None)
+
+        timestamp = None
+        if t is not None:
+            if type(dt) is not int or dt < 0:
+                raise _row_error(i, row, t is not None)
+            t += dt
+            try:
+                timestamp = _EPOCH + timedelta(milliseconds=t)
+            except OverflowError:
+                raise _invalid(f"Leitura {i}: timestamp fora do intervalo")
+
+        append(CompactReading(timestamp, energy, current, voltage, power, seq))
+
+    return readings
@@ -0,0 +1,45 @@
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.device_auth import DeviceIdentity
+from app.core.metrics import metrics
+from app.core.rate_limit import TokenBucketLimiter, too_many_requests
+
+# Limite de amostras por sensor na ingestão: um balde por sensor, com a
+# política do sensor (vem junto do token, no cache) ou o padrão da
+# configuração. Não consulta o banco. Por worker: com N workers atrás de
+# um balanceador o limite efetivo chega a N vezes o configurado.
+
+device_limiter = TokenBucketLimiter(
+    rate=settings.DEVICE_RATE_LIMIT_SAMPLES_PER_S,
+    burst=settings.DEVICE_RATE_LIMIT_BURST,
+    maxsize=settings.DEVICE_RATE_LIMIT_KEYS
+)
+metrics.limiters["device"] = device_limiter
+
+
+def admit_samples(device: DeviceIdentity, count: int, can_coalesce: bool = False) -> bool:
+    # True: grava. False: leitura avulsa acima do limite em modo
+    # "coalesce" (responde sem gravar). Nos demais casos, 429
+    rate = device.max_samples_per_s
+    if rate is None:
+        rate = settings.DEVICE_RATE_LIMIT_SAMPLES_PER_S
+    burst = device.sample_burst or settings.DEVICE_RATE_LIMIT_BURST
+
+    # Cada amostra custa uma ficha. Lote maior que o burst nunca caberia no
+    # balde: 413 (repetir não adianta, o dispositivo precisa dividir)
+    if rate > 0 and count > burst:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote de {count} leituras maior que o limite do sensor ({burst}); divida o envio"
+        )
+
+    wait = device_limiter.acquire(device.sensor_id, count, rate, burst)
+    if not wait:
+        return True
+
+    if can_coalesce and settings.DEVICE_RATE_LIMIT_MODE == "coalesce":
+        metrics.observe_device_coalesced()
+        return False
+
+    raise too_many_requests(wait, "Limite de amostras do sensor excedido, tente novamente")
@@ -0,0 +1,166 @@
+import math
+from datetime import datetime, timezone
+from sqlalchemy import func, literal, select
+
+from app.models.sensor_reading import SensorReading
+from app.models.sensor_reading_rollup import SensorReadingHourly
+
+# Séries reduzidas para gráficos: o banco agrupa em baldes de largura fixa
+# (alinhados à época Unix, então o mesmo zoom sempre gera os mesmos baldes)
+# e o LTTB escolhe os pontos visualmente relevantes sobre esses baldes.
+# Custo e tamanho da resposta ficam limitados por max_points.
+
+# Baldes para o LTTB por ponto pedido (cada balde entra com mínimo e máximo)
+LTTB_OVERSAMPLING = 4
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _round_up(value: int, step: int) -> int:
+    return math.ceil(value / step) * step
+
+
+def _bucket_count(start: datetime, end: datetime, width: int) -> int:
+    # Baldes alinhados à época que tocam [start, end)
+    first = math.floor((start - _EPOCH).total_seconds() / width)
+    last = math.ceil((end - _EPOCH).total_seconds() / width)
+    return last - first
+
+
+def bucket_seconds(start: datetime, end: datetime, buckets: int, step: int = 1) -> int:
+    # Largura (múltipla de `step`) que cobre [start, end) com no máximo
+    # `buckets` baldes alinhados. Com o início fora do alinhamento,
+    # ceil(span / buckets) pode tocar um balde a mais; com span / (buckets
+    # - 1) cabe sempre (são menos de span / largura + 2 baldes).
+    span = (end - start).total_seconds()
+    width = _round_up(max(1, math.ceil(span / buckets)), step)
+    if _bucket_count(start, end, width) > buckets:
+        width = _round_up(max(1, math.ceil(span / max(1, buckets - 1))), step)
+    return width
+
+
+def _bucket_index(column, width: int):
+    # Inteiro renderizado inline: SELECT e GROUP BY com a mesma expressão
+    return func.floor(
+        func.extract("epoch", column) / literal(width, literal_execute=True)
+    )
+
+
+def _bucket_start(index: float, width: int) -> datetime:
+    return datetime.fromtimestamp(int(index) * width, timezone.utc)
+
+
+def series_buckets(db, sensor_id, metric: str, start: datetime, end: datetime, buckets: int):
+    # Até `buckets` baldes de largura fixa em [start, end)
+    width = bucket_seconds(start, end, buckets)
+
+    # Balde de 1 h ou mais em power_w: lê a tabela horária em vez das leituras
+    if metric == "power_w" and width >= 3600:
+        width = bucket_seconds(start, end, buckets, step=3600)
+        rollup = SensorReadingHourly
+        index = _bucket_index(rollup.bucket, width)
+        stmt = (
+            select(
+                index.label("idx"),
+                (func.sum(rollup.power_w_sum) / func.nullif(func.sum(rollup.power_w_count), 0)).label("avg"),
+                func.min(rollup.power_w_min).label("min"),
+                func.max(rollup.power_w_max).label("max"),
+                func.sum(rollup.power_w_count).label("count"),
+            )
+            .where(
+                rollup.sensor_id == sensor_id,
+                rollup.bucket >= start,
+                rollup.bucket < end
+            )
+        )
+    else:
+        column = getattr(SensorReading, metric)
+        index = _bucket_index(SensorReading.timestamp, width)
+        stmt = (
+            select(
+                index.label("idx"),
+                func.avg(column).label("avg"),
+                func.min(column).label("min"),
+                func.max(column).label("max"),
+                func.count(column).label("count"),
+            )
+            .where(
+                SensorReading.sensor_id == sensor_id,
+                SensorReading.timestamp >= start,
+                SensorReading.timestamp < end
+            )
+        )
+
+    rows = db.execute(stmt.group_by(index).order_by(index)).all()
+
+    points = [
+        {
+            "t": _bucket_start(r.idx, width),
+            "avg": r.avg,
+            "min": r.min,
+            "max": r.max,
+            "count": r.count,
+        }
+        for r in rows
+        if r.count
+    ]
+    return points, width
+
+
+def lttb(points: list[tuple[float, float]], threshold: int) -> list[tuple[float, float]]:
+    # Largest-Triangle-Three-Buckets (Steinarsson, 2013): mantém o primeiro e
+    # o último ponto e, em cada balde, o que forma o maior triângulo com o
+    # ponto escolhido antes e a média do balde seguinte
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    every = (n - 2) / (threshold - 2)
+    sampled = [points[0]]
+    a = 0
+
+    for i in range(threshold - 2):
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        next_slice = points[next_start:next_end]
+        avg_x = sum(p[0] for p in next_slice) / len(next_slice)
+        avg_y = sum(p[1] for p in next_slice) / len(next_slice)
+
+        ax, ay = points[a]
+        best_area = -1.0
+        best = next_start - 1
+
+        for j in range(int(i * every) + 1, next_start):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def lttb_series(db, sensor_id, metric: str, start: datetime, end: datetime, max_points: int):
+    buckets, width = series_buckets(
+        db, sensor_id, metric, start, end, max_points * LTTB_OVERSAMPLING
+    )
+
+    # Mínimo e máximo de cada balde como dois pontos: picos isolados
+    # sobrevivem à redução (a média os apagaria)
+    points = []
+    for b in buckets:
+        x = (b["t"] - _EPOCH).total_seconds()
+        if b["min"] == b["max"]:
+            points.append((x + width / 2, b["min"]))
+        else:
+            points.append((x + width / 4, b["min"]))
+            points.append((x + width * 3 / 4, b["max"]))
+
+    return [
+        {"t": datetime.fromtimestamp(x, timezone.utc), "v": y}
+        for x, y in lttb(points, max_points)
+    ], width
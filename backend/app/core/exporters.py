@@ -0,0 +1,189 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from uuid import UUID
+
+from app.core.fast_json import dumps
+
+# Codificadores em streaming para exportação de leituras. Cada um recebe
+# lotes de linhas (tuplas) e devolve bytes aos poucos: memória constante,
+# independente do tamanho do intervalo exportado.
+
+EXPORT_COLUMNS = ["sensor_id", "timestamp", "energy_kwh", "current_a", "voltage_v", "power_w"]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+class ExportUnavailable(Exception):
+    pass
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def encode_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    for batch in batches:
+        writer.writerows([[_plain(v) for v in row] for row in batch])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def encode_ndjson(batches):
+    # Mesmo codificador das respostas JSON (orjson quando instalado)
+    for batch in batches:
+        yield b"".join(dumps(dict(zip(EXPORT_COLUMNS, row))) + b"\n" for row in batch)
+
+
+def _arrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ExportUnavailable("Exportação Parquet/Arrow requer o pacote pyarrow")
+    return pyarrow
+
+
+def _arrow_schema(pa):
+    return pa.schema([
+        ("sensor_id", pa.string()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("energy_kwh", pa.float64()),
+        ("current_a", pa.float64()),
+        ("voltage_v", pa.float64()),
+        ("power_w", pa.float64()),
+    ])
+
+
+def _arrow_batch(pa, schema, batch):
+    columns = list(zip(*batch)) if batch else [[] for _ in EXPORT_COLUMNS]
+    return pa.record_batch(
+        [
+            pa.array([str(v) for v in columns[0]], pa.string()),
+            pa.array(columns[1], pa.timestamp("us", tz="UTC")),
+            *[pa.array(col, pa.float64()) for col in columns[2:]],
+        ],
+        schema=schema,
+    )
+
+
+class _Sink(io.RawIOBase):
+    # Arquivo "de passagem": acumula o que o writer escreve até ser drenado
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _encode_columnar(batches, open_writer):
+    pa = _arrow()
+    schema = _arrow_schema(pa)
+    sink = _Sink()
+    writer = open_writer(pa, sink, schema)
+
+    for batch in batches:
+        writer.write_batch(_arrow_batch(pa, schema, batch))
+        data = sink.drain()
+        if data:
+            yield data
+
+    writer.close()
+    yield sink.drain()
+
+
+def encode_parquet(batches):
+    def open_writer(pa, sink, schema):
+        import pyarrow.parquet as pq
+        # Um row group por lote; o rodapé sai no close()
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+
+    return _encode_columnar(batches, open_writer)
+
+
+def encode_arrow(batches):
+    def open_writer(pa, sink, schema):
+        return pa.ipc.new_stream(sink, schema)
+
+    return _encode_columnar(batches, open_writer)
+
+
+ENCODERS = {
+    "csv": encode_csv,
+    "ndjson": encode_ndjson,
+    "parquet": encode_parquet,
+    "arrow": encode_arrow,
+}
+
+
+# -----------------------------------------
+# Content-Encoding
+# -----------------------------------------
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _zstd(chunks):
+    try:
+        import zstandard
+    except ImportError:
+        raise ExportUnavailable("Compressão zstd requer o pacote zstandard")
+
+    compressor = zstandard.ZstdCompressor().compressobj()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def check_available(fmt: str, encoding: str | None):
+    # Falha antes de abrir o stream (e de enviar o status 200)
+    if fmt in ("parquet", "arrow"):
+        _arrow()
+    if encoding == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            raise ExportUnavailable("Compressão zstd requer o pacote zstandard")
+
+
+def compress(chunks, encoding: str | None):
+    if encoding == "gzip":
+        return _gzip(chunks)
+    if encoding == "zstd":
+        return _zstd(chunks)
+    return chunks
@@ -0,0 +1,50 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Serialização JSON das respostas grandes. Rotas que já devolvem tipos
+# simples (dict/list de str, número, datetime, UUID) usam FastJSONResponse
+# direto: pula o jsonable_encoder do FastAPI, que percorre cada valor em
+# Python. Com orjson (recomendado) a codificação é feita em Rust; sem ele,
+# cai no json da stdlib com a mesma saída.
+
+
+def _default(value):
+    # Tipos que o codificador não conhece: numeric do Postgres, UUID do
+    # asyncpg (subclasse que o orjson não aceita) e datas no json da stdlib
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável em JSON: {type(value).__name__}")
+
+
+if orjson is not None:
+    def dumps(content) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def dumps(content) -> bytes:
+        return json.dumps(
+            content, default=_default, ensure_ascii=False, separators=(",", ":")
+        ).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def rows_to_columns(rows, names: list[str]) -> dict:
+    # Layout colunar: {"timestamp": [...], "power_w": [...]} — uma chave por
+    # campo em vez de repetir os nomes em cada linha
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    return {name: list(column) for name, column in zip(names, columns)}
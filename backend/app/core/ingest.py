@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import InterfaceError, OperationalError, SQLAlchemyError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.dead_letter import dead_letter
+from app.core.live import notify_readings, notify_readings_async
+from app.core.rollups import apply_rollups, apply_rollups_async
+from app.core.timeutils import to_utc, utc_now
+from app.models.sensor_reading import SensorReading
+
+# Caminho comum de gravação das leituras (dispositivo e API)
+
+# Erros que indicam banco indisponível (não erro de dados)
+DB_UNAVAILABLE = (OperationalError, InterfaceError, PoolTimeoutError)
+
+
+def reading_row(sensor_id: UUID, data, now: datetime = None) -> dict:
+    # `data` é qualquer SensorReadingBase; timestamp do dispositivo é opcional
+    timestamp = getattr(data, "timestamp", None)
+
+    return {
+        "sensor_id": sensor_id,
+        "energy_kwh": data.energy_kwh,
+        "current_a": data.current_a,
+        "voltage_v": data.voltage_v,
+        "power_w": data.power_w,
+        "seq": getattr(data, "seq", None),
+        "timestamp": to_utc(timestamp) if timestamp else (now or utc_now()),
+    }
+
+
+def build_reading_rows(sensor_id: UUID, items) -> list[dict]:
+    # Itens sem timestamp recebem o horário do servidor, 1 µs a mais por
+    # posição: (sensor_id, timestamp) continua identificando cada leitura
+    now = utc_now()
+    return [
+        reading_row(sensor_id, item, now + timedelta(microseconds=i))
+        for i, item in enumerate(items)
+    ]
+
+
+_READING_COLUMNS = (
+    SensorReading.sensor_id,
+    SensorReading.timestamp,
+    SensorReading.energy_kwh,
+    SensorReading.current_a,
+    SensorReading.voltage_v,
+    SensorReading.power_w,
+    SensorReading.seq
+)
+
+# Reenvios (retry do dispositivo, replay do spool) caem no ON CONFLICT;
+# só as linhas realmente inseridas entram nos agregados.
+_insert_readings = (
+    pg_insert(SensorReading)
+    .on_conflict_do_nothing(index_elements=["sensor_id", "timestamp"])
+    .returning(*_READING_COLUMNS)
+)
+
+
+def write_readings(db: Session, rows: list[dict]) -> int:
+    # INSERT multi-linhas + agregados (e NOTIFY do tempo real) na mesma
+    # transação. Devolve quantas linhas eram novas.
+    inserted = [row._asdict() for row in db.execute(_insert_readings, rows)]
+    apply_rollups(db, inserted)
+    if settings.LIVE_ENABLED:
+        notify_readings(db, inserted)
+    return len(inserted)
+
+
+async def write_readings_async(db: AsyncSession, rows: list[dict]) -> int:
+    result = await db.execute(_insert_readings, rows)
+    inserted = [row._asdict() for row in result]
+    await apply_rollups_async(db, inserted)
+    if settings.LIVE_ENABLED:
+        await notify_readings_async(db, inserted)
+    return len(inserted)
+
+
+# Leitura avulsa que caiu no ON CONFLICT: a resposta traz a que já estava
+# gravada (valores podem diferir dos reenviados). Se sumiu nesse meio
+# tempo (sensor excluído), fica a recebida.
+
+def _stored_reading_query(row: dict):
+    return select(*_READING_COLUMNS).where(
+        SensorReading.sensor_id == row["sensor_id"],
+        SensorReading.timestamp == row["timestamp"]
+    )
+
+
+def stored_reading(db: Session, row: dict) -> dict:
+    found = db.execute(_stored_reading_query(row)).first()
+    return found._asdict() if found else row
+
+
+async def stored_reading_async(db: AsyncSession, row: dict) -> dict:
+    found = (await db.execute(_stored_reading_query(row))).first()
+    return found._asdict() if found else row
+
+
+def write_isolating(write, rows: list[dict]) -> int:
+    # Para gravações em segundo plano (buffer, spool). `write(rows)` grava
+    # e faz commit numa sessão própria. Erro de dados divide o lote ao meio
+    # até isolar as linhas ruins, que vão para o dead-letter; as demais são
+    # gravadas. Erro de conexão (DB_UNAVAILABLE) sobe para quem chamou
+    # tentar de novo: o que já entrou cai no ON CONFLICT.
+    try:
+        return write(rows)
+    except DB_UNAVAILABLE:
+        raise
+    except SQLAlchemyError as exc:
+        if len(rows) == 1:
+            dead_letter.add(rows, str(getattr(exc, "orig", None) or exc).strip())
+            return 0
+
+    middle = len(rows) // 2
+    return write_isolating(write, rows[:middle]) + write_isolating(write, rows[middle:])
@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+from collections import deque
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.dead_letter import dead_letter
+from app.core.ingest import DB_UNAVAILABLE, write_isolating, write_readings
+from app.core.response_cache import invalidate_sensor_responses
+from app.core.spool import ingest_spool
+
+logger = logging.getLogger(__name__)
+
+# Buffer de escrita (write-behind) das leituras dos dispositivos, por worker.
+# A rota só valida e enfileira; uma thread grava em lotes limitados por
+# tamanho ou por tempo. Leituras ainda na fila se perdem se o processo
+# morrer sem passar pelo shutdown (a não ser que o spool esteja ativo e o
+# flush tenha falhado: aí o lote já foi para o disco). Só erro de conexão
+# volta para a fila; linhas que o banco recusa vão para o dead-letter.
+
+
+class IngestBufferFull(Exception):
+    pass
+
+
+class IngestBuffer:
+    def __init__(self, capacity: int, batch_size: int, flush_interval: float):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._rows: deque = deque()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._closing = False
+
+        self.enqueued = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+        self.spool_failures = 0
+        self.last_flush_size = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self._flush_seconds_total = 0.0
+
+    # -----------------------------------------
+    # Produtor (rotas)
+    # -----------------------------------------
+
+    def put(self, rows: list[dict]):
+        # O lote entra inteiro ou é recusado (backpressure)
+        with self._cond:
+            if self._closing or len(self._rows) + len(rows) > self.capacity:
+                self.rejected += len(rows)
+                raise IngestBufferFull()
+
+            self._rows.extend(rows)
+            self.enqueued += len(rows)
+
+            if len(self._rows) >= self.batch_size:
+                self._cond.notify()
+
+    # -----------------------------------------
+    # Consumidor (thread de flush)
+    # -----------------------------------------
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._closing = False
+            self._thread = threading.Thread(
+                target=self._run, name="ingest-buffer-flusher", daemon=True
+            )
+            self._thread.start()
+
+    def close(self, timeout: float | None = None):
+        # Para de aceitar leituras e espera a fila ser gravada
+        with self._cond:
+            thread = self._thread
+            self._closing = True
+            self._cond.notify()
+
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.error(
+                    "Buffer de ingestão não esvaziou no shutdown; %s leituras pendentes",
+                    len(self._rows)
+                )
+
+        with self._cond:
+            self._thread = None
+
+    def _take(self) -> list[dict] | None:
+        with self._cond:
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(self._rows) < self.batch_size and not self._closing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            if not self._rows:
+                return None if self._closing else []
+
+            count = min(self.batch_size, len(self._rows))
+            return [self._rows.popleft() for _ in range(count)]
+
+    def _requeue(self, rows: list[dict]):
+        # Volta para o início da fila, mesmo acima da capacidade
+        with self._cond:
+            self._rows.extendleft(reversed(rows))
+
+    def _run(self):
+        retry_delay = 0.0
+
+        while True:
+            rows = self._take()
+
+            if rows is None:
+                return
+            if not rows:
+                continue
+
+            if self.flush(rows):
+                retry_delay = 0.0
+                continue
+
+            # Com spool, o lote vai para o disco e a fila não cresce
+            if settings.INGEST_SPOOL_ENABLED:
+                try:
+                    ingest_spool.append(rows)
+                    continue
+                except Exception:
+                    # Disco cheio, permissão...: o lote fica na fila
+                    self.spool_failures += 1
+                    logger.exception("Falha ao gravar %s leituras no spool", len(rows))
+
+            self._requeue(rows)
+
+            if self._closing and retry_delay >= settings.INGEST_BUFFER_MAX_RETRY_DELAY:
+                logger.error("Banco indisponível no shutdown; %s leituras descartadas", len(self._rows))
+                return
+
+            retry_delay = min(max(retry_delay * 2, 0.5), settings.INGEST_BUFFER_MAX_RETRY_DELAY)
+            time.sleep(retry_delay)
+
+    def _write(self, rows: list[dict]) -> int:
+        with SessionLocal() as db:
+            inserted = write_readings(db, rows)
+            db.commit()
+
+        if inserted:
+            invalidate_sensor_responses({row["sensor_id"] for row in rows})
+        return inserted
+
+    def flush(self, rows: list[dict]) -> bool:
+        # False só com o banco indisponível (o lote volta para a fila)
+        started = time.perf_counter()
+
+        try:
+            write_isolating(self._write, rows)
+        except DB_UNAVAILABLE:
+            self.failures += 1
+            logger.exception("Falha ao gravar %s leituras do buffer de ingestão", len(rows))
+            return False
+
+        elapsed = time.perf_counter() - started
+
+        self.flushed += len(rows)
+        self.flushes += 1
+        self.last_flush_size = len(rows)
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self._flush_seconds_total += elapsed
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self._rows),
+            "capacity": self.capacity,
+            "enqueued": self.enqueued,
+            "rejected": self.rejected,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "spool_failures": self.spool_failures,
+            "dead_letter": dead_letter.stats(),
+            "avg_flush_size": self.flushed / self.flushes if self.flushes else 0,
+            "last_flush_size": self.last_flush_size,
+            "avg_flush_seconds": self._flush_seconds_total / self.flushes if self.flushes else 0,
+            "last_flush_seconds": self.last_flush_seconds,
+            "max_flush_seconds": self.max_flush_seconds,
+        }
+
+
+ingest_buffer = IngestBuffer(
+    capacity=settings.INGEST_BUFFER_CAPACITY,
+    batch_size=settings.INGEST_BUFFER_BATCH_SIZE,
+    flush_interval=settings.INGEST_BUFFER_FLUSH_INTERVAL
+)
@@ -0,0 +1,266 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from uuid import UUID
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Leituras novas em tempo real (SSE). Quem grava (qualquer worker) faz
+# NOTIFY na mesma transação do INSERT — só chega ao commit. Cada worker
+# mantém uma conexão em LISTEN numa thread e entrega ao hub local, que
+# repassa a cada assinante (fila por conexão SSE, no event loop).
+#
+# NOTIFY serializa os commits que notificam (lock global no Postgres):
+# por isso é opcional (LIVE_ENABLED).
+
+CHANNEL = "sensor_readings"
+
+# Limite do payload do NOTIFY é 8000 bytes; folga para o envelope
+_MAX_PAYLOAD = 7000
+
+_notify = text(
+    f"SELECT pg_notify('{CHANNEL}', payload) "
+    "FROM unnest(CAST(:payloads AS text[])) AS payload"
+)
+
+
+def _reading(row: dict) -> list:
+    return [
+        row["timestamp"].isoformat(),
+        row.get("energy_kwh"),
+        row.get("current_a"),
+        row.get("voltage_v"),
+        row.get("power_w"),
+        row.get("seq"),
+    ]
+
+
+def notify_payloads(rows: list[dict]) -> list[str]:
+    # Um payload por sensor, quebrado em pedaços que cabem no NOTIFY
+    by_sensor = {}
+    for row in rows:
+        by_sensor.setdefault(row["sensor_id"], []).append(json.dumps(_reading(row)))
+
+    payloads = []
+    for sensor_id, readings in by_sensor.items():
+        head = f'{{"s":"{sensor_id}","r":['
+        chunk, size = [], len(head)
+
+        for reading in readings:
+            if chunk and size + len(reading) + 3 > _MAX_PAYLOAD:
+                payloads.append(head + ",".join(chunk) + "]}")
+                chunk, size = [], len(head)
+            chunk.append(reading)
+            size += len(reading) + 1
+
+        payloads.append(head + ",".join(chunk) + "]}")
+
+    return payloads
+
+
+def notify_readings(db, rows: list[dict]):
+    if rows:
+        db.execute(_notify, {"payloads": notify_payloads(rows)})
+
+
+async def notify_readings_async(db, rows: list[dict]):
+    if rows:
+        await db.execute(_notify, {"payloads": notify_payloads(rows)})
+
+
+def sse_frame(payload: str) -> tuple[UUID, str]:
+    # Converte o payload compacto no evento enviado aos navegadores
+    message = json.loads(payload)
+    data = {
+        "sensor_id": message["s"],
+        "readings": [
+            {
+                "timestamp": r[0],
+                "energy_kwh": r[1],
+                "current_a": r[2],
+                "voltage_v": r[3],
+                "power_w": r[4],
+                "seq": r[5],
+            }
+            for r in message["r"]
+        ],
+    }
+    return UUID(message["s"]), f"event: readings\ndata: {json.dumps(data)}\n\n"
+
+
+class LiveSubscriber:
+    __slots__ = ("sensor_ids", "queue", "dropped")
+
+    def __init__(self, sensor_ids, queue_size: int):
+        self.sensor_ids = frozenset(sensor_ids)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+
+class LiveHub:
+    # Fan-out local: só roda no event loop do worker (publish via
+    # call_soon_threadsafe). O frame é montado uma vez e a mesma string
+    # vai para todos os assinantes do sensor.
+    def __init__(self, queue_size: int, max_subscribers: int):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.loop = None
+        self._by_sensor: dict[UUID, set] = {}
+        self._subscribers = set()
+
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def start(self, loop):
+        self.loop = loop
+
+    def is_full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    def has_subscribers(self, sensor_id: UUID) -> bool:
+        return sensor_id in self._by_sensor
+
+    def subscribe(self, sensor_ids) -> LiveSubscriber:
+        subscriber = LiveSubscriber(sensor_ids, self.queue_size)
+        self._subscribers.add(subscriber)
+        for sensor_id in subscriber.sensor_ids:
+            self._by_sensor.setdefault(sensor_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: LiveSubscriber):
+        self._subscribers.discard(subscriber)
+        for sensor_id in subscriber.sensor_ids:
+            subscribers = self._by_sensor.get(sensor_id)
+            if subscriber in (subscribers or ()):
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._by_sensor[sensor_id]
+
+    def publish(self, sensor_id: UUID, frame: str):
+        self.published += 1
+        for subscriber in self._by_sensor.get(sensor_id, ()):
+            # Cliente lento: descarta o mais antigo em vez de crescer sem limite
+            if subscriber.queue.full():
+                subscriber.queue.get_nowait()
+                subscriber.dropped += 1
+                self.dropped += 1
+            subscriber.queue.put_nowait(frame)
+            self.delivered += 1
+
+    def publish_threadsafe(self, sensor_id: UUID, frame: str):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.publish, sensor_id, frame)
+
+    def close(self):
+        # None encerra os streams abertos
+        for subscriber in list(self._subscribers):
+            if subscriber.queue.full():
+                subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(None)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "sensors": len(self._by_sensor),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+class NotifyListener:
+    # Conexão dedicada (fora do pool) em LISTEN; reconecta se cair
+    def __init__(self, hub: LiveHub, poll_interval: float = 1.0, retry_delay: float = 2.0):
+        self.hub = hub
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.notifications = 0
+        self.reconnects = 0
+        self.connected = False
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="live-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _connect(self):
+        connection = engine.raw_connection()
+        connection.detach()
+        dbapi_connection = connection.dbapi_connection
+        dbapi_connection.autocommit = True
+        with dbapi_connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        return dbapi_connection
+
+    def _run(self):
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = self._connect()
+                self.connected = True
+                self._listen(connection)
+            except Exception:
+                self.reconnects += 1
+                logger.exception("Conexão LISTEN caiu; reconectando")
+                self._stop.wait(self.retry_delay)
+            finally:
+                self.connected = False
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+    def _listen(self, connection):
+        while not self._stop.is_set():
+            ready, _, _ = select.select([connection], [], [], self.poll_interval)
+            if not ready:
+                continue
+
+            connection.poll()
+            while connection.notifies:
+                self._dispatch(connection.notifies.pop(0).payload)
+
+    def _dispatch(self, payload: str):
+        self.notifications += 1
+        try:
+            # Sem assinante local para o sensor: nem monta o evento
+            # (o payload começa com {"s":"<uuid>")
+            sensor_id = UUID(payload[6:42])
+            if not self.hub.has_subscribers(sensor_id):
+                return
+            sensor_id, frame = sse_frame(payload)
+        except (ValueError, KeyError, IndexError):
+            logger.warning("Payload de NOTIFY inválido: %.200s", payload)
+            return
+
+        self.hub.publish_threadsafe(sensor_id, frame)
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "notifications": self.notifications,
+            "reconnects": self.reconnects,
+        }
+
+
+live_hub = LiveHub(
+    queue_size=settings.LIVE_QUEUE_SIZE,
+    max_subscribers=settings.LIVE_MAX_SUBSCRIBERS
+)
+live_listener = NotifyListener(live_hub)
@@ -0,0 +1,335 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Métricas do worker em memória, expostas em /metrics (Prometheus):
+# latência e status por rota (middleware), consultas e tempo de banco
+# (eventos da engine, atribuídos à requisição corrente via ContextVar) e
+# espera por conexão do pool. Cada worker tem os próprios números; o
+# Prometheus soma por instância.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+POOL_WAIT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+QUERIES_PER_REQUEST_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_STATEMENT_MAX_CHARS = 1000
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # Balde "le" conta valores <= limite; o último é +Inf
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    # Acumulado durante uma requisição (a thread do threadpool enxerga o
+    # mesmo objeto: o contexto é copiado, não o valor)
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self, keep_statements: bool):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = [] if keep_statements else None
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}          # (method, route, status) -> contagem
+        self.latency = {}           # (method, route) -> Histogram
+        self.request_queries = {}   # (method, route) -> Histogram (consultas/requisição)
+        self.request_db = {}        # (method, route) -> segundos no banco
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.query_errors = 0
+        self.pool_wait = {}         # engine -> Histogram
+        self.pool_timeouts = {}     # engine -> contagem
+        self.engines = {}           # nome -> engine (tamanho do pool na coleta)
+        self.limiters = {}          # nome -> TokenBucketLimiter (contadores na coleta)
+        self.device_coalesced = 0   # leituras aceitas sem gravar (limite do sensor)
+
+    def observe_request(self, method: str, route: str, status: int,
+                        seconds: float | None, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            status_key = (method, route, status)
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+
+            # Streams (SSE) ficam fora do histograma: duram minutos
+            if seconds is not None:
+                latency = self.latency.get(key)
+                if latency is None:
+                    latency = self.latency[key] = Histogram(LATENCY_BUCKETS)
+                latency.observe(seconds)
+
+            queries = self.request_queries.get(key)
+            if queries is None:
+                queries = self.request_queries[key] = Histogram(QUERIES_PER_REQUEST_BUCKETS)
+            queries.observe(stats.queries)
+            self.request_db[key] = self.request_db.get(key, 0.0) + stats.db_seconds
+
+    def observe_query(self, seconds: float):
+        with self._lock:
+            self.queries.observe(seconds)
+
+    def observe_query_error(self):
+        with self._lock:
+            self.query_errors += 1
+
+    def observe_device_coalesced(self):
+        with self._lock:
+            self.device_coalesced += 1
+
+    def observe_pool_wait(self, name: str, seconds: float, timed_out: bool):
+        with self._lock:
+            wait = self.pool_wait.get(name)
+            if wait is None:
+                wait = self.pool_wait[name] = Histogram(POOL_WAIT_BUCKETS)
+            wait.observe(seconds)
+            if timed_out:
+                self.pool_timeouts[name] = self.pool_timeouts.get(name, 0) + 1
+
+    def render(self) -> str:
+        with self._lock:
+            lines = []
+            self._counter(lines, "http_requests_total", "Requisições por rota e status",
+                          ("method", "route", "status"), self.requests)
+            self._histograms(lines, "http_request_duration_seconds", "Latência por rota",
+                             ("method", "route"), self.latency)
+            self._histograms(lines, "http_request_db_queries", "Consultas SQL por requisição",
+                             ("method", "route"), self.request_queries)
+            self._counter(lines, "http_request_db_seconds_total",
+                          "Tempo no banco das requisições, por rota",
+                          ("method", "route"), self.request_db)
+            self._histograms(lines, "db_query_duration_seconds",
+                             "Duração das consultas SQL (todas, inclusive fora de requisições)",
+                             (), {(): self.queries})
+            self._counter(lines, "db_query_errors_total", "Consultas SQL com erro",
+                          (), {(): self.query_errors})
+            self._histograms(lines, "db_pool_checkout_wait_seconds",
+                             "Espera por conexão do pool (inclui abrir conexão nova)",
+                             ("engine",), {(k,): v for k, v in self.pool_wait.items()})
+            self._counter(lines, "db_pool_timeouts_total", "Checkouts que estouraram DB_POOL_TIMEOUT",
+                          ("engine",), {(k,): v for k, v in self.pool_timeouts.items()})
+            self._counter(lines, "device_readings_coalesced_total",
+                          "Leituras acima do limite do sensor aceitas sem gravar",
+                          (), {(): self.device_coalesced})
+
+        self._pool_gauges(lines)
+        self._limiters(lines)
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _counter(lines, name, help_text, label_names, values: dict):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for labels, value in sorted(values.items()):
+            suffix = f"{{{_labels(label_names, labels)}}}" if label_names else ""
+            lines.append(f"{name}{suffix} {_number(value)}")
+
+    @staticmethod
+    def _histograms(lines, name, help_text, label_names, histograms: dict):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in sorted(histograms.items()):
+            base = _labels(label_names, labels)
+            prefix = base + "," if base else ""
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            suffix = f"{{{base}}}" if base else ""
+            lines.append(f"{name}_sum{suffix} {_number(histogram.sum)}")
+            lines.append(f"{name}_count{suffix} {histogram.count}")
+
+    def _pool_gauges(self, lines):
+        # Lidos na hora da coleta (engine.pool muda depois de um dispose)
+        gauges = {
+            "db_pool_size": ("Conexões fixas do pool", "size"),
+            "db_pool_checked_out": ("Conexões em uso", "checkedout"),
+            "db_pool_overflow": ("Conexões além de pool_size (negativo = vagas ainda não abertas)", "overflow"),
+        }
+        for name, (help_text, method) in gauges.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for engine_name, engine in sorted(self.engines.items()):
+                value = getattr(engine.pool, method, None)
+                if value is not None:
+                    lines.append(f'{name}{{engine="{engine_name}"}} {value()}')
+
+
+    def _limiters(self, lines):
+        stats = {(name,): limiter.stats() for name, limiter in sorted(self.limiters.items())}
+        series = {
+            "rate_limit_allowed_total": ("Requisições liberadas pelo limite", "counter", "allowed"),
+            "rate_limit_rejected_total": ("Requisições acima do limite", "counter", "rejected"),
+            "rate_limit_keys": ("Chaves (IPs, emails, sensores) em memória", "gauge", "size"),
+        }
+        for name, (help_text, kind, field) in series.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (limiter_name,), values in stats.items():
+                lines.append(f'{name}{{limiter="{limiter_name}"}} {values[field]}')
+
+
+metrics = Metrics()
+
+
+# -----------------------------------------
+# Pool instrumentado
+# -----------------------------------------
+
+def _timed_checkout(name: str, do_get):
+    started = time.perf_counter()
+    timed_out = False
+    try:
+        return do_get()
+    except PoolTimeoutError:
+        timed_out = True
+        raise
+    finally:
+        metrics.observe_pool_wait(name, time.perf_counter() - started, timed_out)
+
+
+class InstrumentedQueuePool(QueuePool):
+    def _do_get(self):
+        return _timed_checkout("sync", super()._do_get)
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        return _timed_checkout("async", super()._do_get)
+
+
+# -----------------------------------------
+# Eventos da engine
+# -----------------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["metrics_started"].pop()
+    elapsed = time.perf_counter() - started
+    metrics.observe_query(elapsed)
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if (stats.statements is not None
+                and len(stats.statements) < settings.METRICS_SLOW_REQUEST_MAX_STATEMENTS):
+            stats.statements.append((elapsed, statement))
+
+
+def _handle_error(context):
+    # Consulta que falhou não chega ao after_cursor_execute
+    started = context.connection.info.get("metrics_started") if context.connection else None
+    if started:
+        started.pop()
+    metrics.observe_query_error()
+
+
+def instrument_engine(engine, name: str):
+    # `engine` síncrona (para a assíncrona, passar async_engine.sync_engine)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    metrics.engines[name] = engine
+
+
+# -----------------------------------------
+# Middleware
+# -----------------------------------------
+
+def _log_slow_request(method: str, path: str, seconds: float, status: int, stats: RequestStats):
+    statements = "".join(
+        f"\n  {elapsed * 1000:8.1f} ms  {' '.join(statement.split())[:_STATEMENT_MAX_CHARS]}"
+        for elapsed, statement in stats.statements
+    )
+    logger.warning(
+        "Requisição lenta: %s %s -> %s em %.1f ms; %d consultas, %.1f ms no banco%s",
+        method, path, status, seconds * 1000, stats.queries, stats.db_seconds * 1000,
+        statements
+    )
+
+
+class MetricsMiddleware:
+    # ASGI puro (sem BaseHTTPMiddleware): não copia o corpo nem troca de task
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        slow_ms = settings.METRICS_SLOW_REQUEST_MS
+        stats = RequestStats(keep_statements=slow_ms > 0)
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        response = {"status": 500, "stream": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"content-type" and value.startswith(b"text/event-stream"):
+                        response["stream"] = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            elapsed = time.perf_counter() - started
+
+            # Rota sem match (404) fica agrupada: o caminho cru explodiria
+            # o número de séries
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+
+            metrics.observe_request(
+                scope["method"], route_path, response["status"],
+                None if response["stream"] else elapsed, stats
+            )
+            if slow_ms > 0 and elapsed * 1000 >= slow_ms and not response["stream"]:
+                _log_slow_request(scope["method"], scope["path"], elapsed,
+                                  response["status"], stats)
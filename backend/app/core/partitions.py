@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.config import settings
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+# As funções SQL usadas aqui são criadas pela migração d99be77b505b
+# (versão timestamptz na 24be2e8b741c)
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def ensure_future_partitions(conn, months_ahead: int = None) -> list[str]:
+    # Garante as partições do mês atual até months_ahead meses à frente
+    if months_ahead is None:
+        months_ahead = settings.READINGS_PARTITIONS_AHEAD
+
+    current = datetime.utcnow().date().replace(day=1)
+    created = []
+
+    for offset in range(months_ahead + 1):
+        name = conn.execute(
+            text("SELECT sensor_readings_create_partition(:month)"),
+            {"month": _add_months(current, offset)}
+        ).scalar()
+        created.append(name)
+
+    return created
+
+
+def drop_expired_partitions(conn, retention_months: int = None) -> list[str]:
+    # Retenção: remove partições inteiras em vez de rodar DELETEs
+    if retention_months is None:
+        retention_months = settings.READINGS_RETENTION_MONTHS
+
+    if retention_months <= 0:
+        return []
+
+    current = datetime.utcnow().date().replace(day=1)
+    cutoff = _add_months(current, -retention_months)
+
+    rows = conn.execute(
+        text("SELECT sensor_readings_drop_partitions(:cutoff)"),
+        {"cutoff": datetime(cutoff.year, cutoff.month, 1, tzinfo=timezone.utc)}
+    ).all()
+
+    return [row[0] for row in rows]
+
+
+def run_partition_maintenance():
+    try:
+        with engine.begin() as conn:
+            created = ensure_future_partitions(conn)
+            dropped = drop_expired_partitions(conn)
+    except SQLAlchemyError:
+        # Outro worker pode estar criando a mesma partição; a DEFAULT cobre o intervalo
+        logger.exception("Falha na manutenção das partições de sensor_readings")
+        return
+
+    logger.info("Partições garantidas: %s; removidas: %s", created, dropped)
+
+
+async def partition_maintenance_loop():
+    # Roda no lifespan da aplicação: cria as partições futuras periodicamente
+    interval = settings.PARTITION_MAINTENANCE_INTERVAL_HOURS * 3600
+
+    while True:
+        await run_in_threadpool(run_partition_maintenance)
+
+        if interval <= 0:
+            return
+
+        await asyncio.sleep(interval)
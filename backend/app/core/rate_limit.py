@@ -0,0 +1,84 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from fastapi import HTTPException
+
+
+# Token bucket em memória (por worker), uma conta por chave (IP, email,
+# sensor...). Cada chave guarda até `burst` fichas, repostas a `rate` por
+# segundo; cada requisição gasta `cost`. O(1) por chamada. Passando de
+# maxsize saem as chaves menos usadas: um balde esquecido volta cheio, o
+# que só favorece o cliente.
+class TokenBucketLimiter:
+    def __init__(self, rate: float, burst: float, maxsize: int):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def acquire(self, key, cost: float = 1.0,
+                rate: float | None = None, burst: float | None = None) -> float:
+        # Devolve 0 se liberou, ou quantos segundos faltam para haver fichas.
+        # rate/burst sobrepõem o padrão para esta chave; rate <= 0 = sem limite
+        rate = self.rate if rate is None else rate
+        burst = self.burst if burst is None else burst
+        if rate <= 0:
+            return 0.0
+
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                tokens = burst
+            else:
+                tokens, updated = entry
+                tokens = min(burst, tokens + (now - updated) * rate)
+                self._data.move_to_end(key)
+
+            if tokens >= cost:
+                self._data[key] = (tokens - cost, now)
+                self.allowed += 1
+                wait = 0.0
+            else:
+                self._data[key] = (tokens, now)
+                self.rejected += 1
+                wait = (cost - tokens) / rate
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+        return wait
+
+    def reset(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "allowed": self.allowed,
+                "rejected": self.rejected,
+                "evictions": self.evictions,
+            }
+
+
+def too_many_requests(wait: float, detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(wait)))}
+    )
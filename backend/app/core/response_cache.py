@@ -0,0 +1,228 @@
+import hashlib
+import itertools
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import NamedTuple
+from fastapi import Request, Response
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.fast_json import FastJSONResponse, dumps
+
+logger = logging.getLogger(__name__)
+
+# Cache das respostas de gráfico/dashboard por (usuário, sensor, rota,
+# parâmetros). Cada sensor tem uma versão, incrementada depois do commit
+# de leituras novas (ou de mudanças no sensor): entrada de versão antiga é
+# recalculada. A chave inclui a hora UTC atual, porque as janelas móveis
+# ("hoje", "últimos 7 dias") mudam sozinhas com o tempo.
+#
+# ETag é o hash do corpo: se nada mudou para o cliente, o If-None-Match
+# devolve 304 — direto do cache, sem ir ao banco.
+#
+# Backend "memory" é por worker (a versão só muda no worker que gravou;
+# o TTL limita por quanto tempo os outros servem a resposta antiga).
+# Com vários workers, use "redis".
+#
+# No "memory" as versões ficam num LRU do mesmo tamanho das respostas.
+# Versão não é contador por sensor, é um número global sempre novo: se a
+# do sensor saiu do LRU, a próxima consulta recebe outra e nenhuma
+# entrada antiga confere (ausente conta como "mudou").
+
+
+class CachedResponse(NamedTuple):
+    version: int
+    etag: str
+    last_modified: datetime
+    body: bytes
+
+
+class MemoryBackend:
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _version(self, sensor_id) -> int:
+        version = self._versions.get(sensor_id)
+        if version is None:
+            with self._lock:
+                version = self._versions.get(sensor_id)
+                if version is None:
+                    version = next(self._counter)
+                    self._versions.set(sensor_id, version)
+        return version
+
+    def lookup(self, sensor_id, key: str):
+        return self._version(sensor_id), self.entries.get(key)
+
+    def store(self, key: str, entry: CachedResponse):
+        self.entries.set(key, entry)
+
+    def bump(self, sensor_ids):
+        with self._lock:
+            for sensor_id in sensor_ids:
+                self._versions.set(sensor_id, next(self._counter))
+
+    def stats(self) -> dict:
+        versions = self._versions.stats()
+        return {
+            "backend": "memory",
+            "sensors": versions["size"],
+            "version_evictions": versions["evictions"],
+            **self.entries.stats()
+        }
+
+
+class RedisBackend:
+    # Versões e entradas compartilhadas entre workers. Redis fora do ar não
+    # derruba as rotas: a resposta é calculada sem cache.
+    def __init__(self, url: str, ttl: float):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requer o pacote redis")
+
+        self.errors_type = redis.RedisError
+        self.client = redis.Redis.from_url(url)
+        self.ttl = max(1, int(ttl))
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def _version_key(sensor_id) -> str:
+        return f"response-cache:version:{sensor_id}"
+
+    @staticmethod
+    def _entry_key(key: str) -> str:
+        return f"response-cache:entry:{key}"
+
+    def lookup(self, sensor_id, key: str):
+        try:
+            version, raw = self.client.mget(self._version_key(sensor_id), self._entry_key(key))
+        except self.errors_type:
+            self.errors += 1
+            logger.warning("Redis indisponível para o cache de respostas", exc_info=True)
+            return None, None
+
+        entry = None
+        if raw is not None:
+            header, body = raw.split(b"\n", 1)
+            entry_version, etag, last_modified = json.loads(header)
+            entry = CachedResponse(
+                entry_version, etag,
+                datetime.fromtimestamp(last_modified, timezone.utc), body
+            )
+
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return int(version or 0), entry
+
+    def store(self, key: str, entry: CachedResponse):
+        header = json.dumps([entry.version, entry.etag, entry.last_modified.timestamp()])
+        try:
+            self.client.set(self._entry_key(key), header.encode() + b"\n" + entry.body, ex=self.ttl)
+        except self.errors_type:
+            self.errors += 1
+            logger.warning("Falha ao gravar no cache de respostas", exc_info=True)
+
+    def bump(self, sensor_ids):
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for sensor_id in sensor_ids:
+                pipe.incr(self._version_key(sensor_id))
+            pipe.execute()
+        except self.errors_type:
+            self.errors += 1
+            logger.warning("Falha ao invalidar o cache de respostas", exc_info=True)
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+
+def _backend():
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        return RedisBackend(settings.RESPONSE_CACHE_REDIS_URL, settings.RESPONSE_CACHE_TTL)
+    return MemoryBackend(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL)
+
+
+response_cache = _backend()
+
+
+def invalidate_sensor_responses(sensor_ids):
+    # Chamar depois do commit: antes dele, uma requisição concorrente
+    # poderia guardar dados antigos já com a versão nova
+    if settings.RESPONSE_CACHE_ENABLED and sensor_ids:
+        response_cache.bump(set(sensor_ids))
+
+
+def _cache_key(request: Request, user, sensor_id) -> str:
+    # Ordem dos parâmetros na URL não importa
+    query = sorted(request.query_params.multi_items())
+    hour = int(time.time() // 3600)
+    return f"{user.id}:{sensor_id}:{request.url.path}:{query}:{hour}"
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Comparação fraca (RFC 9110): W/"x" equivale a "x"
+    candidates = [value.strip().removeprefix("W/") for value in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _not_modified(request: Request, entry: CachedResponse) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, entry.etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return entry.last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+def cached_response(request: Request, user, sensor_id, compute) -> Response:
+    # `compute` devolve o conteúdo da rota e só roda em cache miss; se ele
+    # levantar HTTPException (ex.: sensor de outro usuário), nada é gravado
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return FastJSONResponse(compute())
+
+    key = _cache_key(request, user, sensor_id)
+    version, entry = response_cache.lookup(sensor_id, key)
+
+    if entry is None or entry.version != version:
+        body = dumps(compute())
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+        # Recalculado sem mudança visível: mantém ETag e Last-Modified
+        if entry is not None and entry.etag == etag:
+            last_modified = entry.last_modified
+        else:
+            last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+        entry = CachedResponse(version or 0, etag, last_modified, body)
+        if version is not None:
+            response_cache.store(key, entry)
+
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": format_datetime(entry.last_modified, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+
+    return Response(entry.body, media_type="application/json", headers=headers)
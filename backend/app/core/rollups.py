@@ -0,0 +1,502 @@
+from datetime import datetime, timedelta
+from sqlalchemy import Float, case, cast, func, literal_column, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.timeutils import to_utc
+from app.models.sensor_reading import SensorReading
+from app.models.sensor_reading_rollup import (
+    SensorReadingHourly, SensorReadingDaily, SensorReadingMonthly
+)
+
+# -----------------------------------------
+# Atualização incremental (na ingestão)
+# -----------------------------------------
+
+
+def _hour(ts: datetime) -> datetime:
+    return to_utc(ts).replace(minute=0, second=0, microsecond=0)
+
+
+def _day(ts: datetime) -> datetime:
+    return to_utc(ts).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _month(ts: datetime) -> datetime:
+    return _day(ts).replace(day=1)
+
+
+def _next_month(ts: datetime) -> datetime:
+    if ts.month == 12:
+        return ts.replace(year=ts.year + 1, month=1)
+    return ts.replace(month=ts.month + 1)
+
+
+def _aggregate(rows: list[dict], truncate) -> list[dict]:
+    buckets = {}
+
+    for row in rows:
+        key = (row["sensor_id"], truncate(row["timestamp"]))
+        agg = buckets.get(key)
+
+        if agg is None:
+            agg = buckets[key] = {
+                "sensor_id": key[0],
+                "bucket": key[1],
+                "sample_count": 0,
+                "energy_kwh_sum": 0.0,
+                "energy_kwh_count": 0,
+                "power_w_sum": 0.0,
+                "power_w_count": 0,
+                "power_w_min": None,
+                "power_w_max": None,
+            }
+
+        agg["sample_count"] += 1
+
+        energy = row.get("energy_kwh")
+        if energy is not None:
+            agg["energy_kwh_sum"] += energy
+            agg["energy_kwh_count"] += 1
+
+        power = row.get("power_w")
+        if power is not None:
+            agg["power_w_sum"] += power
+            agg["power_w_count"] += 1
+            if agg["power_w_min"] is None or power < agg["power_w_min"]:
+                agg["power_w_min"] = power
+            if agg["power_w_max"] is None or power > agg["power_w_max"]:
+                agg["power_w_max"] = power
+
+    # Ordem fixa das chaves evita deadlock entre upserts concorrentes
+    return [buckets[key] for key in sorted(buckets, key=lambda k: (str(k[0]), k[1]))]
+
+
+def _upsert(model, values: list[dict]):
+    stmt = pg_insert(model).values(values)
+    new = stmt.excluded
+
+    return stmt.on_conflict_do_update(
+        index_elements=[model.sensor_id, model.bucket],
+        set_={
+            "sample_count": model.sample_count + new.sample_count,
+            "energy_kwh_sum": model.energy_kwh_sum + new.energy_kwh_sum,
+            "energy_kwh_count": model.energy_kwh_count + new.energy_kwh_count,
+            "power_w_sum": model.power_w_sum + new.power_w_sum,
+            "power_w_count": model.power_w_count + new.power_w_count,
+            # least/greatest ignoram NULL
+            "power_w_min": func.least(model.power_w_min, new.power_w_min),
+            "power_w_max": func.greatest(model.power_w_max, new.power_w_max),
+        }
+    )
+
+
+def rollup_upserts(rows: list[dict]) -> list:
+    if not rows:
+        return []
+
+    return [
+        _upsert(SensorReadingHourly, _aggregate(rows, _hour)),
+        _upsert(SensorReadingDaily, _aggregate(rows, _day)),
+        _upsert(SensorReadingMonthly, _aggregate(rows, _month)),
+    ]
+
+
+def apply_rollups(db: Session, rows: list[dict]):
+    # Roda na mesma transação do INSERT das leituras
+    for stmt in rollup_upserts(rows):
+        db.execute(stmt)
+
+
+async def apply_rollups_async(db: AsyncSession, rows: list[dict]):
+    for stmt in rollup_upserts(rows):
+        await db.execute(stmt)
+
+
+# -----------------------------------------
+# Leitura (rotas de gráfico)
+# -----------------------------------------
+
+
+# Colunas comuns às três tabelas de agregados
+_ROLLUP_COLUMNS = (
+    "sensor_id", "bucket", "sample_count",
+    "energy_kwh_sum", "energy_kwh_count",
+    "power_w_sum", "power_w_count", "power_w_min", "power_w_max",
+)
+
+
+def _present(column):
+    return case((column.is_not(None), literal_column("1")), else_=literal_column("0"))
+
+
+def _raw_columns():
+    # Cada leitura crua como uma linha de agregado de uma amostra, para os
+    # trechos que não cabem em horas UTC inteiras
+    r = SensorReading
+    energy, power = cast(r.energy_kwh, Float), cast(r.power_w, Float)
+    return (
+        r.sensor_id,
+        r.timestamp.label("bucket"),
+        literal_column("1").label("sample_count"),
+        func.coalesce(energy, literal_column("0")).label("energy_kwh_sum"),
+        _present(r.energy_kwh).label("energy_kwh_count"),
+        func.coalesce(power, literal_column("0")).label("power_w_sum"),
+        _present(r.power_w).label("power_w_count"),
+        power.label("power_w_min"),
+        power.label("power_w_max"),
+    )
+
+
+def _columns(model):
+    if model is SensorReading:
+        return _raw_columns()
+    return [getattr(model, name) for name in _ROLLUP_COLUMNS]
+
+
+def _time(model):
+    return model.timestamp if model is SensorReading else model.bucket
+
+
+def _raw(start: datetime, end: datetime):
+    return [(SensorReading, start, end)] if start < end else []
+
+
+def _hours(start: datetime, end: datetime):
+    return [(SensorReadingHourly, start, end)] if start < end else []
+
+
+def _days_and_hours(start: datetime, end: datetime):
+    first = _day(start)
+    if first < start:
+        first += timedelta(days=1)
+    last = _day(end)
+
+    if first < last:
+        return _hours(start, first) + [(SensorReadingDaily, first, last)] + _hours(last, end)
+    return _hours(start, end)
+
+
+def _whole_hours(start: datetime, end: datetime):
+    first = _month(start)
+    if first < start:
+        first = _next_month(first)
+    last = _month(end)
+
+    if first < last:
+        return (
+            _days_and_hours(start, first)
+            + [(SensorReadingMonthly, first, last)]
+            + _days_and_hours(last, end)
+        )
+    return _days_and_hours(start, end)
+
+
+def rollup_segments(start: datetime, end: datetime):
+    # Cobre [start, end) com o mínimo de linhas: meses inteiros na tabela
+    # mensal, dias inteiros na diária e horas na horária. Limites fora da
+    # hora cheia (fusos de +05:30, +09:30, +05:45...) não cabem em nenhuma
+    # linha de agregado: as frações de hora nas pontas vêm das leituras cruas.
+    start, end = to_utc(start), to_utc(end)
+    first = _hour(start)
+    if first < start:
+        first += timedelta(hours=1)
+    last = _hour(end)
+
+    if first < last:
+        return _raw(start, first) + _whole_hours(first, last) + _raw(last, end)
+    return _raw(start, end)
+
+
+def _merge(segments):
+    # Une vizinhos da mesma tabela
+    merged = []
+    for model, start, end in segments:
+        if merged and merged[-1][0] is model and merged[-1][2] == start:
+            merged[-1] = (model, merged[-1][1], end)
+        else:
+            merged.append((model, start, end))
+    return merged
+
+
+def bucket_segments(edges: list[datetime]):
+    # Segmentos de cada balde [edges[i], edges[i+1]). Nenhuma linha de
+    # agregado atravessa o limite de um balde, então agrupar pelo início da
+    # linha (date_trunc local) é exato.
+    return _merge(
+        segment
+        for bucket_start, bucket_end in zip(edges, edges[1:])
+        for segment in rollup_segments(bucket_start, bucket_end)
+    )
+
+
+def hour_segments(edges: list[datetime]):
+    # Para agrupar por hora local: a hora local só coincide com a linha da
+    # tabela horária nos dias [edges[i], edges[i+1]) que começam e terminam
+    # em hora UTC cheia; nos demais (fuso de meia hora ou de 45 min, ou dia
+    # de troca para um deles) o dia inteiro vem das leituras cruas.
+    return _merge(
+        (
+            SensorReadingHourly if _hour(start) == start and _hour(end) == end
+            else SensorReading,
+            start, end
+        )
+        for start, end in zip(edges, edges[1:])
+    )
+
+
+def rollup_union(segments, where=None):
+    # Subconsulta com as colunas dos agregados (UNION ALL dos segmentos);
+    # `where` recebe a tabela e devolve filtros extras (ex.: sensores)
+    parts = [
+        select(*_columns(model))
+        .where(
+            _time(model) >= start,
+            _time(model) < end,
+            *(where(model) if where else ())
+        )
+        for model, start, end in segments
+    ]
+    if len(parts) == 1:
+        return parts[0].subquery("rollup")
+    return union_all(*parts).subquery("rollup")
+
+
+def _sum(column, where=None):
+    # `where` vira FILTER (WHERE ...) para agregar várias janelas numa só passada
+    total = func.sum(column)
+    return total.filter(where) if where is not None else total
+
+
+def avg_power(model, where=None):
+    return _sum(model.power_w_sum, where) / func.nullif(_sum(model.power_w_count, where), 0)
+
+
+def total_energy(model, where=None):
+    return case(
+        (_sum(model.energy_kwh_count, where) > 0, _sum(model.energy_kwh_sum, where))
+    )
+
+
+def avg_energy(model, where=None):
+    return _sum(model.energy_kwh_sum, where) / func.nullif(_sum(model.energy_kwh_count, where), 0)
+
+
+# -----------------------------------------
+# Backfill e verificação de consistência
+# -----------------------------------------
+
+# O backfill apaga os baldes do intervalo e os refaz das leituras cruas
+# (sem ON CONFLICT): balde cujas leituras sumiram (partição removida,
+# retenção) deixa de existir. Roda com sensor_readings travada em SHARE:
+# a ingestão (INSERT + incremento dos agregados na mesma transação) espera
+# o commit, em vez de ter o incremento sobrescrito pelo recálculo.
+
+_LOCK_READINGS = "LOCK TABLE sensor_readings IN SHARE MODE"
+
+_DELETE_BUCKETS = "DELETE FROM {table} WHERE bucket >= :start AND bucket < :end"
+
+_RAW_TO_HOURLY = """
+INSERT INTO sensor_readings_hourly (
+    sensor_id, bucket, sample_count,
+    energy_kwh_sum, energy_kwh_count,
+    power_w_sum, power_w_count, power_w_min, power_w_max
+)
+SELECT
+    sensor_id,
+    date_trunc('hour', "timestamp", 'UTC'),
+    count(*),
+    coalesce(sum(energy_kwh::float8), 0), count(energy_kwh),
+    coalesce(sum(power_w::float8), 0), count(power_w), min(power_w), max(power_w)
+FROM sensor_readings
+WHERE "timestamp" >= :start AND "timestamp" < :end
+GROUP BY 1, 2
+"""
+
+_HOURLY_TO_DAILY = """
+INSERT INTO sensor_readings_daily (
+    sensor_id, bucket, sample_count,
+    energy_kwh_sum, energy_kwh_count,
+    power_w_sum, power_w_count, power_w_min, power_w_max
+)
+SELECT
+    sensor_id,
+    date_trunc('day', bucket, 'UTC'),
+    sum(sample_count),
+    sum(energy_kwh_sum), sum(energy_kwh_count),
+    sum(power_w_sum), sum(power_w_count), min(power_w_min), max(power_w_max)
+FROM sensor_readings_hourly
+WHERE bucket >= :start AND bucket < :end
+GROUP BY 1, 2
+"""
+
+# Diferenças entre o agregado das leituras cruas e a tabela horária.
+# As medidas são real (float4): a tolerância da energia é relativa.
+_CHECK_HOURLY = """
+WITH raw AS (
+    SELECT
+        sensor_id,
+        date_trunc('hour', "timestamp", 'UTC') AS bucket,
+        count(*) AS sample_count,
+        coalesce(sum(energy_kwh::float8), 0) AS energy_kwh_sum
+    FROM sensor_readings
+    WHERE "timestamp" >= :start AND "timestamp" < :end
+    GROUP BY 1, 2
+),
+rollup AS (
+    SELECT sensor_id, bucket, sample_count, energy_kwh_sum
+    FROM sensor_readings_hourly
+    WHERE bucket >= :start AND bucket < :end
+)
+SELECT
+    coalesce(raw.sensor_id, rollup.sensor_id) AS sensor_id,
+    coalesce(raw.bucket, rollup.bucket) AS bucket,
+    raw.sample_count AS raw_count,
+    rollup.sample_count AS rollup_count,
+    raw.energy_kwh_sum AS raw_energy_kwh,
+    rollup.energy_kwh_sum AS rollup_energy_kwh
+FROM raw
+FULL OUTER JOIN rollup
+    ON raw.sensor_id = rollup.sensor_id AND raw.bucket = rollup.bucket
+WHERE raw.sample_count IS DISTINCT FROM rollup.sample_count
+   OR abs(coalesce(raw.energy_kwh_sum, 0) - coalesce(rollup.energy_kwh_sum, 0))
+      > :tolerance * greatest(1, abs(raw.energy_kwh_sum))
+ORDER BY 2, 1
+"""
+
+_DAILY_TO_MONTHLY = """
+INSERT INTO sensor_readings_monthly (
+    sensor_id, bucket, sample_count,
+    energy_kwh_sum, energy_kwh_count,
+    power_w_sum, power_w_count, power_w_min, power_w_max
+)
+SELECT
+    sensor_id,
+    date_trunc('month', bucket, 'UTC'),
+    sum(sample_count),
+    sum(energy_kwh_sum), sum(energy_kwh_count),
+    sum(power_w_sum), sum(power_w_count), min(power_w_min), max(power_w_max)
+FROM sensor_readings_daily
+WHERE bucket >= :start AND bucket < :end
+GROUP BY 1, 2
+"""
+
+# Diferenças entre a tabela diária e a soma das horas de cada dia
+_CHECK_DAILY = """
+WITH hourly AS (
+    SELECT
+        sensor_id,
+        date_trunc('day', bucket, 'UTC') AS bucket,
+        sum(sample_count) AS sample_count
+    FROM sensor_readings_hourly
+    WHERE bucket >= :start AND bucket < :end
+    GROUP BY 1, 2
+),
+daily AS (
+    SELECT sensor_id, bucket, sample_count
+    FROM sensor_readings_daily
+    WHERE bucket >= :start AND bucket < :end
+)
+SELECT
+    coalesce(hourly.sensor_id, daily.sensor_id) AS sensor_id,
+    coalesce(hourly.bucket, daily.bucket) AS bucket,
+    hourly.sample_count AS hourly_count,
+    daily.sample_count AS daily_count
+FROM hourly
+FULL OUTER JOIN daily
+    ON hourly.sensor_id = daily.sensor_id AND hourly.bucket = daily.bucket
+WHERE hourly.sample_count IS DISTINCT FROM daily.sample_count
+ORDER BY 2, 1
+"""
+
+# Diferenças entre a tabela mensal e a soma dos dias de cada mês
+_CHECK_MONTHLY = """
+WITH daily AS (
+    SELECT
+        sensor_id,
+        date_trunc('month', bucket, 'UTC') AS bucket,
+        sum(sample_count) AS sample_count
+    FROM sensor_readings_daily
+    WHERE bucket >= :start AND bucket < :end
+    GROUP BY 1, 2
+),
+monthly AS (
+    SELECT sensor_id, bucket, sample_count
+    FROM sensor_readings_monthly
+    WHERE bucket >= :start AND bucket < :end
+)
+SELECT
+    coalesce(daily.sensor_id, monthly.sensor_id) AS sensor_id,
+    coalesce(daily.bucket, monthly.bucket) AS bucket,
+    daily.sample_count AS daily_count,
+    monthly.sample_count AS monthly_count
+FROM daily
+FULL OUTER JOIN monthly
+    ON daily.sensor_id = monthly.sensor_id AND daily.bucket = monthly.bucket
+WHERE daily.sample_count IS DISTINCT FROM monthly.sample_count
+ORDER BY 2, 1
+"""
+
+
+def _whole_months(start: datetime, end: datetime):
+    start, end = to_utc(start), to_utc(end)
+    end_month = _month(end)
+    if end_month != end:
+        end_month = _next_month(end_month)
+    return _month(start), end_month
+
+
+def _whole_days(start: datetime, end: datetime):
+    # Estende [start, end) para dias inteiros (UTC)
+    start, end = to_utc(start), to_utc(end)
+    end_day = _day(end)
+    if end_day != end:
+        end_day += timedelta(days=1)
+    return _day(start), end_day
+
+
+def _rebuild(conn, table: str, insert: str, start: datetime, end: datetime):
+    params = {"start": start, "end": end}
+    conn.execute(text(_DELETE_BUCKETS.format(table=table)), params)
+    conn.execute(text(insert), params)
+
+
+def backfill_rollups(conn, start: datetime, end: datetime):
+    # Recalcula os agregados a partir das leituras cruas. Tudo numa só
+    # transação (a de `conn`): o lock vale até o commit de quem chamou
+    conn.execute(text(_LOCK_READINGS))
+
+    days_start, days_end = _whole_days(start, end)
+    _rebuild(conn, "sensor_readings_hourly", _RAW_TO_HOURLY, days_start, days_end)
+    _rebuild(conn, "sensor_readings_daily", _HOURLY_TO_DAILY, days_start, days_end)
+
+    # Meses tocados pelo intervalo, refeitos a partir da tabela diária
+    months_start, months_end = _whole_months(start, end)
+    _rebuild(conn, "sensor_readings_monthly", _DAILY_TO_MONTHLY, months_start, months_end)
+
+
+def check_rollups(conn, start: datetime, end: datetime, tolerance: float = 1e-6):
+    start, end = _whole_days(start, end)
+
+    hourly = conn.execute(
+        text(_CHECK_HOURLY),
+        {"start": start, "end": end, "tolerance": tolerance}
+    ).mappings().all()
+
+    daily = conn.execute(
+        text(_CHECK_DAILY),
+        {"start": start, "end": end}
+    ).mappings().all()
+
+    months_start, months_end = _whole_months(start, end)
+    monthly = conn.execute(
+        text(_CHECK_MONTHLY),
+        {"start": months_start, "end": months_end}
+    ).mappings().all()
+
+    return {
+        "hourly": [dict(r) for r in hourly],
+        "daily": [dict(r) for r in daily],
+        "monthly": [dict(r) for r in monthly],
+    }
@@ -1,13 +1,28 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import jwt
 
+from app.core.config import settings
+
 
 SECRET_KEY = "Uma senha super secreta"
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  
+ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Hashes com outro custo continuam válidos; verify_and_update devolve o
+# hash refeito com o custo atual
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
 
 
 def hash_password(password: str):
@@ -16,8 +31,91 @@ def hash_password(password: str):
 def verify_password(password: str, hashed: str):
     return pwd_context.verify(password, hashed)
 
+def verify_and_update(password: str, hashed: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(password, hashed)
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+# -----------------------------------------
+# Pool de processos do hash
+# -----------------------------------------
+
+# Argon2 ocupa CPU e memória por ~dezenas de ms; num processo à parte uma
+# rajada de logins não segura as threads das rotas síncronas (ingestão).
+# "spawn": o worker não herda threads nem conexões do servidor.
+
+class PasswordPoolBusy(Exception):
+    pass
+
+
+_executor: ProcessPoolExecutor | None = None
+_pending = 0
+_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor | None:
+    global _executor
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return None
+
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def _warm_up():
+    return None
+
+
+def start_password_pool():
+    # Sobe os workers já no startup: o primeiro login não paga o spawn
+    executor = _get_executor()
+    if executor is not None:
+        for _ in range(settings.PASSWORD_HASH_WORKERS):
+            executor.submit(_warm_up)
+
+
+def stop_password_pool():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def _run_in_pool(fn, *args):
+    global _executor, _pending
+    with _lock:
+        if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            raise PasswordPoolBusy()
+        _pending += 1
+
+    executor = _get_executor()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    except BrokenProcessPool:
+        # Worker morreu (ex.: OOM): o próximo pedido cria um pool novo
+        with _lock:
+            if _executor is executor:
+                _executor = None
+        raise
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_pool(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed: str) -> tuple[bool, str | None]:
+    return await _run_in_pool(verify_and_update, password, hashed)
@@ -0,0 +1,341 @@
+import fcntl
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.dead_letter import dead_letter
+from app.core.ingest import DB_UNAVAILABLE, write_isolating, write_readings
+from app.core.response_cache import invalidate_sensor_responses
+
+logger = logging.getLogger(__name__)
+
+# Spool local (append-only) das leituras para quando o banco está fora.
+#
+# Cada worker escreve no seu segmento "<ns>-<pid>.open", travado com flock.
+# Ao passar do tamanho máximo o segmento é renomeado para ".seg" (fechado).
+# Qualquer worker pode reprocessar um segmento fechado, ou um ".open" cujo
+# dono morreu (o flock solta junto com o processo).
+#
+# Registro: tamanho (4 bytes) + CRC32 (4 bytes) + JSON da linha. Um registro
+# cortado no fim do arquivo (queda no meio da escrita) é descartado.
+#
+# Nada no spool trava o reprocessamento: linha que não decodifica ou que o
+# banco recusa vai para o dead-letter; segmento corrompido no meio (ou que
+# falha por outro motivo que não o banco fora) é renomeado para
+# ".quarantine" e os seguintes continuam.
+
+_HEADER = struct.Struct(">II")
+
+
+def _encode_row(row: dict) -> bytes:
+    return json.dumps(row, default=str, separators=(",", ":")).encode()
+
+
+def _decode_row(payload: bytes) -> dict:
+    row = json.loads(payload)
+    row["sensor_id"] = UUID(row["sensor_id"])
+    row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    row.setdefault("seq", None)
+    row.pop("id", None)  # segmentos gravados antes da chave (sensor_id, timestamp)
+    return row
+
+
+class CorruptSegment(Exception):
+    pass
+
+
+def read_segment(path: Path):
+    # Devolve o payload de cada registro; a decodificação fica com quem lê
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(_HEADER.size)
+            if not header:
+                return
+            if len(header) < _HEADER.size:
+                logger.warning("Registro incompleto no fim de %s", path.name)
+                return
+
+            length, crc = _HEADER.unpack(header)
+            payload = f.read(length)
+
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                if f.read(1):
+                    # Há dados depois: não é escrita cortada, é arquivo danificado
+                    raise CorruptSegment(f"Registro corrompido no meio de {path.name}")
+                logger.warning("Registro corrompido no fim de %s; descartado", path.name)
+                return
+
+            yield payload
+
+
+def _try_lock(f) -> bool:
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+class Spool:
+    def __init__(self, directory: str, segment_bytes: int, fsync_interval: float):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._path: Path | None = None
+        self._dirty = False
+        self._last_fsync = 0.0
+
+        self.spooled = 0
+        self.replayed = 0
+        self.duplicates = 0
+        self.undecodable = 0
+        self.quarantined = 0
+
+    # -----------------------------------------
+    # Escrita
+    # -----------------------------------------
+
+    def _open_segment(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._path = self.directory / f"{time.time_ns():020d}-{os.getpid()}.open"
+        self._file = open(self._path, "ab")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+
+    def _sync(self):
+        if self._file is not None and self._dirty:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._dirty = False
+        self._last_fsync = time.monotonic()
+
+    def _close_segment(self):
+        # Renomeia ainda com o lock, depois solta
+        if self._file is None:
+            return
+        self._sync()
+        self._path.rename(self._path.with_suffix(".seg"))
+        self._file.close()
+        self._file = None
+        self._path = None
+
+    def append(self, rows: list[dict]):
+        data = bytearray()
+        for row in rows:
+            payload = _encode_row(row)
+            data += _HEADER.pack(len(payload), zlib.crc32(payload))
+            data += payload
+
+        with self._lock:
+            if self._file is None:
+                self._open_segment()
+
+            self._file.write(data)
+            self._dirty = True
+            self.spooled += len(rows)
+
+            # fsync em grupo: no máximo um a cada fsync_interval. Com
+            # intervalo > 0 o dispositivo recebe o OK antes do fsync (ver
+            # INGEST_SPOOL_FSYNC_INTERVAL); com 0, só depois
+            if time.monotonic() - self._last_fsync >= self.fsync_interval:
+                self._sync()
+            else:
+                self._file.flush()
+
+            if self._file.tell() >= self.segment_bytes:
+                self._close_segment()
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def rotate(self):
+        with self._lock:
+            self._close_segment()
+
+    def close(self):
+        self.rotate()
+
+    # -----------------------------------------
+    # Reprocessamento
+    # -----------------------------------------
+
+    def _recover_orphans(self):
+        # ".open" de processos que morreram: o flock está livre
+        for path in sorted(self.directory.glob("*.open")):
+            if path == self._path:
+                continue
+            try:
+                with open(path, "rb") as f:
+                    if _try_lock(f):
+                        path.rename(path.with_suffix(".seg"))
+            except FileNotFoundError:
+                continue
+
+    def pending(self) -> int:
+        if not self.directory.exists():
+            return 0
+        return sum(1 for _ in self.directory.glob("*.seg")) + (self._file is not None)
+
+    def replay(self, batch_size: int) -> int:
+        # Grava os segmentos fechados no banco e apaga os concluídos. Só o
+        # banco fora interrompe; os segmentos restantes ficam para a próxima vez.
+        if not self.directory.exists():
+            return 0
+
+        self.rotate()
+        self._recover_orphans()
+
+        total = 0
+        for path in sorted(self.directory.glob("*.seg")):
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                continue
+
+            with f:
+                if not _try_lock(f):
+                    continue  # outro worker está reprocessando
+                if not path.exists():
+                    continue
+
+                try:
+                    total += self._replay_segment(path, batch_size)
+                except DB_UNAVAILABLE:
+                    raise
+                except Exception:
+                    logger.exception("Falha ao reprocessar %s; segmento em quarentena", path.name)
+                    self._quarantine(path)
+                    continue
+
+                path.unlink()
+
+        return total
+
+    def _replay_segment(self, path: Path, batch_size: int) -> int:
+        total = 0
+        batch = []
+        for payload in read_segment(path):
+            try:
+                batch.append(_decode_row(payload))
+            except (ValueError, KeyError, TypeError) as exc:
+                self.undecodable += 1
+                dead_letter.add(
+                    [{"segment": path.name, "payload": payload.decode(errors="replace")}],
+                    f"Registro do spool inválido: {exc!r}"
+                )
+                continue
+
+            if len(batch) >= batch_size:
+                total += write_isolating(self._write, batch)
+                batch = []
+        if batch:
+            total += write_isolating(self._write, batch)
+        return total
+
+    def _quarantine(self, path: Path):
+        # Sai do glob "*.seg" e fica no diretório para inspeção. O que já foi
+        # gravado dele não se repete se for reprocessado (ON CONFLICT)
+        try:
+            path.rename(path.with_suffix(".quarantine"))
+        except OSError:
+            logger.exception("Não foi possível pôr %s em quarentena", path.name)
+            return
+        self.quarantined += 1
+
+    def quarantined_segments(self) -> int:
+        if not self.directory.exists():
+            return 0
+        return sum(1 for _ in self.directory.glob("*.quarantine"))
+
+    def _write(self, rows: list[dict]) -> int:
+        # Idempotente: um segmento pode ser reprocessado se o worker cair
+        # antes de apagá-lo; o ON CONFLICT de write_readings ignora o que já existe
+        with SessionLocal() as db:
+            inserted = write_readings(db, rows)
+            db.commit()
+
+        if inserted:
+            invalidate_sensor_responses({row["sensor_id"] for row in rows})
+
+        self.replayed += inserted
+        self.duplicates += len(rows) - inserted
+        return inserted
+
+    def stats(self) -> dict:
+        return {
+            "pending_segments": self.pending(),
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "duplicates": self.duplicates,
+            "undecodable": self.undecodable,
+            "quarantined": self.quarantined,
+            "quarantined_segments": self.quarantined_segments(),
+            "dead_letter": dead_letter.stats(),
+        }
+
+
+ingest_spool = Spool(
+    directory=settings.INGEST_SPOOL_DIR,
+    segment_bytes=settings.INGEST_SPOOL_SEGMENT_BYTES,
+    fsync_interval=settings.INGEST_SPOOL_FSYNC_INTERVAL
+)
+
+
+class SpoolReplayer:
+    # Thread que faz o fsync periódico e reprocessa o spool
+    def __init__(self, spool: Spool):
+        self.spool = spool
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ingest-spool-replayer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.spool.close()
+
+    def _run(self):
+        tick = max(min(settings.INGEST_SPOOL_FSYNC_INTERVAL, settings.INGEST_SPOOL_REPLAY_INTERVAL), 0.05)
+        next_replay = 0.0
+
+        while not self._stop.wait(tick):
+            self.spool.sync()
+
+            if time.monotonic() < next_replay:
+                continue
+            next_replay = time.monotonic() + settings.INGEST_SPOOL_REPLAY_INTERVAL
+
+            try:
+                count = self.spool.replay(settings.INGEST_SPOOL_REPLAY_BATCH)
+            except DB_UNAVAILABLE:
+                logger.warning("Banco indisponível; spool de ingestão mantido em disco")
+                continue
+            except Exception:
+                logger.exception("Falha ao reprocessar o spool de ingestão")
+                continue
+
+            if count:
+                logger.info("Spool de ingestão: %s leituras gravadas", count)
+
+
+spool_replayer = SpoolReplayer(ingest_spool)
@@ -0,0 +1,12 @@
+from app.core.database import SessionLocal
+
+# Para respostas em streaming: a sessão de get_db já foi fechada quando o
+# corpo começa a ser enviado, então o gerador abre a própria conexão.
+
+
+def stream_rows(stmt, batch_size: int = 1000):
+    # Cursor no servidor (yield_per): memória constante, lotes de batch_size
+    with SessionLocal() as db:
+        result = db.execute(stmt.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield partition
@@ -0,0 +1,78 @@
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from fastapi import HTTPException, Query
+from sqlalchemy import func, literal
+
+# Os timestamps são timestamptz e circulam na aplicação como datetime com
+# fuso UTC (as conexões usam TimeZone=UTC). Os filtros usam sempre
+# intervalos semiabertos [início, fim) sobre a coluna crua, para que o
+# índice (sensor_id, timestamp) seja usado; o fuso do usuário só entra no
+# agrupamento (date_trunc) e no cálculo dos limites.
+
+
+def get_timezone(
+    tz: str = Query("UTC", description="Fuso horário IANA, ex.: America/Sao_Paulo")
+) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail="Fuso horário inválido")
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def to_utc(value: datetime) -> datetime:
+    # Sem fuso = já está em UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def local_midnight_utc(day: date, tz: ZoneInfo) -> datetime:
+    # Meia-noite local de `day`, em UTC
+    return to_utc(datetime.combine(day, time.min, tzinfo=tz))
+
+
+def local_days_range(first_day: date, last_day: date, tz: ZoneInfo):
+    # [meia-noite de first_day, meia-noite do dia seguinte a last_day)
+    return (
+        local_midnight_utc(first_day, tz),
+        local_midnight_utc(last_day + timedelta(days=1), tz),
+    )
+
+
+def local_bucket_edges(first_day: date, last_day: date, unit: str | None, tz: ZoneInfo):
+    # Limites (UTC) dos dias/semanas/meses locais dentro de [first_day,
+    # last_day]; o primeiro e o último são os limites do período
+    edges = [local_midnight_utc(first_day, tz)]
+    day = first_day + timedelta(days=1)
+
+    while day <= last_day:
+        if (
+            unit == "day"
+            or (unit == "week" and day.weekday() == 0)
+            or (unit == "month" and day.day == 1)
+        ):
+            edges.append(local_midnight_utc(day, tz))
+        day += timedelta(days=1)
+
+    edges.append(local_midnight_utc(last_day + timedelta(days=1), tz))
+    return edges
+
+
+def local_today(tz: ZoneInfo) -> date:
+    return datetime.now(tz).date()
+
+
+def _inline(value: str):
+    # Renderizado como literal para que SELECT e GROUP BY tenham a mesma
+    # expressão também em drivers com parâmetros no servidor (asyncpg)
+    return literal(value, literal_execute=True)
+
+
+def local_bucket(column, unit: str, tz: ZoneInfo):
+    # date_trunc no horário local (timestamptz -> hora local sem fuso)
+    local = func.timezone(_inline(tz.key), column)
+    return func.date_trunc(_inline(unit), local)
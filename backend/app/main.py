@@ -1,12 +1,90 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.datastructures import Default
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.fast_json import FastJSONResponse
+from app.core.ingest_buffer import ingest_buffer
+from app.core.spool import spool_replayer
+from app.core.live import live_hub, live_listener
+from app.core.metrics import MetricsMiddleware
+from app.core.partitions import partition_maintenance_loop
+from app.core.security import start_password_pool, stop_password_pool
 from app.routers.auth import router as auth_router
 from app.routers.sensors import router as sensors_router
 from app.routers.sensor_reading import router as sensor_readings_router
 from app.routers import device
+from app.routers import export
+from app.routers import live
+from app.routers import internal
 from app.routers import consumption
 from app.routers.consumption import router as consumption_router
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+
+    if settings.PARTITION_MAINTENANCE_ON_STARTUP:
+        tasks.append(asyncio.create_task(partition_maintenance_loop()))
+
+    if settings.INGEST_SPOOL_ENABLED:
+        spool_replayer.start()
+
+    if settings.INGEST_BUFFER_ENABLED:
+        ingest_buffer.start()
+
+    if settings.LIVE_ENABLED:
+        live_hub.start(asyncio.get_running_loop())
+        live_listener.start()
+
+    start_password_pool()
+
+    yield
+
+    await run_in_threadpool(stop_password_pool)
+
+    if settings.LIVE_ENABLED:
+        live_hub.close()
+        await run_in_threadpool(live_listener.stop)
+
+    for task in tasks:
+        task.cancel()
+
+    # Grava o que ainda está na fila antes de encerrar o worker
+    if settings.INGEST_BUFFER_ENABLED:
+        await run_in_threadpool(ingest_buffer.close, settings.INGEST_BUFFER_DRAIN_TIMEOUT)
+
+    # Fecha o segmento atual; o que não foi gravado fica para o próximo start
+    if settings.INGEST_SPOOL_ENABLED:
+        await run_in_threadpool(spool_replayer.stop, settings.INGEST_BUFFER_DRAIN_TIMEOUT)
+
+
+# Default(): rotas com response_model continuam serializadas pelo Pydantic
+# (direto para bytes); as demais são renderizadas com orjson
+app = FastAPI(lifespan=lifespan, default_response_class=Default(FastJSONResponse))
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+
+# O 422 devolve o valor recusado em "input"; NaN/Infinity derrubariam o
+# JSONResponse padrão (500). O orjson os escreve como null.
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    return FastJSONResponse(status_code=422, content={"detail": jsonable_encoder(exc.errors())})
+
+
+# No modo assíncrono estas rotas são registradas antes e têm precedência
+# sobre as versões síncronas com o mesmo caminho
+if settings.DB_ASYNC_ENABLED:
+    from app.routers import device_async, sensor_reading_async
+
+    app.include_router(device_async.router)
+    app.include_router(sensor_reading_async.router)
 
 app.include_router(auth_router)
 app.include_router(sensors_router)
@@ -14,6 +92,12 @@ app.include_router(sensor_readings_router)
 app.include_router(device.router)
 app.include_router(consumption.router)
 app.include_router(consumption_router)
+app.include_router(export.router)
+app.include_router(live.router)
+
+# /metrics e /*/stats: fora do ar público por padrão
+if settings.EXPOSE_INTERNAL_ENDPOINTS:
+    app.include_router(internal.router)
 
 @app.get("/")
 def root():
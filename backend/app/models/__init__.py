@@ -3,3 +3,4 @@ from app.core.database import Base
 from .user import User
 from .sensors import Sensor
 from .sensor_reading import SensorReading
+from .sensor_reading_rollup import SensorReadingHourly, SensorReadingDaily, SensorReadingMonthly
@@ -1,28 +1,37 @@
-import uuid
-from sqlalchemy import Column, Float, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, REAL
 from sqlalchemy.orm import relationship
-from datetime import datetime
 from sqlalchemy.dialects.postgresql import UUID
 
 from app.core.database import Base
+from app.core.timeutils import utc_now
 
 
 class SensorReading(Base):
     __tablename__ = "sensor_readings"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-
+    # Chave natural (sensor_id, timestamp): sem UUID por linha, a PK cresce
+    # em ordem de tempo por sensor e também serve às consultas por intervalo
     sensor_id = Column(
         UUID(as_uuid=True),
         ForeignKey("sensors.id", ondelete="CASCADE"),
-        nullable=False
+        primary_key=True
     )
 
-    energy_kwh = Column(Float, nullable=True)
-    current_a = Column(Float, nullable=True)
-    voltage_v = Column(Float, nullable=True)
-    power_w = Column(Float, nullable=True)
+    # Chave de partição (uma partição por mês). Vem do dispositivo quando
+    # informado; reenvios da mesma amostra caem no ON CONFLICT.
+    timestamp = Column(DateTime(timezone=True), primary_key=True, default=utc_now)
+
+    # Medidas em float4: precisão de sobra para os sensores
+    energy_kwh = Column(REAL, nullable=True)
+    current_a = Column(REAL, nullable=True)
+    voltage_v = Column(REAL, nullable=True)
+    power_w = Column(REAL, nullable=True)
 
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    # Número de sequência opcional do dispositivo
+    seq = Column(BigInteger, nullable=True)
 
     sensor = relationship("Sensor", back_populates="readings")
+
+    __table_args__ = (
+        {"postgresql_partition_by": 'RANGE ("timestamp")'},
+    )
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Float, DateTime, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.core.database import Base
+
+
+# Agregados por sensor e intervalo (UTC), mantidos na ingestão.
+# Somas e contagens separadas permitem recompor médias exatas.
+class RollupColumns:
+    sensor_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("sensors.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+
+    sample_count = Column(Integer, nullable=False, default=0)
+
+    energy_kwh_sum = Column(Float, nullable=False, default=0)
+    energy_kwh_count = Column(Integer, nullable=False, default=0)
+
+    power_w_sum = Column(Float, nullable=False, default=0)
+    power_w_count = Column(Integer, nullable=False, default=0)
+    power_w_min = Column(Float, nullable=True)
+    power_w_max = Column(Float, nullable=True)
+
+
+class SensorReadingHourly(RollupColumns, Base):
+    __tablename__ = "sensor_readings_hourly"
+
+
+class SensorReadingDaily(RollupColumns, Base):
+    __tablename__ = "sensor_readings_daily"
+
+
+class SensorReadingMonthly(RollupColumns, Base):
+    __tablename__ = "sensor_readings_monthly"
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, Float, ForeignKey, Integer
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import UUID
@@ -18,12 +18,18 @@ class Sensor(Base):
     user_id = Column(
         UUID(as_uuid=True),
         ForeignKey("users.id", ondelete="CASCADE"),
-        nullable=False
+        nullable=False,
+        index=True
     )
 
     name = Column(String, nullable=False)
     location = Column(String, nullable=True)
 
+    # Política de amostragem na ingestão (token bucket); NULL = padrão
+    # DEVICE_RATE_LIMIT_*, max_samples_per_s = 0 = sem limite
+    max_samples_per_s = Column(Float, nullable=True)
+    sample_burst = Column(Integer, nullable=True)
+
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow,
                         onupdate=datetime.utcnow)
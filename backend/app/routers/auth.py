@@ -1,30 +1,86 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import SessionLocal, get_db
+from app.core.metrics import metrics
+from app.core.rate_limit import TokenBucketLimiter, too_many_requests
 from app.models.user import User
-from app.core.security import verify_password, create_access_token
+from app.core.security import PasswordPoolBusy, verify_password_async, create_access_token
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+login_ip_limiter = TokenBucketLimiter(
+    rate=settings.LOGIN_IP_RATE_PER_MINUTE / 60,
+    burst=settings.LOGIN_IP_BURST,
+    maxsize=settings.LOGIN_RATE_LIMIT_KEYS
+)
+login_email_limiter = TokenBucketLimiter(
+    rate=settings.LOGIN_EMAIL_RATE_PER_MINUTE / 60,
+    burst=settings.LOGIN_EMAIL_BURST,
+    maxsize=settings.LOGIN_RATE_LIMIT_KEYS
+)
+metrics.limiters["login_ip"] = login_ip_limiter
+metrics.limiters["login_email"] = login_email_limiter
+
 class LoginRequest(BaseModel):
     email: str
     password: str
 
+
+def _throttle(limiter: TokenBucketLimiter, key: str):
+    wait = limiter.acquire(key)
+    if wait:
+        raise too_many_requests(wait, "Muitas tentativas de login, tente novamente mais tarde")
+
+
+def _find_user(db: Session, email: str):
+    user = db.query(User).filter(User.email == email).first()
+    # Devolve a conexão ao pool: o hash pode esperar na fila. O usuário
+    # volta desanexado, só para leitura dos atributos já carregados
+    db.close()
+    return user
+
+
+def _save_rehash(user_id, old_hash: str, hashed: str):
+    # Sessão própria: a da requisição foi fechada em _find_user. Só troca
+    # se o hash ainda for o verificado (senha alterada no meio do login)
+    with SessionLocal() as db:
+        db.query(User).filter(
+            User.id == user_id, User.hashed_password == old_hash
+        ).update({User.hashed_password: hashed}, synchronize_session=False)
+        db.commit()
+
+
 @router.post("/login")
-def login(data: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == data.email).first()
+async def login(data: LoginRequest, request: Request, db: Session = Depends(get_db)):
+    # Antes de qualquer consulta ou hash
+    if settings.LOGIN_RATE_LIMIT_ENABLED:
+        _throttle(login_ip_limiter, request.client.host if request.client else "")
+        _throttle(login_email_limiter, data.email.strip().lower())
+
+    user = await run_in_threadpool(_find_user, db, data.email)
 
     if not user:
         raise HTTPException(status_code=400, detail="Email ou senha incorretos")
 
-    if not verify_password(data.password, user.hashed_password):
+    try:
+        valid, new_hash = await verify_password_async(data.password, user.hashed_password)
+    except PasswordPoolBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Muitos logins em andamento, tente novamente",
+            headers={"Retry-After": "1"}
+        )
+
+    if not valid:
         raise HTTPException(status_code=400, detail="Email ou senha incorretos")
 
     token = create_access_token({"sub": str(user.id)})
 
-    return {
+    response = {
         "access_token": token,
         "token_type": "bearer",
         "user": {
@@ -33,3 +89,9 @@ def login(data: LoginRequest, db: Session = Depends(get_db)):
             "email": user.email
         }
     }
+
+    # Custo do Argon2 mudou desde o hash salvo: grava o refeito
+    if new_hash:
+        await run_in_threadpool(_save_rehash, user.id, user.hashed_password, new_hash)
+
+    return response
@@ -1,43 +1,65 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from sqlalchemy import and_, func, select, true
+from datetime import date, timedelta
+from typing import Literal
+from zoneinfo import ZoneInfo
+from app.core.config import settings
 from app.core.database import get_db
 from app.models.sensor_reading import SensorReading
 from app.schemas.consumption import ConsumptionResponse
 from uuid import UUID
 from fastapi import HTTPException, Depends
-from app.core.auth_utils import get_current_user
+from app.core.auth_utils import ensure_sensor_owner, get_current_user, user_sensor_ids
+from app.core.fast_json import FastJSONResponse
+from app.core.timeutils import (
+    get_timezone, local_bucket, local_bucket_edges, local_days_range, local_today, utc_now
+)
+from app.core.response_cache import cached_response
+from app.core.rollups import (
+    avg_power, bucket_segments, hour_segments, rollup_segments, rollup_union, total_energy
+)
 from app.models.sensors import Sensor
+from app.models.sensor_reading_rollup import SensorReadingHourly
 
 router = APIRouter(prefix="/consumption", tags=["Consumption"])
 
 
+def _owned_sensor_ids(db: Session, user, sensor_ids: list[UUID]):
+    # Sem sensor_id, todos os sensores do usuário (subconsulta no banco)
+    if not sensor_ids:
+        return user_sensor_ids(user)
+
+    for one in sensor_ids:
+        ensure_sensor_owner(db, user, one)
+    return sensor_ids
+
+
 @router.get("/", response_model=list[ConsumptionResponse])
 def get_consumption(
-    sensor_id: str | None = None,
+    sensor_id: UUID | None = None,
     hours: int = Query(default=24, ge=1, le=720),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
 ):
-    end_time = datetime.utcnow()
+    # Horas inteiras (granularidade dos agregados), incluindo a hora atual
+    end_time = utc_now().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
     start_time = end_time - timedelta(hours=hours)
 
-    query = (
-        db.query(
-            SensorReading.sensor_id.label("sensor_id"),
-            func.sum(SensorReading.energy_kwh).label("total_kwh"),
-            func.avg(SensorReading.power_w).label("avg_power_w"),
-        )
-        .filter(SensorReading.timestamp >= start_time)
-        .filter(SensorReading.timestamp <= end_time)
+    sensor_ids = _owned_sensor_ids(db, user, [sensor_id] if sensor_id else [])
+    rollup = rollup_union(
+        rollup_segments(start_time, end_time),
+        lambda model: [model.sensor_id.in_(sensor_ids)]
     )
 
-    if sensor_id:
-        query = query.filter(SensorReading.sensor_id == sensor_id)
-
-    query = query.group_by(SensorReading.sensor_id)
-
-    results = query.all()
+    results = db.execute(
+        select(
+            rollup.c.sensor_id,
+            total_energy(rollup.c).label("total_kwh"),
+            avg_power(rollup.c).label("avg_power_w"),
+        )
+        .group_by(rollup.c.sensor_id)
+    ).all()
 
     return [
         ConsumptionResponse(
@@ -51,79 +73,208 @@ def get_consumption(
     ]
 
 
-@router.get("/{sensor_id}/dashboard")
-def sensor_dashboard(
-    sensor_id: UUID,
+# -----------------------------------------
+# Relatório de consumo (vários sensores)
+# -----------------------------------------
+
+REPORT_GROUPS = {
+    "sensor": (Sensor.id.label("sensor_id"), Sensor.name.label("sensor_name")),
+    "location": (Sensor.location.label("location"),),
+}
+
+
+def _report_totals(energy_sum, energy_count, power_sum, power_count, samples):
+    return {
+        "total_energy_kwh": energy_sum if energy_count else 0,
+        "avg_power_w": power_sum / power_count if power_count else None,
+        "samples": samples,
+    }
+
+
+@router.get("/report")
+def consumption_report(
+    start: date,
+    end: date,
+    sensor_id: list[UUID] | None = Query(None),
+    group_by: list[Literal["sensor", "location"]] | None = Query(None),
+    bucket: Literal["hour", "day", "week", "month"] | None = None,
+    tz: ZoneInfo = Depends(get_timezone),
     db: Session = Depends(get_db),
     user=Depends(get_current_user)
 ):
+    # [start, end] em dias locais. Lê só os agregados: meses inteiros na
+    # tabela mensal, dias na diária e as pontas na horária, de modo que o
+    # custo depende de sensores x baldes, não do número de leituras.
+    if end < start:
+        raise HTTPException(400, "end deve ser igual ou posterior a start")
 
-    sensor = db.query(Sensor).filter(
-        Sensor.id == sensor_id,
-        Sensor.user_id == user.id
-    ).first()
+    group_by = list(dict.fromkeys(group_by or []))
+    sensor_ids = _owned_sensor_ids(db, user, sensor_id or [])
 
-    if not sensor:
-        raise HTTPException(404, "Sensor não encontrado ou não pertence ao usuário")
+    if bucket == "hour":
+        segments = hour_segments(local_bucket_edges(start, end, "day", tz))
+    else:
+        segments = bucket_segments(local_bucket_edges(start, end, bucket, tz))
 
-    now = datetime.utcnow()
-    today = now.date()
-    seven_days_ago = now - timedelta(days=7)
-    thirty_days_ago = now - timedelta(days=30)
+    rollup = rollup_union(segments, lambda model: [model.sensor_id.in_(sensor_ids)])
 
-    # 🔹 Últimas 20 leituras
-    latest_readings = (
-        db.query(SensorReading)
-        .filter(SensorReading.sensor_id == sensor_id)
-        .order_by(SensorReading.timestamp.desc())
-        .limit(20)
-        .all()
-    )
+    keys = [column for name in group_by for column in REPORT_GROUPS[name]]
+    if bucket:
+        keys.append(local_bucket(rollup.c.bucket, bucket, tz).label("bucket"))
 
-    # 🔹 Consumo do dia
-    daily = (
-        db.query(
-            func.sum(SensorReading.energy_kwh),
-            func.avg(SensorReading.power_w)
+    stmt = (
+        select(
+            *keys,
+            func.sum(rollup.c.energy_kwh_sum).label("energy_sum"),
+            func.sum(rollup.c.energy_kwh_count).label("energy_count"),
+            func.sum(rollup.c.power_w_sum).label("power_sum"),
+            func.sum(rollup.c.power_w_count).label("power_count"),
+            func.sum(rollup.c.sample_count).label("samples"),
         )
-        .filter(
-            SensorReading.sensor_id == sensor_id,
-            func.date(SensorReading.timestamp) == today
+        .select_from(rollup)
+        .join(Sensor, Sensor.id == rollup.c.sensor_id)
+        .where(Sensor.user_id == user.id)
+        .limit(settings.CONSUMPTION_REPORT_MAX_ROWS + 1)
+    )
+    if keys:
+        stmt = stmt.group_by(*keys).order_by(*keys)
+
+    rows = db.execute(stmt).all()
+
+    if len(rows) > settings.CONSUMPTION_REPORT_MAX_ROWS:
+        raise HTTPException(
+            400,
+            "Relatório grande demais: reduza o período, use baldes maiores "
+            "ou agrupe menos"
         )
-        .first()
+
+    # Totais por grupo e geral somados aqui a partir das linhas por balde
+    # (dimensões primeiro, as cinco somas no fim de cada linha)
+    dimensions = [column.key for column in keys if column.key != "bucket"]
+    groups = {}
+    overall = [0.0, 0, 0.0, 0, 0]
+
+    for row in rows:
+        sums = row[-5:]
+        group_key = tuple(row[:len(dimensions)])
+
+        group = groups.get(group_key)
+        if group is None:
+            group = groups[group_key] = {"totals": [0.0, 0, 0.0, 0, 0], "buckets": []}
+
+        totals = group["totals"]
+        for i, value in enumerate(sums):
+            if value:
+                totals[i] += value
+                overall[i] += value
+
+        if bucket:
+            group["buckets"].append({
+                "bucket": row.bucket.replace(tzinfo=tz),
+                **_report_totals(*sums),
+            })
+
+    return FastJSONResponse({
+        "start": start,
+        "end": end,
+        "tz": tz.key,
+        "bucket": bucket,
+        "group_by": group_by,
+        "total": _report_totals(*overall),
+        "groups": [
+            {
+                **dict(zip(dimensions, group_key)),
+                "total": _report_totals(*group["totals"]),
+                "buckets": group["buckets"],
+            }
+            for group_key, group in groups.items()
+        ],
+    })
+
+
+@router.get("/{sensor_id}/dashboard")
+def sensor_dashboard(
+    sensor_id: UUID,
+    request: Request,
+    tz: ZoneInfo = Depends(get_timezone),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    return cached_response(
+        request, user, sensor_id,
+        lambda: build_dashboard(db, user, sensor_id, tz)
     )
 
-    # 🔹 Últimos 7 dias
-    weekly = (
-        db.query(
-            func.sum(SensorReading.energy_kwh),
-            func.avg(SensorReading.power_w)
+
+def build_dashboard(db: Session, user, sensor_id: UUID, tz: ZoneInfo):
+
+    now = utc_now()
+    today = local_today(tz)
+    today_start, today_end = local_days_range(today, today, tz)
+    # Janelas móveis em horas inteiras (granularidade dos agregados). Em
+    # fusos de meia hora ou 45 min, "hoje" também fica em horas UTC cheias:
+    # a hora que contém a meia-noite local conta para o dia anterior
+    current_hour = now.replace(minute=0, second=0, microsecond=0)
+    seven_days_ago = current_hour - timedelta(days=7)
+    thirty_days_ago = current_hour - timedelta(days=30)
+    rollup = SensorReadingHourly
+
+    # 🔹 Hoje, 7 e 30 dias numa única passada pelos agregados (FILTER)
+    is_today = and_(rollup.bucket >= today_start, rollup.bucket < today_end)
+    is_week = rollup.bucket >= seven_days_ago
+
+    summary = (
+        select(
+            total_energy(rollup, is_today).label("today_kwh"),
+            avg_power(rollup, is_today).label("today_power"),
+            total_energy(rollup, is_week).label("week_kwh"),
+            avg_power(rollup, is_week).label("week_power"),
+            total_energy(rollup).label("month_kwh"),
+            avg_power(rollup).label("month_power"),
         )
-        .filter(
-            SensorReading.sensor_id == sensor_id,
-            SensorReading.timestamp >= seven_days_ago
+        .where(
+            rollup.sensor_id == sensor_id,
+            rollup.bucket >= thirty_days_ago
         )
-        .first()
+        .subquery()
     )
 
-    # 🔹 Últimos 30 dias
-    monthly = (
-        db.query(
-            func.sum(SensorReading.energy_kwh),
-            func.avg(SensorReading.power_w)
-        )
-        .filter(
-            SensorReading.sensor_id == sensor_id,
-            SensorReading.timestamp >= thirty_days_ago
+    # 🔹 Últimas 20 leituras
+    latest = (
+        select(
+            SensorReading.timestamp,
+            SensorReading.power_w,
+            SensorReading.energy_kwh,
+            SensorReading.voltage_v,
+            SensorReading.current_a
         )
-        .first()
+        .where(SensorReading.sensor_id == sensor_id)
+        .order_by(SensorReading.timestamp.desc())
+        .limit(20)
+        .subquery()
     )
 
+    # Sensor (posse), resumo e últimas leituras numa só ida ao banco:
+    # uma linha por leitura, com os dados do sensor e o resumo repetidos
+    rows = db.execute(
+        select(Sensor.id, Sensor.name, Sensor.location, summary, latest)
+        .select_from(Sensor)
+        .join(summary, true())
+        .outerjoin(latest, true())
+        .where(Sensor.id == sensor_id, Sensor.user_id == user.id)
+        .order_by(latest.c.timestamp.desc())
+    ).all()
+
+    if not rows:
+        raise HTTPException(404, "Sensor não encontrado ou não pertence ao usuário")
+
+    first = rows[0]
+
     return {
         "sensor": {
-            "id": sensor.id,
-            "name": sensor.name,
-            "location": sensor.location
+            "id": first.id,
+            "name": first.name,
+            "location": first.location
         },
         "latest_readings": [
             {
@@ -133,20 +284,21 @@ def sensor_dashboard(
                 "voltage_v": r.voltage_v,
                 "current_a": r.current_a
             }
-            for r in latest_readings
+            for r in rows
+            if r.timestamp is not None
         ],
         "summary": {
             "today": {
-                "total_energy_kwh": daily[0] or 0,
-                "avg_power_w": daily[1] or 0
+                "total_energy_kwh": first.today_kwh or 0,
+                "avg_power_w": first.today_power or 0
             },
             "last_7_days": {
-                "total_energy_kwh": weekly[0] or 0,
-                "avg_power_w": weekly[1] or 0
+                "total_energy_kwh": first.week_kwh or 0,
+                "avg_power_w": first.week_power or 0
             },
             "last_30_days": {
-                "total_energy_kwh": monthly[0] or 0,
-                "avg_power_w": monthly[1] or 0
+                "total_energy_kwh": first.month_kwh or 0,
+                "avg_power_w": first.month_power or 0
             }
         }
     }
@@ -1,38 +1,181 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.core.database import get_db
-from app.models.sensors import Sensor
+from app.core.device_auth import DeviceIdentity, get_current_device
+from app.core.device_limits import admit_samples
+from app.core.device_codec import decode_compact, decode_content, is_compact
+from app.core.ingest import build_reading_rows, reading_row, stored_reading, write_readings
+from app.core.ingest_buffer import ingest_buffer, IngestBufferFull
+from app.core.response_cache import invalidate_sensor_responses
+from app.core.spool import DB_UNAVAILABLE, ingest_spool
+from app.schemas.device import DeviceReadingItem, DeviceBatchAck
 from app.schemas.sensor_reading import SensorReadingCreate, SensorReadingResponse
-from app.models.sensor_reading import SensorReading
 
 router = APIRouter(prefix="/device", tags=["Device"])
 
+_batch_adapter = TypeAdapter(list[DeviceReadingItem])
+_item_adapter = TypeAdapter(DeviceReadingItem)
+_reading_adapter = TypeAdapter(SensorReadingCreate)
 
-def get_sensor_by_token(db: Session, token: str):
-    sensor = db.query(Sensor).filter(Sensor.device_token == token).first()
-    if not sensor:
-        raise HTTPException(status_code=401, detail="Token do dispositivo inválido")
-    return sensor
 
+async def read_device_body(request: Request) -> bytes:
+    # Corpo já descomprimido (Content-Encoding gzip/deflate)
+    return decode_content(await request.body(), request.headers.get("content-encoding"))
 
-@router.post("/send-reading", response_model=SensorReadingResponse)
+
+async def read_reading_body(request: Request):
+    # Uma leitura: objeto JSON ou formato compacto com uma linha
+    content_type = request.headers.get("content-type", "")
+    body = await read_device_body(request)
+
+    if is_compact(content_type):
+        readings = decode_compact(content_type, body)
+        if len(readings) != 1:
+            raise HTTPException(
+                status_code=422,
+                detail="Envie exatamente uma leitura (lotes vão para /device/send-readings)"
+            )
+        return readings[0]
+
+    try:
+        return _reading_adapter.validate_json(body)
+    except ValidationError as exc:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in exc.errors()]
+        )
+
+
+async def read_batch_body(request: Request) -> list:
+    # Aceita um array JSON, NDJSON (uma leitura por linha) ou o formato
+    # compacto (MessagePack/CBOR, ver app.core.device_codec)
+    content_type = request.headers.get("content-type", "")
+    body = await read_device_body(request)
+
+    try:
+        if is_compact(content_type):
+            items = decode_compact(content_type, body)
+        elif content_type.startswith("application/x-ndjson"):
+            items = [
+                _item_adapter.validate_json(line)
+                for line in body.splitlines()
+                if line.strip()
+            ]
+        else:
+            items = _batch_adapter.validate_json(body)
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors())
+
+    if not items:
+        raise HTTPException(status_code=422, detail="Lote de leituras vazio")
+
+    if len(items) > settings.DEVICE_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Máximo de {settings.DEVICE_BATCH_MAX_SIZE} leituras por lote"
+        )
+
+    return items
+
+
+def batch_ack(rows: list[dict], inserted: int | None = None) -> DeviceBatchAck:
+    timestamps = [row["timestamp"] for row in rows]
+
+    return DeviceBatchAck(
+        count=len(rows),
+        duplicates=len(rows) - inserted if inserted is not None else None,
+        first_timestamp=min(timestamps),
+        last_timestamp=max(timestamps),
+    )
+
+
+def enqueue_readings(rows: list[dict]):
+    try:
+        ingest_buffer.put(rows)
+    except IngestBufferFull:
+        raise HTTPException(
+            status_code=429,
+            detail="Fila de ingestão cheia, tente novamente",
+            headers={"Retry-After": str(settings.INGEST_BUFFER_RETRY_AFTER)}
+        )
+
+
+def spool_always() -> bool:
+    return settings.INGEST_SPOOL_ENABLED and settings.INGEST_SPOOL_MODE == "always"
+
+
+def store_readings(db: Session, rows: list[dict]) -> int | None:
+    # Devolve quantas leituras eram novas, ou None se a gravação foi adiada
+    if spool_always():
+        ingest_spool.append(rows)
+        return
+
+    if settings.INGEST_BUFFER_ENABLED:
+        enqueue_readings(rows)
+        return
+
+    try:
+        # Um único INSERT multi-linhas e um único commit para o lote inteiro
+        inserted = write_readings(db, rows)
+        db.commit()
+        if inserted:
+            invalidate_sensor_responses({row["sensor_id"] for row in rows})
+        return inserted
+    except DB_UNAVAILABLE:
+        if not settings.INGEST_SPOOL_ENABLED:
+            raise
+        # Banco fora: guarda em disco e o reprocessador grava depois
+        db.rollback()
+        ingest_spool.append(rows)
+
+
+# Corpo lido por read_reading_body (JSON ou compacto); o schema JSON
+# continua documentado no OpenAPI
+READING_BODY_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": SensorReadingCreate.model_json_schema()}
+        },
+    }
+}
+
+
+@router.post("/send-reading", response_model=SensorReadingResponse,
+             openapi_extra=READING_BODY_OPENAPI)
 def device_send_reading(
-    data: SensorReadingCreate,
-    x_device_token: str = Header(..., alias="X-Device-Token"),
+    response: Response,
+    data=Depends(read_reading_body),
+    device: DeviceIdentity = Depends(get_current_device),
     db: Session = Depends(get_db)
 ):
-    sensor = get_sensor_by_token(db, x_device_token)
-
-    reading = SensorReading(
-        sensor_id=sensor.id,
-        energy_kwh=data.energy_kwh,
-        current_a=data.current_a,
-        voltage_v=data.voltage_v,
-        power_w=data.power_w
-    )
+    rows = [reading_row(device.sensor_id, data)]
+
+    # Acima do limite em modo "coalesce": responde sem gravar
+    if not admit_samples(device, 1, can_coalesce=True):
+        response.headers["X-Reading-Coalesced"] = "true"
+        return rows[0]
+
+    # 0 = reenvio (ON CONFLICT); None = gravação adiada (buffer/spool)
+    if store_readings(db, rows) == 0:
+        response.headers["X-Reading-Duplicate"] = "true"
+        return stored_reading(db, rows[0])
+
+    return rows[0]
+
+
+@router.post("/send-readings", response_model=DeviceBatchAck)
+def device_send_readings(
+    items: list = Depends(read_batch_body),
+    device: DeviceIdentity = Depends(get_current_device),
+    db: Session = Depends(get_db)
+):
+    admit_samples(device, len(items))
+
+    rows = build_reading_rows(device.sensor_id, items)
 
-    db.add(reading)
-    db.commit()
-    db.refresh(reading)
+    inserted = store_readings(db, rows)
 
-    return reading
+    return batch_ack(rows, inserted)
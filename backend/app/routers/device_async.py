@@ -0,0 +1,82 @@
+from fastapi import APIRouter, Depends, Response
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.device_auth import DeviceIdentity, get_current_device_async
+from app.core.device_limits import admit_samples
+from app.core.ingest import (
+    build_reading_rows, reading_row, stored_reading_async, write_readings_async
+)
+from app.core.response_cache import invalidate_sensor_responses
+from app.core.spool import DB_UNAVAILABLE, ingest_spool
+from app.routers.device import (
+    READING_BODY_OPENAPI, read_batch_body, read_reading_body, batch_ack, enqueue_readings,
+    spool_always
+)
+from app.schemas.device import DeviceBatchAck
+from app.schemas.sensor_reading import SensorReadingResponse
+
+# Versões assíncronas das rotas de /device (ativas com DB_ASYNC_ENABLED)
+router = APIRouter(prefix="/device", tags=["Device"])
+
+
+async def store_readings_async(db: AsyncSession, rows: list[dict]) -> int | None:
+    # Escrita/fsync do spool fora do event loop
+    if spool_always():
+        await run_in_threadpool(ingest_spool.append, rows)
+        return
+
+    if settings.INGEST_BUFFER_ENABLED:
+        enqueue_readings(rows)
+        return
+
+    try:
+        inserted = await write_readings_async(db, rows)
+        await db.commit()
+        if inserted:
+            invalidate_sensor_responses({row["sensor_id"] for row in rows})
+        return inserted
+    except DB_UNAVAILABLE:
+        if not settings.INGEST_SPOOL_ENABLED:
+            raise
+        await db.rollback()
+        await run_in_threadpool(ingest_spool.append, rows)
+
+
+@router.post("/send-reading", response_model=SensorReadingResponse,
+             openapi_extra=READING_BODY_OPENAPI)
+async def device_send_reading(
+    response: Response,
+    data=Depends(read_reading_body),
+    device: DeviceIdentity = Depends(get_current_device_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    rows = [reading_row(device.sensor_id, data)]
+
+    # Acima do limite em modo "coalesce": responde sem gravar
+    if not admit_samples(device, 1, can_coalesce=True):
+        response.headers["X-Reading-Coalesced"] = "true"
+        return rows[0]
+
+    # 0 = reenvio (ON CONFLICT); None = gravação adiada (buffer/spool)
+    if await store_readings_async(db, rows) == 0:
+        response.headers["X-Reading-Duplicate"] = "true"
+        return await stored_reading_async(db, rows[0])
+
+    return rows[0]
+
+
+@router.post("/send-readings", response_model=DeviceBatchAck)
+async def device_send_readings(
+    items: list = Depends(read_batch_body),
+    device: DeviceIdentity = Depends(get_current_device_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    admit_samples(device, len(items))
+
+    rows = build_reading_rows(device.sensor_id, items)
+
+    inserted = await store_readings_async(db, rows)
+
+    return batch_ack(rows, inserted)
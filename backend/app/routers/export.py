@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Literal
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.auth_utils import get_current_user, ensure_sensor_owner, user_sensor_ids
+from app.core.database import get_db
+from app.core.exporters import (
+    ENCODERS, MEDIA_TYPES, ExportUnavailable, check_available, compress
+)
+from app.core.streaming import stream_rows
+from app.core.timeutils import to_utc
+from app.models.sensor_reading import SensorReading
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+EXPORT_BATCH_SIZE = 5000
+
+
+# -----------------------------------------
+# Exportar leituras (CSV / NDJSON / Parquet / Arrow)
+# -----------------------------------------
+
+@router.get("/readings")
+def export_readings(start: datetime,
+                    end: datetime,
+                    sensor_id: list[UUID] | None = Query(None),
+                    format: Literal["csv", "ndjson", "parquet", "arrow"] = "csv",
+                    compression: Literal["gzip", "zstd"] | None = None,
+                    db: Session = Depends(get_db),
+                    user=Depends(get_current_user)):
+
+    # Sem sensor_id, exporta todos os sensores do usuário (subconsulta no banco)
+    if sensor_id:
+        for one in sensor_id:
+            ensure_sensor_owner(db, user, one)
+        sensor_ids = sensor_id
+    else:
+        sensor_ids = user_sensor_ids(user)
+
+    try:
+        check_available(format, compression)
+    except ExportUnavailable as exc:
+        raise HTTPException(501, str(exc))
+
+    stmt = (
+        select(
+            SensorReading.sensor_id,
+            SensorReading.timestamp,
+            SensorReading.energy_kwh,
+            SensorReading.current_a,
+            SensorReading.voltage_v,
+            SensorReading.power_w
+        )
+        .where(
+            SensorReading.sensor_id.in_(sensor_ids),
+            SensorReading.timestamp >= to_utc(start),
+            SensorReading.timestamp < to_utc(end)
+        )
+        .order_by(SensorReading.sensor_id, SensorReading.timestamp)
+    )
+
+    body = ENCODERS[format](stream_rows(stmt, EXPORT_BATCH_SIZE))
+
+    headers = {
+        "Content-Disposition": f'attachment; filename="readings.{format}"'
+    }
+    if compression:
+        headers["Content-Encoding"] = compression
+
+    return StreamingResponse(
+        compress(body, compression),
+        media_type=MEDIA_TYPES[format],
+        headers=headers
+    )
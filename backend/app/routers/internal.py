@@ -0,0 +1,58 @@
+import secrets
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from app.core.config import settings
+from app.core.ingest_buffer import ingest_buffer
+from app.core.spool import ingest_spool
+from app.core.response_cache import response_cache
+from app.core.live import live_hub, live_listener
+from app.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics
+
+# Rotas de operação (estado das filas, caches e métricas). Só são
+# registradas com EXPOSE_INTERNAL_ENDPOINTS; com INTERNAL_ENDPOINTS_TOKEN
+# definido exigem "Authorization: Bearer <token>".
+
+
+def require_internal_token(request: Request):
+    token = settings.INTERNAL_ENDPOINTS_TOKEN
+    if not token:
+        return
+
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(credentials.encode(), token.encode()):
+        raise HTTPException(
+            status_code=401,
+            detail="Token interno inválido",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+router = APIRouter(
+    tags=["Internal"],
+    dependencies=[Depends(require_internal_token)],
+    include_in_schema=False
+)
+
+
+@router.get("/ingest-buffer/stats")
+def ingest_buffer_stats():
+    return {"enabled": settings.INGEST_BUFFER_ENABLED, **ingest_buffer.stats()}
+
+
+@router.get("/ingest-spool/stats")
+def ingest_spool_stats():
+    return {"enabled": settings.INGEST_SPOOL_ENABLED, **ingest_spool.stats()}
+
+
+@router.get("/response-cache/stats")
+def response_cache_stats():
+    return {"enabled": settings.RESPONSE_CACHE_ENABLED, **response_cache.stats()}
+
+
+@router.get("/live/stats")
+def live_stats():
+    return {"enabled": settings.LIVE_ENABLED, **live_hub.stats(), **live_listener.stats()}
+
+
+@router.get("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
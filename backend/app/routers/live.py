@@ -0,0 +1,87 @@
+import asyncio
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.auth_utils import ensure_sensor_owner, get_current_user_stream, user_sensor_ids
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.live import live_hub
+
+router = APIRouter(prefix="/live", tags=["Live"])
+
+# Cabeçalhos para proxies não bufferizarem nem fecharem o stream
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+async def _events(sensor_ids):
+    # Assina só quando o corpo começa a ser enviado: se o cliente cair antes
+    # disso o gerador nunca roda, e não sobra assinante sem o finally
+    subscriber = live_hub.subscribe(sensor_ids)
+    try:
+        # Reconexão automática do EventSource após 3 s
+        yield "retry: 3000\n\n"
+
+        while True:
+            try:
+                frame = await asyncio.wait_for(
+                    subscriber.queue.get(), settings.LIVE_HEARTBEAT_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                # Comentário SSE: mantém a conexão viva e detecta cliente fechado
+                frame = ": ping\n\n"
+
+            if frame is None:
+                return
+            yield frame
+    finally:
+        live_hub.unsubscribe(subscriber)
+
+
+async def _stream(db: Session, sensor_ids) -> StreamingResponse:
+    if not settings.LIVE_ENABLED:
+        raise HTTPException(503, "Tempo real desligado (LIVE_ENABLED)")
+    if live_hub.is_full():
+        raise HTTPException(503, "Limite de conexões em tempo real atingido")
+
+    # Devolve a conexão ao pool: o stream pode durar horas
+    await run_in_threadpool(db.close)
+
+    return StreamingResponse(
+        _events(sensor_ids),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+# -----------------------------------------
+# Leituras novas de um sensor
+# -----------------------------------------
+
+@router.get("/sensors/{sensor_id}")
+async def live_sensor(sensor_id: UUID,
+                      db: Session = Depends(get_db),
+                      user=Depends(get_current_user_stream)):
+
+    await run_in_threadpool(ensure_sensor_owner, db, user, sensor_id)
+
+    return await _stream(db, [sensor_id])
+
+
+# -----------------------------------------
+# Leituras novas de todos os sensores do usuário
+# -----------------------------------------
+
+@router.get("/sensors")
+async def live_user_sensors(db: Session = Depends(get_db),
+                            user=Depends(get_current_user_stream)):
+
+    # Sensores criados depois da conexão entram na próxima reconexão. Lista
+    # do banco, não do cache (sensor criado em outro worker)
+    sensor_ids = await run_in_threadpool(lambda: db.scalars(user_sensor_ids(user)).all())
+    return await _stream(db, sensor_ids)
@@ -1,17 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
+import base64
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from uuid import UUID
-from datetime import datetime, date, timedelta
-from sqlalchemy import func
+from datetime import date, datetime, timedelta
+from typing import Literal
+from zoneinfo import ZoneInfo
 
 from app.core.database import get_db
-from app.core.auth_utils import get_current_user
+from app.core.auth_utils import get_current_user, ensure_sensor_owner
+from app.core.downsample import lttb_series, series_buckets
+from app.core.fast_json import FastJSONResponse, dumps, rows_to_columns
+from app.core.streaming import stream_rows
+from app.core.timeutils import (
+    get_timezone, local_bucket, local_bucket_edges, local_days_range, local_today, to_utc
+)
+from app.core.ingest import reading_row, stored_reading, write_readings
+from app.core.response_cache import cached_response, invalidate_sensor_responses
+from app.core.rollups import (
+    avg_energy, avg_power, bucket_segments, hour_segments, rollup_union, total_energy
+)
 from app.models.sensor_reading import SensorReading
-from app.models.sensors import Sensor
+from app.models.sensor_reading_rollup import SensorReadingHourly
 from app.schemas.sensor_reading import SensorReadingCreate, SensorReadingResponse
 
 router = APIRouter(prefix="/sensor-readings", tags=["Sensor Readings"])
 
+DEFAULT_PAGE_SIZE = 1000
+
 
 # -----------------------------------------
 # Criar leitura
@@ -20,54 +37,198 @@ router = APIRouter(prefix="/sensor-readings", tags=["Sensor Readings"])
 @router.post("/{sensor_id}", response_model=SensorReadingResponse)
 def create_reading(sensor_id: UUID,
                    data: SensorReadingCreate,
+                   response: Response,
                    db: Session = Depends(get_db),
                    user=Depends(get_current_user)):
 
-    sensor = db.query(Sensor).filter(
-        Sensor.id == sensor_id,
-        Sensor.user_id == user.id
-    ).first()
-
-    if not sensor:
-        raise HTTPException(404, "Sensor não encontrado ou não pertence ao usuário")
+    ensure_sensor_owner(db, user, sensor_id)
 
-    reading = SensorReading(
-        sensor_id=sensor_id,
-        energy_kwh=data.energy_kwh,
-        current_a=data.current_a,
-        voltage_v=data.voltage_v,
-        power_w=data.power_w,
-    )
+    rows = [reading_row(sensor_id, data)]
 
-    db.add(reading)
+    inserted = write_readings(db, rows)
     db.commit()
-    db.refresh(reading)
 
-    return reading
+    if inserted:
+        invalidate_sensor_responses([sensor_id])
+        return rows[0]
+
+    # Já existia leitura neste (sensor_id, timestamp)
+    response.headers["X-Reading-Duplicate"] = "true"
+    return stored_reading(db, rows[0])
 
 
 # -----------------------------------------
 # Listar leituras
 # -----------------------------------------
 
-@router.get("/{sensor_id}", response_model=list[SensorReadingResponse])
+READING_FIELDS = {
+    "sensor_id": SensorReading.sensor_id,
+    "timestamp": SensorReading.timestamp,
+    "seq": SensorReading.seq,
+    "energy_kwh": SensorReading.energy_kwh,
+    "current_a": SensorReading.current_a,
+    "voltage_v": SensorReading.voltage_v,
+    "power_w": SensorReading.power_w,
+}
+
+
+def parse_fields(fields: str | None) -> list[str]:
+    if not fields:
+        return list(READING_FIELDS)
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in READING_FIELDS]
+
+    if unknown:
+        raise HTTPException(400, f"Campos desconhecidos: {', '.join(unknown)}")
+
+    return names
+
+
+def encode_cursor(timestamp: datetime) -> str:
+    raw = timestamp.isoformat().encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> datetime:
+    # Cursores "timestamp|sensor_id" de versões anteriores: o sensor_id é
+    # o da rota e fica de fora
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        return to_utc(datetime.fromisoformat(raw.partition("|")[0]))
+    except ValueError:
+        raise HTTPException(400, "Cursor inválido")
+
+
+def readings_query(sensor_id: UUID, names: list[str],
+                   since: datetime | None = None,
+                   until: datetime | None = None,
+                   cursor: str | None = None):
+    # sensor_id vem da rota e timestamp é único por sensor (PK): o
+    # timestamp sozinho é a chave de paginação, sempre na última coluna
+    stmt = (
+        select(*[READING_FIELDS[name] for name in names], SensorReading.timestamp)
+        .where(SensorReading.sensor_id == sensor_id)
+        .order_by(SensorReading.timestamp.desc())
+    )
+
+    if since:
+        stmt = stmt.where(SensorReading.timestamp >= to_utc(since))
+    if until:
+        stmt = stmt.where(SensorReading.timestamp < to_utc(until))
+    if cursor:
+        stmt = stmt.where(SensorReading.timestamp < decode_cursor(cursor))
+
+    return stmt
+
+
+def reading_page(rows, names: list[str], limit: int, layout: str = "rows"):
+    # Busca limit + 1 linhas para saber se existe próxima página.
+    # As tuplas do banco vão direto para o JSON (sem modelo Pydantic)
+    page = rows[:limit]
+    if layout == "columns":
+        content = rows_to_columns(page, names)
+    else:
+        content = [dict(zip(names, row)) for row in page]
+
+    next_cursor = encode_cursor(rows[limit - 1][-1]) if len(rows) > limit else None
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return FastJSONResponse(content, headers=headers)
+
+
+def ndjson_stream(stmt, names: list[str]):
+    for batch in stream_rows(stmt):
+        yield b"".join(dumps(dict(zip(names, row))) + b"\n" for row in batch)
+
+
+# Sem response_model: a rota devolve FastJSONResponse/StreamingResponse
+# pronta, que o FastAPI não valida nem filtra; `responses` só documenta o
+# formato padrão no OpenAPI
+LIST_READINGS_RESPONSES = {
+    200: {
+        "model": list[SensorReadingResponse],
+        "description": "Página de leituras; próxima página no header X-Next-Cursor",
+    }
+}
+
+
+@router.get("/{sensor_id}", responses=LIST_READINGS_RESPONSES)
 def list_readings(sensor_id: UUID,
+                  limit: int | None = Query(None, ge=1, le=10000),
+                  cursor: str | None = None,
+                  since: datetime | None = None,
+                  until: datetime | None = None,
+                  fields: str | None = Query(None, description="Ex.: timestamp,power_w"),
+                  stream: bool = False,
+                  layout: Literal["rows", "columns"] = "rows",
                   db: Session = Depends(get_db),
                   user=Depends(get_current_user)):
 
-    sensor = db.query(Sensor).filter(
-        Sensor.id == sensor_id,
-        Sensor.user_id == user.id
-    ).first()
+    # Página por cursor (keyset em timestamp), da leitura mais recente
+    # para a mais antiga. Próxima página: ?cursor=<X-Next-Cursor>.
+    # stream=true envia NDJSON de todo o intervalo sem paginar.
+    # layout=columns devolve {"timestamp": [...], "power_w": [...]}.
+    ensure_sensor_owner(db, user, sensor_id)
+
+    names = parse_fields(fields)
+    stmt = readings_query(sensor_id, names, since, until, cursor)
+
+    if stream:
+        if limit:
+            stmt = stmt.limit(limit)
+        return StreamingResponse(
+            ndjson_stream(stmt, names), media_type="application/x-ndjson"
+        )
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    rows = db.execute(stmt.limit(limit + 1)).all()
+
+    return reading_page(rows, names, limit, layout)
+
+
+# -----------------------------------------
+# Série reduzida para gráficos (qualquer zoom)
+# -----------------------------------------
+
+@router.get("/{sensor_id}/series")
+def reading_series(sensor_id: UUID,
+                   request: Request,
+                   start: datetime,
+                   end: datetime,
+                   metric: Literal["power_w", "voltage_v", "current_a", "energy_kwh"] = "power_w",
+                   max_points: int = Query(500, ge=3, le=5000),
+                   method: Literal["minmax", "lttb"] = "minmax",
+                   db: Session = Depends(get_db),
+                   user=Depends(get_current_user)):
+
+    # minmax: até max_points baldes com média, mínimo e máximo
+    # lttb: até max_points pontos (t, v) escolhidos pelo LTTB
+    ensure_sensor_owner(db, user, sensor_id)
+
+    start, end = to_utc(start), to_utc(end)
+    if end <= start:
+        raise HTTPException(400, "end deve ser posterior a start")
+
+    return cached_response(
+        request, user, sensor_id,
+        lambda: _series(db, sensor_id, metric, start, end, max_points, method)
+    )
 
-    if not sensor:
-        raise HTTPException(404, "Sensor não encontrado ou não pertence ao usuário")
 
-    readings = db.query(SensorReading).filter(
-        SensorReading.sensor_id == sensor_id
-    ).order_by(SensorReading.timestamp.desc()).all()
+def _series(db: Session, sensor_id: UUID, metric: str, start: datetime, end: datetime,
+            max_points: int, method: str):
+    if method == "lttb":
+        points, width = lttb_series(db, sensor_id, metric, start, end, max_points)
+    else:
+        points, width = series_buckets(db, sensor_id, metric, start, end, max_points)
 
-    return readings
+    return {
+        "metric": metric,
+        "method": method,
+        "bucket_seconds": width,
+        "points": points
+    }
 
 
 # -----------------------------------------
@@ -76,36 +237,43 @@ def list_readings(sensor_id: UUID,
 
 @router.get("/{sensor_id}/by-hour")
 def hourly_stats(sensor_id: UUID,
+                 request: Request,
                  date_filter: date,
+                 tz: ZoneInfo = Depends(get_timezone),
                  db: Session = Depends(get_db),
                  user=Depends(get_current_user)):
 
-    sensor = db.query(Sensor).filter(
-        Sensor.id == sensor_id,
-        Sensor.user_id == user.id
-    ).first()
+    ensure_sensor_owner(db, user, sensor_id)
+
+    return cached_response(
+        request, user, sensor_id,
+        lambda: _hourly_stats(db, sensor_id, date_filter, tz)
+    )
+
+
+def _sensor_rollup(segments, sensor_id: UUID):
+    return rollup_union(segments, lambda model: [model.sensor_id == sensor_id]).c
+
 
-    if not sensor:
-        raise HTTPException(404, "Sensor não encontrado ou não pertence ao usuário")
+def _hourly_stats(db: Session, sensor_id: UUID, date_filter: date, tz: ZoneInfo):
+    day = local_days_range(date_filter, date_filter, tz)
+    rollup = _sensor_rollup(hour_segments(day), sensor_id)
+    hour = local_bucket(rollup.bucket, "hour", tz)
 
     results = (
         db.query(
-            func.extract("hour", SensorReading.timestamp).label("hour"),
-            func.avg(SensorReading.power_w).label("avg_power"),
-            func.sum(SensorReading.energy_kwh).label("total_energy")
+            hour.label("hour"),
+            avg_power(rollup).label("avg_power"),
+            total_energy(rollup).label("total_energy")
         )
-        .filter(
-            SensorReading.sensor_id == sensor_id,
-            func.date(SensorReading.timestamp) == date_filter
-        )
-        .group_by(func.extract("hour", SensorReading.timestamp))
-        .order_by("hour")
+        .group_by(hour)
+        .order_by(hour)
         .all()
     )
 
     return [
         {
-            "hour": int(r.hour),
+            "hour": r.hour.hour,
             "average_power_w": r.avg_power,
             "total_energy_kwh": r.total_energy
         }
@@ -114,37 +282,63 @@ def hourly_stats(sensor_id: UUID,
 
 
 # -----------------------------------------
-# Estatísticas diárias (todos os dias)
+# Estatísticas diárias (todos os dias ou [start, end])
 # -----------------------------------------
 
 @router.get("/{sensor_id}/daily")
 def daily_stats(sensor_id: UUID,
+                request: Request,
+                start: date | None = None,
+                end: date | None = None,
+                tz: ZoneInfo = Depends(get_timezone),
                 db: Session = Depends(get_db),
                 user=Depends(get_current_user)):
 
-    sensor = db.query(Sensor).filter(
-        Sensor.id == sensor_id,
-        Sensor.user_id == user.id
-    ).first()
+    ensure_sensor_owner(db, user, sensor_id)
+
+    return cached_response(
+        request, user, sensor_id,
+        lambda: _daily_stats(db, sensor_id, start, end, tz)
+    )
+
+
+def _daily_stats(db: Session, sensor_id: UUID, start: date | None, end: date | None,
+                 tz: ZoneInfo):
+    if start is None or end is None:
+        # Sem limite: do primeiro ao último dia com dados (a última hora
+        # pode terminar já no dia local seguinte)
+        first, last = (
+            db.query(func.min(SensorReadingHourly.bucket), func.max(SensorReadingHourly.bucket))
+            .filter(SensorReadingHourly.sensor_id == sensor_id)
+            .one()
+        )
+        if first is None:
+            return []
+        start = start or first.astimezone(tz).date()
+        end = end or (last + timedelta(hours=1)).astimezone(tz).date()
+
+    if end < start:
+        return []
 
-    if not sensor:
-        raise HTTPException(404, "Sensor não encontrado ou não pertence ao usuário")
+    rollup = _sensor_rollup(
+        bucket_segments(local_bucket_edges(start, end, "day", tz)), sensor_id
+    )
+    day = local_bucket(rollup.bucket, "day", tz)
 
     results = (
         db.query(
-            func.date(SensorReading.timestamp).label("day"),
-            func.avg(SensorReading.power_w).label("avg_power"),
-            func.sum(SensorReading.energy_kwh).label("total_energy")
+            day.label("day"),
+            avg_power(rollup).label("avg_power"),
+            total_energy(rollup).label("total_energy")
         )
-        .filter(SensorReading.sensor_id == sensor_id)
-        .group_by(func.date(SensorReading.timestamp))
-        .order_by(func.date(SensorReading.timestamp))
+        .group_by(day)
+        .order_by(day)
         .all()
     )
 
     return [
         {
-            "date": str(r.day),
+            "date": str(r.day.date()),
             "average_power_w": r.avg_power,
             "total_energy_kwh": r.total_energy
         }
@@ -152,43 +346,27 @@ def daily_stats(sensor_id: UUID,
     ]
 
 
-# -----------------------------------------
-# Estatísticas semanais (últimos 7 dias)
-# -----------------------------------------
-
-@router.get("/{sensor_id}/weekly")
-def weekly_chart(sensor_id: UUID,
-                 db: Session = Depends(get_db),
-                 user=Depends(get_current_user)):
-
-    sensor = db.query(Sensor).filter(
-        Sensor.id == sensor_id,
-        Sensor.user_id == user.id
-    ).first()
-
-    if not sensor:
-        raise HTTPException(404, "Sensor não encontrado ou não pertence ao usuário")
-
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
+def _daily_chart(db: Session, sensor_id: UUID, days: int, tz: ZoneInfo):
+    # Últimos `days` dias locais, incluindo hoje
+    today = local_today(tz)
+    edges = local_bucket_edges(today - timedelta(days=days - 1), today, "day", tz)
+    rollup = _sensor_rollup(bucket_segments(edges), sensor_id)
+    day = local_bucket(rollup.bucket, "day", tz)
 
     readings = (
         db.query(
-            func.date(SensorReading.timestamp).label("day"),
-            func.avg(SensorReading.energy_kwh).label("energy_kwh"),
-            func.avg(SensorReading.power_w).label("power_w")
-        )
-        .filter(
-            SensorReading.sensor_id == sensor_id,
-            SensorReading.timestamp >= seven_days_ago
+            day.label("day"),
+            avg_energy(rollup).label("energy_kwh"),
+            avg_power(rollup).label("power_w")
         )
-        .group_by(func.date(SensorReading.timestamp))
-        .order_by(func.date(SensorReading.timestamp))
+        .group_by(day)
+        .order_by(day)
         .all()
     )
 
     return [
         {
-            "day": r.day,
+            "day": r.day.date(),
             "energy_kwh": r.energy_kwh,
             "power_w": r.power_w
         }
@@ -196,45 +374,39 @@ def weekly_chart(sensor_id: UUID,
     ]
 
 
+# -----------------------------------------
+# Estatísticas semanais (últimos 7 dias)
+# -----------------------------------------
+
+@router.get("/{sensor_id}/weekly")
+def weekly_chart(sensor_id: UUID,
+                 request: Request,
+                 tz: ZoneInfo = Depends(get_timezone),
+                 db: Session = Depends(get_db),
+                 user=Depends(get_current_user)):
+
+    ensure_sensor_owner(db, user, sensor_id)
+
+    return cached_response(
+        request, user, sensor_id,
+        lambda: _daily_chart(db, sensor_id, 7, tz)
+    )
+
+
 # -----------------------------------------
 # Estatísticas mensais (últimos 30 dias)
 # -----------------------------------------
 
 @router.get("/{sensor_id}/monthly")
 def monthly_chart(sensor_id: UUID,
+                  request: Request,
+                  tz: ZoneInfo = Depends(get_timezone),
                   db: Session = Depends(get_db),
                   user=Depends(get_current_user)):
 
-    sensor = db.query(Sensor).filter(
-        Sensor.id == sensor_id,
-        Sensor.user_id == user.id
-    ).first()
+    ensure_sensor_owner(db, user, sensor_id)
 
-    if not sensor:
-        raise HTTPException(404, "Sensor não encontrado ou não pertence ao usuário")
-
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-
-    readings = (
-        db.query(
-            func.date(SensorReading.timestamp).label("day"),
-            func.avg(SensorReading.energy_kwh).label("energy_kwh"),
-            func.avg(SensorReading.power_w).label("power_w")
-        )
-        .filter(
-            SensorReading.sensor_id == sensor_id,
-            SensorReading.timestamp >= thirty_days_ago
-        )
-        .group_by(func.date(SensorReading.timestamp))
-        .order_by(func.date(SensorReading.timestamp))
-        .all()
+    return cached_response(
+        request, user, sensor_id,
+        lambda: _daily_chart(db, sensor_id, 30, tz)
     )
-
-    return [
-        {
-            "day": r.day,
-            "energy_kwh": r.energy_kwh,
-            "power_w": r.power_w
-        }
-        for r in readings
-    ]
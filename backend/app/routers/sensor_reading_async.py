@@ -0,0 +1,50 @@
+from datetime import datetime
+from typing import Literal
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+
+from app.core.database import get_async_db
+from app.core.auth_utils import get_current_user_async, ensure_sensor_owner_async
+from app.routers.sensor_reading import (
+    DEFAULT_PAGE_SIZE, LIST_READINGS_RESPONSES, ndjson_stream, parse_fields, reading_page,
+    readings_query
+)
+
+# Versões assíncronas das rotas de leitura (ativas com DB_ASYNC_ENABLED)
+router = APIRouter(prefix="/sensor-readings", tags=["Sensor Readings"])
+
+
+# -----------------------------------------
+# Listar leituras
+# -----------------------------------------
+
+@router.get("/{sensor_id}", responses=LIST_READINGS_RESPONSES)
+async def list_readings(sensor_id: UUID,
+                        limit: int | None = Query(None, ge=1, le=10000),
+                        cursor: str | None = None,
+                        since: datetime | None = None,
+                        until: datetime | None = None,
+                        fields: str | None = Query(None, description="Ex.: timestamp,power_w"),
+                        stream: bool = False,
+                        layout: Literal["rows", "columns"] = "rows",
+                        db: AsyncSession = Depends(get_async_db),
+                        user=Depends(get_current_user_async)):
+
+    await ensure_sensor_owner_async(db, user, sensor_id)
+
+    names = parse_fields(fields)
+    stmt = readings_query(sensor_id, names, since, until, cursor)
+
+    if stream:
+        if limit:
+            stmt = stmt.limit(limit)
+        return StreamingResponse(
+            ndjson_stream(stmt, names), media_type="application/x-ndjson"
+        )
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+
+    return reading_page(rows, names, limit, layout)
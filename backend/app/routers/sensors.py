@@ -3,13 +3,15 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.models.sensors import Sensor
 from app.schemas.sensor import SensorCreate, SensorUpdate, SensorResponse
-from app.core.auth_utils import get_current_user
+from app.core.auth_utils import get_current_user, invalidate_current_user
+from app.core.device_auth import invalidate_device_token, invalidate_sensor_tokens
+from app.core.response_cache import invalidate_sensor_responses
 import secrets
+import uuid
 from uuid import UUID
 from app.schemas.sensor import SensorDeviceTokenResponse
 
 router = APIRouter(prefix="/sensors", tags=["Sensors"])
-device_token = secrets.token_hex(16)
 
 # CRIANDO SENSOR
 
@@ -18,17 +20,22 @@ def create_sensor(data: SensorCreate,
                   db: Session = Depends(get_db), 
                   user=Depends(get_current_user)):
 
+    # Token próprio por sensor (device_token é único)
     sensor = Sensor(
     name=data.name,
     location=data.location,
+    max_samples_per_s=data.max_samples_per_s,
+    sample_burst=data.sample_burst,
     user_id=user.id,
-    device_token=device_token
+    device_token=secrets.token_hex(16)
 )
 
     db.add(sensor)
     db.commit()
     db.refresh(sensor)
 
+    invalidate_current_user(user.id)
+
     return sensor
 
 
@@ -47,7 +54,7 @@ def list_sensors(db: Session = Depends(get_db),
 # DANDO GET NUM UNICO SENSOR
 
 @router.get("/{sensor_id}", response_model=SensorResponse)
-def get_sensor(sensor_id: int, 
+def get_sensor(sensor_id: UUID, 
                db: Session = Depends(get_db), 
                user=Depends(get_current_user)):
 
@@ -65,7 +72,7 @@ def get_sensor(sensor_id: int,
 # DANDO UPDATE NO SENSOR
 
 @router.put("/{sensor_id}", response_model=SensorResponse)
-def update_sensor(sensor_id: int, data: SensorUpdate,
+def update_sensor(sensor_id: UUID, data: SensorUpdate,
                   db: Session = Depends(get_db),
                   user=Depends(get_current_user)):
 
@@ -77,17 +84,22 @@ def update_sensor(sensor_id: int, data: SensorUpdate,
     if not sensor:
         raise HTTPException(404, "Sensor não encontrado")
 
-    sensor.name = data.name
-    sensor.location = data.location
+    # Só os campos enviados: omitir a política não a apaga (null explícito
+    # volta ao padrão do servidor)
+    for field, value in data.model_dump(exclude_unset=True).items():
+        setattr(sensor, field, value)
 
     db.commit()
+    invalidate_sensor_responses([sensor.id])
+    # A política de amostragem vai junto do token no cache
+    invalidate_sensor_tokens(sensor.id)
     db.refresh(sensor)
     return sensor
 
 # DELETANDO SENSOR
 
 @router.delete("/{sensor_id}")
-def delete_sensor(sensor_id: int, 
+def delete_sensor(sensor_id: UUID, 
                   db: Session = Depends(get_db),
                   user=Depends(get_current_user)):
 
@@ -99,8 +111,16 @@ def delete_sensor(sensor_id: int,
     if not sensor:
         raise HTTPException(404, "Sensor não encontrado")
 
+    removed_id = sensor.id
+    removed_token = sensor.device_token
+
     db.delete(sensor)
     db.commit()
+
+    invalidate_device_token(removed_token)
+    invalidate_sensor_tokens(removed_id)
+    invalidate_current_user(user.id)
+    invalidate_sensor_responses([removed_id])
     return {"message": "Sensor excluído com sucesso"}
 
 
@@ -117,11 +137,15 @@ def renew_device_token(sensor_id: UUID,
     if not sensor:
         raise HTTPException(404, "Sensor não encontrado")
 
+    old_token = sensor.device_token
     sensor.device_token = uuid.uuid4().hex
 
     db.commit()
     db.refresh(sensor)
 
+    invalidate_device_token(old_token)
+    invalidate_sensor_tokens(sensor.id)
+
     return {"device_token": sensor.device_token}
 
 @router.get("/{sensor_id}/device-token", response_model=SensorDeviceTokenResponse)
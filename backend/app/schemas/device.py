@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+from app.schemas.sensor_reading import SensorReadingCreate
+
+
+class DeviceReadingItem(SensorReadingCreate):
+    pass
+
+
+class DeviceBatchAck(BaseModel):
+    count: int
+    # Amostras já gravadas antes (reenvio); None quando a gravação é adiada
+    duplicates: int | None = None
+    first_timestamp: datetime | None = None
+    last_timestamp: datetime | None = None
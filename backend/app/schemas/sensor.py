@@ -1,9 +1,12 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from uuid import UUID
 
 class SensorBase(BaseModel):
     name: str
     location: str
+    # Limite de amostras na ingestão; None = padrão do servidor, 0 = sem limite
+    max_samples_per_s: float | None = Field(None, ge=0)
+    sample_burst: int | None = Field(None, ge=1)
 
 class SensorCreate(SensorBase):
     pass
@@ -1,7 +1,38 @@
-from pydantic import BaseModel
+from typing import Annotated
+from pydantic import AfterValidator, BaseModel, Field
 from uuid import UUID
 from datetime import datetime
 
+# Limites das colunas: medidas são REAL (float4), seq é BIGINT. Fora deles
+# o Postgres recusa a linha (500 na rota, dead-letter no buffer); aqui a
+# leitura vira 422. Abaixo do menor REAL normal o float4 estoura por baixo.
+# NaN/Infinity (aceitos pelo JSON e pelo MessagePack/CBOR) também ficam de
+# fora: uma amostra dessas corromperia para sempre as somas e o min/max dos
+# agregados, que só recebem incrementos.
+REAL_MAX = 3.4028234663852886e38
+REAL_MIN = 1.1754943508222875e-38
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+def fits_real(value) -> bool:
+    return value == 0 or REAL_MIN <= abs(value) <= REAL_MAX
+
+
+def _check_real(value: float) -> float:
+    if not fits_real(value):
+        raise ValueError(f"Valor fora do intervalo do tipo REAL (0 ou {REAL_MIN:g} a {REAL_MAX:g} em módulo)")
+    return value
+
+
+Measurement = Annotated[
+    float,
+    Field(allow_inf_nan=False, ge=-REAL_MAX, le=REAL_MAX),
+    AfterValidator(_check_real)
+]
+Seq = Annotated[int, Field(ge=INT64_MIN, le=INT64_MAX)]
+
+
 class SensorReadingBase(BaseModel):
     energy_kwh: float | None = None
     current_a: float | None = None
@@ -10,13 +41,21 @@ class SensorReadingBase(BaseModel):
 
 
 class SensorReadingCreate(SensorReadingBase):
-    pass
+    energy_kwh: Measurement | None = None
+    current_a: Measurement | None = None
+    voltage_v: Measurement | None = None
+    power_w: Measurement | None = None
+
+    # Momento da amostra no dispositivo; ausente = horário do servidor.
+    # (sensor_id, timestamp) é único: reenvios da mesma amostra são ignorados.
+    timestamp: datetime | None = None
+    seq: Seq | None = None
 
 
 class SensorReadingResponse(SensorReadingBase):
-    id: UUID
     sensor_id: UUID
     timestamp: datetime
+    seq: int | None = None
 
     class Config:
         from_attributes = True
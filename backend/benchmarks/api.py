@@ -0,0 +1,348 @@
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from datetime import timedelta
+from typing import Callable, NamedTuple
+
+import httpx
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.security import create_access_token
+from app.core.timeutils import utc_now
+from benchmarks.common import summarize
+from benchmarks.seed import seed_dataset
+
+# Carga HTTP nas rotas principais, uma de cada vez, com concorrência fixa.
+# Semeia usuários/sensores/leituras sintéticos (mesmo --seed = mesmas
+# leituras; só os timestamps acompanham o horário da execução) e grava um
+# JSON com vazão, p50/p95/p99 e consultas por requisição de cada rota,
+# para comparar execuções.
+#
+# Sem --base-url a app roda no próprio processo (httpx.ASGITransport).
+# Com --base-url a carga vai para um servidor já no ar (uvicorn, docker
+# compose) que use o mesmo banco (DATABASE_URL). Consultas por requisição
+# vêm de /metrics (METRICS_ENABLED e EXPOSE_INTERNAL_ENDPOINTS, com o
+# INTERNAL_ENDPOINTS_TOKEN do ambiente); com vários workers, é a amostra
+# do worker que respondeu ao /metrics.
+#
+# Uso: python -m benchmarks.api --users 10 --sensors 2 --months 3 \
+#          --concurrency 16 --requests 500 --output bench.json
+
+
+class Scenario(NamedTuple):
+    method: str
+    route: str                      # caminho da rota (rótulo de /metrics)
+    build: Callable                 # (fixture, rng) -> (url, kwargs do httpx)
+
+
+def _pick(fixture, rng):
+    user = rng.choice(fixture)
+    return user, rng.choice(user["sensors"])
+
+
+def _auth(user) -> dict:
+    return {"Authorization": f"Bearer {user['token']}"}
+
+
+def _day(rng, days: int):
+    return (utc_now() - timedelta(days=rng.randrange(max(1, days)))).date()
+
+
+def _device_send_reading(fixture, rng, days):
+    _, sensor = _pick(fixture, rng)
+    power = round(rng.uniform(100, 900), 2)
+    return "/device/send-reading", {
+        "headers": {"X-Device-Token": sensor["token"]},
+        "json": {"power_w": power, "voltage_v": 127.0, "current_a": round(power / 127, 3)},
+    }
+
+
+def _device_send_readings(fixture, rng, days):
+    _, sensor = _pick(fixture, rng)
+    start = utc_now() - timedelta(seconds=rng.randrange(86400))
+    return "/device/send-readings", {
+        "headers": {"X-Device-Token": sensor["token"]},
+        "json": [
+            {"timestamp": (start + timedelta(seconds=i)).isoformat(),
+             "power_w": round(rng.uniform(100, 900), 2)}
+            for i in range(60)
+        ],
+    }
+
+
+def _list_readings(fixture, rng, days):
+    user, sensor = _pick(fixture, rng)
+    return f"/sensor-readings/{sensor['id']}", {"headers": _auth(user), "params": {"limit": 100}}
+
+
+def _hourly_stats(fixture, rng, days):
+    user, sensor = _pick(fixture, rng)
+    return f"/sensor-readings/{sensor['id']}/by-hour", {
+        "headers": _auth(user), "params": {"date_filter": str(_day(rng, days))},
+    }
+
+
+def _daily_stats(fixture, rng, days):
+    user, sensor = _pick(fixture, rng)
+    end = _day(rng, days)
+    return f"/sensor-readings/{sensor['id']}/daily", {
+        "headers": _auth(user),
+        "params": {"start": str(end - timedelta(days=30)), "end": str(end)},
+    }
+
+
+def _series(fixture, rng, days):
+    user, sensor = _pick(fixture, rng)
+    end = utc_now() - timedelta(days=rng.randrange(max(1, days)))
+    return f"/sensor-readings/{sensor['id']}/series", {
+        "headers": _auth(user),
+        "params": {"start": (end - timedelta(days=7)).isoformat(), "end": end.isoformat()},
+    }
+
+
+def _weekly_chart(fixture, rng, days):
+    user, sensor = _pick(fixture, rng)
+    return f"/sensor-readings/{sensor['id']}/weekly", {"headers": _auth(user)}
+
+
+def _monthly_chart(fixture, rng, days):
+    user, sensor = _pick(fixture, rng)
+    return f"/sensor-readings/{sensor['id']}/monthly", {"headers": _auth(user)}
+
+
+def _sensor_dashboard(fixture, rng, days):
+    user, sensor = _pick(fixture, rng)
+    return f"/consumption/{sensor['id']}/dashboard", {"headers": _auth(user)}
+
+
+def _get_consumption(fixture, rng, days):
+    user, sensor = _pick(fixture, rng)
+    return "/consumption/", {"headers": _auth(user), "params": {"sensor_id": str(sensor["id"])}}
+
+
+def _consumption_report(fixture, rng, days):
+    user, _ = _pick(fixture, rng)
+    end = _day(rng, days)
+    return "/consumption/report", {
+        "headers": _auth(user),
+        "params": {"start": str(end - timedelta(days=30)), "end": str(end),
+                   "group_by": "sensor", "bucket": "day"},
+    }
+
+
+SCENARIOS = {
+    "device_send_reading": Scenario("POST", "/device/send-reading", _device_send_reading),
+    "device_send_readings": Scenario("POST", "/device/send-readings", _device_send_readings),
+    "list_readings": Scenario("GET", "/sensor-readings/{sensor_id}", _list_readings),
+    "hourly_stats": Scenario("GET", "/sensor-readings/{sensor_id}/by-hour", _hourly_stats),
+    "daily_stats": Scenario("GET", "/sensor-readings/{sensor_id}/daily", _daily_stats),
+    "reading_series": Scenario("GET", "/sensor-readings/{sensor_id}/series", _series),
+    "weekly_chart": Scenario("GET", "/sensor-readings/{sensor_id}/weekly", _weekly_chart),
+    "monthly_chart": Scenario("GET", "/sensor-readings/{sensor_id}/monthly", _monthly_chart),
+    "sensor_dashboard": Scenario("GET", "/consumption/{sensor_id}/dashboard", _sensor_dashboard),
+    "get_consumption": Scenario("GET", "/consumption/", _get_consumption),
+    "consumption_report": Scenario("GET", "/consumption/report", _consumption_report),
+}
+
+
+# -----------------------------------------
+# /metrics
+# -----------------------------------------
+
+_DB_SERIES = ("http_request_db_queries_sum", "http_request_db_queries_count",
+              "http_request_db_seconds_total")
+
+
+async def scrape_db_metrics(client: httpx.AsyncClient) -> dict | None:
+    # {(método, rota): {série: valor}} das séries de banco por rota
+    try:
+        token = settings.INTERNAL_ENDPOINTS_TOKEN
+        response = await client.get(
+            "/metrics", headers={"Authorization": f"Bearer {token}"} if token else None
+        )
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+
+    values = {}
+    for line in response.text.splitlines():
+        name, _, rest = line.partition("{")
+        if name not in _DB_SERIES:
+            continue
+        labels, _, value = rest.rpartition("} ")
+        parsed = dict(part.split("=", 1) for part in labels.split('",') if "=" in part)
+        key = (parsed["method"].strip('"'), parsed["route"].strip('"'))
+        values.setdefault(key, {})[name] = float(value)
+    return values
+
+
+def db_per_request(before: dict | None, after: dict | None, scenario: Scenario) -> dict:
+    if before is None or after is None:
+        return {"queries_per_request": None, "db_ms_per_request": None}
+
+    key = (scenario.method, scenario.route)
+    delta = {
+        name: after.get(key, {}).get(name, 0.0) - before.get(key, {}).get(name, 0.0)
+        for name in _DB_SERIES
+    }
+    count = delta["http_request_db_queries_count"]
+    if not count:
+        return {"queries_per_request": None, "db_ms_per_request": None}
+
+    return {
+        "queries_per_request": round(delta["http_request_db_queries_sum"] / count, 2),
+        "db_ms_per_request": round(delta["http_request_db_seconds_total"] * 1000 / count, 3),
+    }
+
+
+# -----------------------------------------
+# Carga
+# -----------------------------------------
+
+async def run_scenario(client, scenario: Scenario, fixture, days: int, requests: int,
+                       concurrency: int, warmup: int, seed: int) -> dict:
+    rng = random.Random(seed)
+
+    async def send():
+        url, kwargs = scenario.build(fixture, rng, days)
+        started = time.perf_counter()
+        response = await client.request(scenario.method, url, **kwargs)
+        return time.perf_counter() - started, response.status_code
+
+    for _ in range(warmup):
+        await send()
+
+    before = await scrape_db_metrics(client)
+    latencies, statuses = [], {}
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            elapsed, status = await send()
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - started
+
+    after = await scrape_db_metrics(client)
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+
+    return {
+        "route": f"{scenario.method} {scenario.route}",
+        **summarize(latencies),
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "errors": errors,
+        "status": {str(status): count for status, count in sorted(statuses.items())},
+        **db_per_request(before, after, scenario),
+    }
+
+
+async def run_all(args, fixture, days: int) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency,
+                          max_keepalive_connections=args.concurrency)
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60)
+        lifespan = None
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                   base_url="http://bench", timeout=60)
+        lifespan = app.router.lifespan_context(app)
+
+    results = {}
+    async with client:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        try:
+            for name in args.endpoints:
+                results[name] = await run_scenario(
+                    client, SCENARIOS[name], fixture, days, args.requests,
+                    args.concurrency, args.warmup, args.seed
+                )
+                print(f"{name}: p50 {results[name]['p50_ms']} ms, "
+                      f"{results[name]['throughput_rps']} req/s", flush=True)
+        finally:
+            if lifespan is not None:
+                await lifespan.__aexit__(None, None, None)
+    return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--sensors", type=int, default=2, help="sensores por usuário")
+    parser.add_argument("--months", type=float, default=3)
+    parser.add_argument("--interval", type=int, default=300, help="segundos entre amostras")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="requisições por rota")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--endpoints", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--base-url", help="servidor no ar; sem ele, a app roda no processo")
+    parser.add_argument("--output", default="bench-api.json")
+    args = parser.parse_args()
+
+    days = round(args.months * 30)
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        fixture = seed_dataset(conn, args.users, args.sensors, days, args.interval, args.seed)
+    seed_seconds = time.perf_counter() - started
+
+    for user in fixture:
+        user["token"] = create_access_token({"sub": str(user["user_id"])})
+
+    results = asyncio.run(run_all(args, fixture, days))
+
+    report = {
+        "revision": git_revision(),
+        "started_at": utc_now().isoformat(),
+        "target": args.base_url or "in-process",
+        "dataset": {
+            "users": args.users,
+            "sensors": args.users * args.sensors,
+            "days": days,
+            "interval_s": args.interval,
+            "readings": args.users * args.sensors * (days * 86400 // args.interval + 1),
+            "seed": args.seed,
+            "seed_seconds": round(seed_seconds, 1),
+        },
+        "load": {"concurrency": args.concurrency, "requests": args.requests, "warmup": args.warmup},
+        # Configuração lida deste processo (vale para o servidor só se
+        # ele usa o mesmo ambiente)
+        "settings": {
+            "DB_ASYNC_ENABLED": settings.DB_ASYNC_ENABLED,
+            "INGEST_BUFFER_ENABLED": settings.INGEST_BUFFER_ENABLED,
+            "RESPONSE_CACHE_ENABLED": settings.RESPONSE_CACHE_ENABLED,
+            "LIVE_ENABLED": settings.LIVE_ENABLED,
+            "DEVICE_RATE_LIMIT_SAMPLES_PER_S": settings.DEVICE_RATE_LIMIT_SAMPLES_PER_S,
+        },
+        "endpoints": results,
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultado em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
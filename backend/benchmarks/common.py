@@ -0,0 +1,53 @@
+import math
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(latencies_s: list[float], queries: int = None) -> dict:
+    ms = [v * 1000 for v in latencies_s]
+    result = {
+        "requests": len(ms),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+    }
+    if queries is not None and ms:
+        result["queries_per_request"] = round(queries / len(ms), 2)
+    return result
+
+
+class QueryCounter:
+    # Conta os comandos SQL enviados pela engine enquanto ativo
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    @contextmanager
+    def active(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        try:
+            yield self
+        finally:
+            event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def timed(fn, iterations: int) -> list[float]:
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies
@@ -0,0 +1,142 @@
+import argparse
+import json
+import uuid
+from datetime import date, timedelta
+from zoneinfo import ZoneInfo
+from sqlalchemy import func, select, text
+
+from app.core.auth_utils import CurrentUser
+from app.core.database import SessionLocal, engine
+from app.models.sensor_reading_rollup import SensorReadingDaily
+from app.models.sensors import Sensor
+from app.routers.consumption import consumption_report
+from benchmarks.common import QueryCounter, summarize, timed
+from benchmarks.seed import seed_user
+
+# /consumption/report para uma conta com milhares de sensores e um ano de
+# dados. Os agregados diários e mensais são gerados direto no banco (as
+# leituras cruas não são lidas pelo relatório). "daily_only" é a mesma
+# soma feita só sobre a tabela diária, sem a mensal.
+# Uso: python -m benchmarks.consumption_report --sensors 2000 --days 365
+
+_SENSORS = """
+INSERT INTO sensors (id, device_token, user_id, name, location, created_at)
+SELECT gen_random_uuid(), md5(random()::text), :user_id,
+       'bench-' || n, 'room-' || (n % :locations), now()
+FROM generate_series(1, :sensors) AS n
+"""
+
+_DAILY = """
+INSERT INTO sensor_readings_daily (
+    sensor_id, bucket, sample_count,
+    energy_kwh_sum, energy_kwh_count,
+    power_w_sum, power_w_count, power_w_min, power_w_max
+)
+SELECT s.id, day, 1440, 9.6 + random(), 1440, 576000 + random() * 1000, 1440, 0, 900
+FROM sensors s,
+     generate_series(CAST(:start AS timestamptz), CAST(:end AS timestamptz) - interval '1 day',
+                     interval '1 day') AS day
+WHERE s.user_id = :user_id
+"""
+
+_MONTHLY = """
+INSERT INTO sensor_readings_monthly (
+    sensor_id, bucket, sample_count,
+    energy_kwh_sum, energy_kwh_count,
+    power_w_sum, power_w_count, power_w_min, power_w_max
+)
+SELECT sensor_id, date_trunc('month', bucket, 'UTC'), sum(sample_count),
+       sum(energy_kwh_sum), sum(energy_kwh_count),
+       sum(power_w_sum), sum(power_w_count), min(power_w_min), max(power_w_max)
+FROM sensor_readings_daily
+WHERE sensor_id IN (SELECT id FROM sensors WHERE user_id = :user_id)
+GROUP BY 1, 2
+"""
+
+
+def daily_only(db, user, start, end):
+    daily = SensorReadingDaily
+    return db.execute(
+        select(
+            daily.sensor_id,
+            func.sum(daily.energy_kwh_sum),
+            func.sum(daily.power_w_sum) / func.sum(daily.power_w_count),
+        )
+        .where(
+            daily.sensor_id.in_(list(user.sensor_ids)),
+            daily.bucket >= start,
+            daily.bucket < end + timedelta(days=1)
+        )
+        .group_by(daily.sensor_id)
+    ).all()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sensors", type=int, default=2000)
+    parser.add_argument("--locations", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    # Ano fechado terminando no último mês completo
+    end = date.today().replace(day=1) - timedelta(days=1)
+    start = end - timedelta(days=args.days - 1)
+
+    with engine.begin() as conn:
+        user_id = seed_user(conn)
+        conn.execute(text(_SENSORS), {
+            "user_id": user_id, "sensors": args.sensors, "locations": args.locations
+        })
+        conn.execute(text(_DAILY), {
+            "user_id": user_id, "start": start, "end": end + timedelta(days=1)
+        })
+        conn.execute(text(_MONTHLY), {"user_id": user_id})
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in ("sensors", "sensor_readings_daily", "sensor_readings_monthly"):
+            conn.execute(text(f"VACUUM ANALYZE {table}"))
+
+    with SessionLocal() as db:
+        sensor_ids = frozenset(
+            db.scalars(select(Sensor.id).where(Sensor.user_id == user_id)).all()
+        )
+    user = CurrentUser(id=user_id, is_active=True, sensor_ids=sensor_ids)
+    utc = ZoneInfo("UTC")
+
+    def report(**kwargs):
+        return lambda: consumption_report(
+            start=start, end=end, sensor_id=None, tz=utc, db=db, user=user,
+            **{"group_by": None, "bucket": None, **kwargs}
+        )
+
+    results = {}
+    with SessionLocal() as db:
+        runs = {
+            "daily_only": lambda: daily_only(db, user, start, end),
+            "by_sensor": report(group_by=["sensor"]),
+            "by_location_month": report(group_by=["location"], bucket="month"),
+            "by_sensor_month": report(group_by=["sensor"], bucket="month"),
+            "total_week": report(bucket="week"),
+        }
+
+        for name, fn in runs.items():
+            fn()  # aquecimento (cache do Postgres e do pool)
+            counter = QueryCounter(engine)
+            with counter.active():
+                latencies = timed(fn, args.iterations)
+            results[name] = summarize(latencies, counter.count)
+
+    print(json.dumps({
+        "dataset": {
+            "sensors": args.sensors,
+            "locations": args.locations,
+            "days": args.days,
+            "daily_rows": args.sensors * args.days,
+        },
+        "consumption_report": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
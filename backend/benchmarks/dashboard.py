@@ -0,0 +1,85 @@
+import argparse
+import json
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from sqlalchemy import func
+
+from app.core.auth_utils import CurrentUser
+from app.core.database import SessionLocal, engine
+from app.models.sensor_reading import SensorReading
+from app.models.sensors import Sensor
+from app.routers.consumption import build_dashboard
+from benchmarks.common import QueryCounter, summarize, timed
+from benchmarks.seed import refresh_rollups, seed_sensor, seed_user
+
+# Compara o sensor_dashboard atual com a versão original de cinco consultas.
+# Uso: python -m benchmarks.dashboard --days 30 --interval 60 --iterations 200
+
+
+def legacy_dashboard(db, sensor_id, user_id):
+    # Versão original: posse, últimas 20, hoje, 7 e 30 dias (leituras cruas)
+    sensor = db.query(Sensor).filter(
+        Sensor.id == sensor_id, Sensor.user_id == user_id
+    ).first()
+
+    now = datetime.utcnow()
+    latest = (
+        db.query(SensorReading)
+        .filter(SensorReading.sensor_id == sensor_id)
+        .order_by(SensorReading.timestamp.desc())
+        .limit(20)
+        .all()
+    )
+
+    windows = [
+        func.date(SensorReading.timestamp) == now.date(),
+        SensorReading.timestamp >= now - timedelta(days=7),
+        SensorReading.timestamp >= now - timedelta(days=30),
+    ]
+    summary = [
+        db.query(func.sum(SensorReading.energy_kwh), func.avg(SensorReading.power_w))
+        .filter(SensorReading.sensor_id == sensor_id, window)
+        .first()
+        for window in windows
+    ]
+
+    return sensor, latest, summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--interval", type=int, default=60, help="segundos entre amostras")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        user_id = seed_user(conn)
+        sensor_id = seed_sensor(conn, user_id, args.days, args.interval)
+        refresh_rollups(conn, args.days)
+
+    user = CurrentUser(id=user_id, is_active=True, sensor_ids=frozenset({sensor_id}))
+    utc = ZoneInfo("UTC")
+    results = {}
+
+    with SessionLocal() as db:
+        runs = {
+            "before": lambda: legacy_dashboard(db, sensor_id, user_id),
+            "after": lambda: build_dashboard(db, user, sensor_id, utc),
+        }
+
+        for name, fn in runs.items():
+            fn()  # aquecimento (cache do Postgres e do pool)
+            counter = QueryCounter(engine)
+            with counter.active():
+                latencies = timed(fn, args.iterations)
+            results[name] = summarize(latencies, counter.count)
+
+    print(json.dumps({
+        "dataset": {"days": args.days, "interval_s": args.interval},
+        "sensor_dashboard": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
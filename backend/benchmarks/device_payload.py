@@ -0,0 +1,98 @@
+import argparse
+import gzip
+import json
+import random
+from datetime import timedelta
+
+from app.core.device_codec import decode_compact, decode_content
+from app.core.ingest import build_reading_rows
+from app.core.timeutils import utc_now
+from app.routers.device import _batch_adapter
+from benchmarks.common import summarize, timed
+
+# Bytes por leitura e custo de decodificação de /device/send-readings:
+# JSON verboso (formato atual) contra o compacto em MessagePack/CBOR, com e
+# sem gzip. Não usa banco: mede só o corpo até as linhas do INSERT.
+# Uso: python -m benchmarks.device_payload --readings 60 --iterations 2000
+
+
+def samples(count: int, interval_s: int):
+    start = utc_now().replace(microsecond=0)
+    for i in range(count):
+        power = round(400 + random.uniform(-100, 100), 2)
+        yield {
+            "timestamp": start + timedelta(seconds=i * interval_s),
+            "energy_kwh": round(power / 1000 * interval_s / 3600, 6),
+            "current_a": round(power / 127, 3),
+            "voltage_v": round(127 + random.uniform(-3, 3), 1),
+            "power_w": power,
+            "seq": i,
+        }
+
+
+def json_body(readings) -> bytes:
+    return json.dumps([
+        {**r, "timestamp": r["timestamp"].isoformat()} for r in readings
+    ]).encode()
+
+
+def compact_message(readings) -> dict:
+    t0 = int(readings[0]["timestamp"].timestamp() * 1000)
+    rows, previous = [], t0
+    for r in readings:
+        t = int(r["timestamp"].timestamp() * 1000)
+        rows.append([t - previous, r["energy_kwh"], r["current_a"],
+                     r["voltage_v"], r["power_w"], r["seq"]])
+        previous = t
+    return {"t": t0, "r": rows}
+
+
+def main():
+    import cbor2
+    import msgpack
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readings", type=int, default=60, help="leituras por requisição")
+    parser.add_argument("--interval", type=int, default=10, help="segundos entre amostras")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    readings = list(samples(args.readings, args.interval))
+    message = compact_message(readings)
+    sensor_id = "00000000-0000-0000-0000-000000000000"
+
+    bodies = {
+        "json": ("application/json", None, json_body(readings)),
+        "msgpack": ("application/msgpack", None, msgpack.packb(message)),
+        "cbor": ("application/cbor", None, cbor2.dumps(message)),
+        "json_gzip": ("application/json", "gzip", gzip.compress(json_body(readings))),
+        "msgpack_gzip": ("application/msgpack", "gzip", gzip.compress(msgpack.packb(message))),
+        "cbor_gzip": ("application/cbor", "gzip", gzip.compress(cbor2.dumps(message))),
+    }
+
+    def decode(content_type, encoding, body):
+        data = decode_content(body, encoding)
+        if content_type == "application/json":
+            items = _batch_adapter.validate_json(data)
+        else:
+            items = decode_compact(content_type, data)
+        return build_reading_rows(sensor_id, items)
+
+    results = {}
+    for name, (content_type, encoding, body) in bodies.items():
+        decode(content_type, encoding, body)  # aquecimento
+        summary = summarize(timed(lambda: decode(content_type, encoding, body), args.iterations))
+        results[name] = {
+            "body_bytes": len(body),
+            "bytes_per_reading": round(len(body) / args.readings, 1),
+            "decode_p50_us_per_reading": round(summary["p50_ms"] * 1000 / args.readings, 2),
+        }
+
+    print(json.dumps({
+        "dataset": {"readings": args.readings, "interval_s": args.interval},
+        "payloads": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
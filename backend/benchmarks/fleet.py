@@ -0,0 +1,442 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import time
+from datetime import timedelta
+
+import httpx
+
+from app.core.timeutils import utc_now
+from benchmarks.api import git_revision
+from benchmarks.common import summarize
+from benchmarks.seed import LOCATIONS
+
+# Frota virtual de ESPs contra /device/send-reading de um servidor no ar.
+# Cada dispositivo tem o próprio X-Device-Token e amostra num intervalo com
+# jitter; o intervalo sai de --devices / --rate, para a frota somar a taxa
+# alvo. Alguns caem (ficam offline e acumulam amostras) e, ao reconectar,
+# despejam o acumulado em rajada; uma fração usa tokens inválidos. 429
+# respeita Retry-After e a amostra volta para o acumulado.
+#
+# Os sensores são criados pela API (/auth/login, POST /sensors/, GET
+# /sensors/{id}/device-token) e guardados em --fleet-file para as
+# próximas execuções. O atraso de ingestão é medido por amostragem: para
+# algumas leituras aceitas, consulta /sensor-readings/{id} até ela
+# aparecer (com o buffer de ingestão ligado inclui a espera do flush).
+#
+# Todos os dispositivos dividem um pool de --connections conexões
+# keep-alive; um ESP real abre a própria conexão, então a carga de
+# conexões no servidor aqui é menor.
+#
+# Uso: python -m benchmarks.fleet --base-url http://localhost:8000 \
+#          --email fleet@bench.local --password bench123 --create-user \
+#          --devices 2000 --rate 400 --duration 120 --output bench-fleet.json
+
+
+class Device:
+    __slots__ = ("sensor_id", "token", "valid", "seq", "backlog", "offline_until")
+
+    def __init__(self, sensor_id, token: str, valid: bool):
+        self.sensor_id = sensor_id
+        self.token = token
+        self.valid = valid
+        self.seq = 0
+        self.backlog = []
+        self.offline_until = 0.0
+
+
+class FleetStats:
+    def __init__(self):
+        self.sent = 0
+        self.accepted = 0
+        self.rejected_invalid = 0       # 401 de dispositivos com token inválido (esperado)
+        self.throttled = 0              # 429 (amostra volta para o acumulado)
+        self.errors = 0                 # demais respostas não 2xx e falhas de conexão
+        self.status = {}
+        self.transport_errors = 0
+        self.latencies = []
+        self.bursts = 0
+        self.burst_readings = 0
+        self.dropped = 0                # descartadas com o acumulado cheio
+        self.lags = []
+        self.probes = 0
+        self.probes_missing = 0
+
+
+# -----------------------------------------
+# Provisionamento
+# -----------------------------------------
+
+async def login(client: httpx.AsyncClient, email: str, password: str, create: bool) -> str:
+    response = await client.post("/auth/login", json={"email": email, "password": password})
+    if response.status_code == 400 and create:
+        # Não há cadastro pela API: cria direto no banco (mesmo DATABASE_URL)
+        from app.core.database import engine
+        from benchmarks.seed import seed_user
+
+        with engine.begin() as conn:
+            seed_user(conn, email, password)
+        response = await client.post("/auth/login", json={"email": email, "password": password})
+
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def load_fleet(path: str, base_url: str, email: str) -> list[dict]:
+    if not path or not os.path.exists(path):
+        return []
+    with open(path) as f:
+        saved = json.load(f)
+    if saved.get("base_url") != base_url or saved.get("email") != email:
+        return []
+    return saved["sensors"]
+
+
+def save_fleet(path: str, base_url: str, email: str, sensors: list[dict]):
+    if path:
+        with open(path, "w") as f:
+            json.dump({"base_url": base_url, "email": email, "sensors": sensors}, f)
+
+
+async def provision(client, auth: dict, count: int, concurrency: int, rng) -> list[dict]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def create(index: int):
+        async with semaphore:
+            response = await client.post("/sensors/", headers=auth, json={
+                "name": f"fleet-{secrets.token_hex(4)}-{index:05d}",
+                "location": rng.choice(LOCATIONS),
+            })
+            response.raise_for_status()
+            sensor_id = response.json()["id"]
+
+            response = await client.get(f"/sensors/{sensor_id}/device-token", headers=auth)
+            response.raise_for_status()
+            return {"id": sensor_id, "token": response.json()["device_token"]}
+
+    return await asyncio.gather(*[create(i) for i in range(count)])
+
+
+async def cleanup(client, auth: dict, sensors: list[dict], concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def delete(sensor):
+        async with semaphore:
+            await client.delete(f"/sensors/{sensor['id']}", headers=auth)
+
+    await asyncio.gather(*[delete(s) for s in sensors])
+
+
+# -----------------------------------------
+# Frota
+# -----------------------------------------
+
+def sample(device: Device, rng) -> dict:
+    # Timestamp em milissegundos: a sonda consulta o intervalo exato
+    now = utc_now()
+    power = round(rng.uniform(100, 900), 2)
+    device.seq += 1
+    return {
+        "timestamp": now.replace(microsecond=now.microsecond // 1000 * 1000),
+        "power_w": power,
+        "voltage_v": round(127 + rng.uniform(-3, 3), 1),
+        "current_a": round(power / 127, 3),
+        "seq": device.seq,
+    }
+
+
+class Fleet:
+    def __init__(self, client, auth: dict, devices: list[Device], args, rng):
+        self.client = client
+        self.auth = auth
+        self.devices = devices
+        self.args = args
+        self.rng = rng
+        self.stats = FleetStats()
+        self.period = len(devices) / args.rate
+        self.deadline = 0.0
+        self.next_probe = 0.0
+        self.probe_tasks = set()
+
+    async def send(self, device: Device, reading: dict) -> int | None:
+        body = {**reading, "timestamp": reading["timestamp"].isoformat()}
+        stats = self.stats
+        stats.sent += 1
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(
+                "/device/send-reading", json=body,
+                headers={"X-Device-Token": device.token}
+            )
+        except httpx.HTTPError:
+            stats.transport_errors += 1
+            stats.errors += 1
+            return None
+
+        stats.latencies.append(time.perf_counter() - started)
+        status = response.status_code
+        stats.status[status] = stats.status.get(status, 0) + 1
+        if status < 300:
+            stats.accepted += 1
+        elif status == 401 and not device.valid:
+            stats.rejected_invalid += 1
+        elif status == 429:
+            stats.throttled += 1
+            device.backlog.insert(0, reading)
+            retry_after = float(response.headers.get("Retry-After", 1))
+            device.offline_until = time.perf_counter() + retry_after
+        else:
+            stats.errors += 1
+        return status
+
+    def keep(self, device: Device, reading: dict):
+        device.backlog.append(reading)
+        if len(device.backlog) > self.args.backlog_max:
+            # Memória do ESP cheia: descarta a mais antiga
+            device.backlog.pop(0)
+            self.stats.dropped += 1
+
+    async def flush_backlog(self, device: Device):
+        # Reconexão: o acumulado sai em rajada, uma requisição por leitura
+        self.stats.bursts += 1
+        while device.backlog and time.perf_counter() >= device.offline_until:
+            reading = device.backlog.pop(0)
+            self.stats.burst_readings += 1
+            await self.send(device, reading)
+
+    def maybe_probe(self, device: Device, reading: dict, created: float):
+        now = time.perf_counter()
+        if (not self.args.probe_rate or now < self.next_probe
+                or len(self.probe_tasks) >= self.args.probe_max):
+            return
+        self.next_probe = now + 1 / self.args.probe_rate
+        task = asyncio.create_task(self.probe(device, reading, created))
+        self.probe_tasks.add(task)
+        task.add_done_callback(self.probe_tasks.discard)
+
+    async def probe(self, device: Device, reading: dict, created: float):
+        # Consulta a janela [timestamp, timestamp + 1 ms) até a leitura
+        # aparecer. O intervalo entre consultas dobra (até 1 s) para as
+        # sondas não virarem a carga principal; o atraso medido fica até um
+        # intervalo acima do real
+        stats = self.stats
+        stats.probes += 1
+        params = {
+            "since": reading["timestamp"].isoformat(),
+            "until": (reading["timestamp"] + timedelta(milliseconds=1)).isoformat(),
+            "fields": "timestamp", "limit": 1,
+        }
+        interval = self.args.probe_interval
+        give_up = created + self.args.probe_timeout
+        while time.perf_counter() < give_up:
+            try:
+                response = await self.client.get(
+                    f"/sensor-readings/{device.sensor_id}", params=params, headers=self.auth
+                )
+                if response.status_code == 200 and response.json():
+                    stats.lags.append(time.perf_counter() - created)
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, 1.0)
+        stats.probes_missing += 1
+
+    async def run_device(self, device: Device):
+        args, rng = self.args, self.rng
+        loop = asyncio.get_running_loop()
+
+        # Fases espalhadas: os dispositivos não amostram todos juntos
+        next_at = loop.time() + rng.uniform(0, self.period)
+        while next_at < self.deadline:
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+            next_at += self.period * rng.uniform(1 - args.jitter, 1 + args.jitter)
+
+            created = time.perf_counter()
+            reading = sample(device, rng)
+
+            if created < device.offline_until:
+                self.keep(device, reading)
+                continue
+
+            if device.backlog:
+                self.keep(device, reading)
+                await self.flush_backlog(device)
+            else:
+                status = await self.send(device, reading)
+                if status is not None and status < 300 and device.valid:
+                    self.maybe_probe(device, reading, created)
+
+            if rng.random() < args.offline_prob:
+                device.offline_until = time.perf_counter() + rng.uniform(
+                    args.offline_min, args.offline_max
+                )
+
+    async def report_progress(self, started: float):
+        last_sent = last_accepted = 0
+        while True:
+            await asyncio.sleep(self.args.report_every)
+            stats = self.stats
+            elapsed = time.perf_counter() - started
+            sent, accepted = stats.sent - last_sent, stats.accepted - last_accepted
+            last_sent, last_accepted = stats.sent, stats.accepted
+            lag = summarize(stats.lags[-500:])
+            print(f"[{elapsed:6.1f}s] enviadas {sent / self.args.report_every:7.1f}/s  "
+                  f"aceitas {accepted / self.args.report_every:7.1f}/s  "
+                  f"erros {stats.errors}  atraso p50 {lag['p50_ms']} ms", flush=True)
+
+    async def run(self) -> float:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self.deadline = loop.time() + self.args.duration
+
+        progress = asyncio.create_task(self.report_progress(started))
+        try:
+            await asyncio.gather(*[self.run_device(d) for d in self.devices])
+            wall = time.perf_counter() - started
+            # Sondas pendentes terminam (ou estouram o prazo) antes do relatório
+            if self.probe_tasks:
+                await asyncio.gather(*self.probe_tasks)
+        finally:
+            progress.cancel()
+        return wall
+
+
+def build_devices(sensors: list[dict], invalid: float, rng) -> list[Device]:
+    devices = [Device(s["id"], s["token"], True) for s in sensors]
+    for _ in range(round(len(sensors) * invalid)):
+        # Dispositivo não cadastrado (ou com token revogado)
+        devices.append(Device(None, secrets.token_hex(16), False))
+    rng.shuffle(devices)
+    return devices
+
+
+def fleet_report(fleet: Fleet, wall: float) -> dict:
+    stats = fleet.stats
+    errors = stats.errors
+    lag = summarize(stats.lags)
+    lag.pop("requests")
+    lag["max_ms"] = round(max(stats.lags) * 1000, 3) if stats.lags else 0.0
+
+    return {
+        "duration_s": round(wall, 1),
+        "sent": stats.sent,
+        "sent_per_s": round(stats.sent / wall, 1) if wall else 0.0,
+        "accepted": stats.accepted,
+        "accepted_per_s": round(stats.accepted / wall, 1) if wall else 0.0,
+        "rejected_invalid_token": stats.rejected_invalid,
+        "throttled": stats.throttled,
+        "errors": errors,
+        "error_rate": round(errors / stats.sent, 5) if stats.sent else 0.0,
+        "transport_errors": stats.transport_errors,
+        "status": {str(status): count for status, count in sorted(stats.status.items())},
+        "bursts": {
+            "count": stats.bursts,
+            "readings": stats.burst_readings,
+            "dropped": stats.dropped,
+            "pending": sum(len(d.backlog) for d in fleet.devices),
+        },
+        "send_latency": summarize(stats.latencies),
+        "ingest_lag": {"probes": stats.probes, "missing": stats.probes_missing, **lag},
+    }
+
+
+async def run_fleet(args) -> dict:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.connections,
+                          max_keepalive_connections=args.connections)
+
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits,
+                                 timeout=args.timeout) as client:
+        auth = {"Authorization": f"Bearer {await login(client, args.email, args.password, args.create_user)}"}
+
+        sensors = load_fleet(args.fleet_file, args.base_url, args.email)
+        if len(sensors) < args.devices:
+            started = time.perf_counter()
+            sensors += await provision(client, auth, args.devices - len(sensors),
+                                       args.provision_concurrency, rng)
+            save_fleet(args.fleet_file, args.base_url, args.email, sensors)
+            print(f"{args.devices} sensores prontos em {time.perf_counter() - started:.1f}s",
+                  flush=True)
+        fleet = Fleet(client, auth, build_devices(sensors[:args.devices], args.invalid, rng),
+                      args, rng)
+        print(f"{len(fleet.devices)} dispositivos, um envio a cada {fleet.period:.2f}s "
+              f"(alvo {args.rate}/s)", flush=True)
+        wall = await fleet.run()
+        report = fleet_report(fleet, wall)
+
+        if args.cleanup:
+            # Todos os do arquivo, não só os usados nesta execução
+            await cleanup(client, auth, sensors, args.provision_concurrency)
+            save_fleet(args.fleet_file, args.base_url, args.email, [])
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", default="fleet@bench.local")
+    parser.add_argument("--password", default="bench123")
+    parser.add_argument("--create-user", action="store_true",
+                        help="cria o usuário no banco (DATABASE_URL) se o login falhar")
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=200, help="amostras/s da frota (alvo)")
+    parser.add_argument("--duration", type=float, default=60, help="segundos")
+    parser.add_argument("--jitter", type=float, default=0.2, help="fração do intervalo")
+    parser.add_argument("--invalid", type=float, default=0.01,
+                        help="dispositivos extras com token inválido (fração da frota)")
+    parser.add_argument("--offline-prob", type=float, default=0.002,
+                        help="chance de cair a cada amostra")
+    parser.add_argument("--offline-min", type=float, default=5)
+    parser.add_argument("--offline-max", type=float, default=30)
+    parser.add_argument("--backlog-max", type=int, default=100,
+                        help="amostras guardadas offline por dispositivo")
+    parser.add_argument("--probe-rate", type=float, default=5,
+                        help="sondas de atraso por segundo (0 desliga)")
+    parser.add_argument("--probe-interval", type=float, default=0.02,
+                        help="primeira espera entre consultas da sonda")
+    parser.add_argument("--probe-max", type=int, default=20, help="sondas simultâneas")
+    parser.add_argument("--probe-timeout", type=float, default=30)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--provision-concurrency", type=int, default=16)
+    parser.add_argument("--fleet-file", default="bench-fleet-sensors.json",
+                        help="sensores já criados, reaproveitados entre execuções")
+    parser.add_argument("--cleanup", action="store_true", help="exclui os sensores no fim")
+    parser.add_argument("--report-every", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench-fleet.json")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_fleet(args))
+
+    report = {
+        "revision": git_revision(),
+        "started_at": utc_now().isoformat(),
+        "target": args.base_url,
+        "fleet": {
+            "devices": args.devices,
+            "invalid": round(args.devices * args.invalid),
+            "rate": args.rate,
+            "jitter": args.jitter,
+            "offline_prob": args.offline_prob,
+            "offline_s": [args.offline_min, args.offline_max],
+            "backlog_max": args.backlog_max,
+            "connections": args.connections,
+            "seed": args.seed,
+        },
+        **results,
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({k: report[k] for k in ("accepted_per_s", "error_rate", "ingest_lag")}, indent=2))
+    print(f"Resultado em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
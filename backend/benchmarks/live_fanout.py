@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from app.core.live import LiveHub, notify_payloads, sse_frame
+from app.core.timeutils import utc_now
+from benchmarks.common import summarize
+
+# Fan-out do hub de tempo real num worker: N assinantes SSE (filas no
+# event loop) do mesmo sensor, M eventos publicados como o listener faz.
+# Mede o custo de cada publish e a latência até o último assinante
+# receber. Não abre conexões HTTP nem usa o banco.
+# Uso: python -m benchmarks.live_fanout --subscribers 5000 --events 200
+
+
+async def run(subscribers: int, events: int, interval: float) -> dict:
+    hub = LiveHub(queue_size=100, max_subscribers=subscribers)
+    hub.start(asyncio.get_running_loop())
+    sensor_id = uuid.uuid4()
+
+    received = [0] * events
+    done = [0.0] * events
+
+    async def consume(subscriber):
+        while True:
+            frame = await subscriber.queue.get()
+            if frame is None:
+                return
+            index = int(frame.split('"seq": ', 1)[1].split("}", 1)[0])
+            received[index] += 1
+            if received[index] == subscribers:
+                done[index] = time.perf_counter()
+
+    tasks = [
+        asyncio.create_task(consume(hub.subscribe([sensor_id])))
+        for _ in range(subscribers)
+    ]
+    await asyncio.sleep(0)
+
+    publish_s, sent = [], []
+    for i in range(events):
+        row = {"sensor_id": sensor_id, "timestamp": utc_now(), "power_w": 430.0, "seq": i}
+        _, frame = sse_frame(notify_payloads([row])[0])
+
+        started = time.perf_counter()
+        hub.publish(sensor_id, frame)
+        publish_s.append(time.perf_counter() - started)
+        sent.append(started)
+        await asyncio.sleep(interval)
+
+    await asyncio.sleep(0.5)
+    hub.close()
+    await asyncio.gather(*tasks)
+
+    delivered = [d - s for d, s in zip(done, sent) if d]
+    return {
+        "publish": summarize(publish_s),
+        "last_subscriber_latency": summarize(delivered),
+        "complete_events": len(delivered),
+        "dropped": hub.dropped,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.01, help="segundos entre eventos")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.subscribers, args.events, args.interval))
+
+    print(json.dumps({
+        "dataset": {"subscribers": args.subscribers, "events": args.events},
+        "live_fanout": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
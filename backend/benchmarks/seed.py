@@ -0,0 +1,115 @@
+import random
+import uuid
+from datetime import timedelta
+from sqlalchemy import text
+
+from app.core.rollups import backfill_rollups
+from app.core.security import hash_password
+from app.core.timeutils import utc_now
+
+# Leituras sintéticas geradas no próprio Postgres (generate_series). Os
+# valores dependem só do índice da amostra (onda diária contada a partir
+# da primeira) e do random(): com o mesmo setseed, as mesmas leituras,
+# qualquer que seja o horário da execução. Só os timestamps acompanham
+# o relógio, para as rotas de "últimos N dias" acharem dados.
+_READINGS = """
+INSERT INTO sensor_readings
+    (sensor_id, energy_kwh, current_a, voltage_v, power_w, "timestamp")
+SELECT
+    :sensor_id,
+    (p / 1000.0) * (:interval_s / 3600.0),
+    p / 127.0,
+    127 + random() * 6 - 3,
+    p,
+    :start + i * make_interval(secs => :interval_s)
+FROM (
+    SELECT
+        i,
+        greatest(0, 400 + 300 * sin(i * :interval_s / 86400.0 * 2 * pi())
+                  + random() * 200 - 100) AS p
+    FROM generate_series(0, :samples - 1) AS i
+    ORDER BY i
+) AS samples
+"""
+
+
+def seed_user(conn, email: str = None, password: str = "bench123") -> uuid.UUID:
+    user_id = uuid.uuid4()
+    conn.execute(
+        text(
+            "INSERT INTO users (id, name, email, hashed_password, is_active) "
+            "VALUES (:id, :name, :email, :hashed, true)"
+        ),
+        {
+            "id": user_id,
+            "name": "bench",
+            "email": email or f"bench-{user_id.hex[:8]}@bench.local",
+            "hashed": hash_password(password),
+        }
+    )
+    return user_id
+
+
+def seed_sensor(conn, user_id: uuid.UUID, days: float, interval_s: int = 60,
+                location: str = "bench", token: str = None) -> uuid.UUID:
+    sensor_id = uuid.uuid4()
+    conn.execute(
+        text(
+            "INSERT INTO sensors (id, device_token, user_id, name, location, created_at) "
+            "VALUES (:id, :token, :user_id, :name, :location, now())"
+        ),
+        {
+            "id": sensor_id,
+            "token": token or uuid.uuid4().hex,
+            "user_id": user_id,
+            "name": f"bench-{sensor_id.hex[:8]}",
+            "location": location,
+        }
+    )
+
+    # Fim alinhado ao intervalo: a grade de timestamps é a mesma a cada execução
+    now = utc_now()
+    end = now - timedelta(seconds=now.timestamp() % interval_s)
+    samples = int(days * 86400 // interval_s) + 1
+    conn.execute(
+        text(_READINGS),
+        {
+            "sensor_id": sensor_id,
+            "start": end - timedelta(seconds=(samples - 1) * interval_s),
+            "samples": samples,
+            "interval_s": interval_s,
+        }
+    )
+    return sensor_id
+
+
+def refresh_rollups(conn, days: float):
+    end = utc_now() + timedelta(days=1)
+    backfill_rollups(conn, end - timedelta(days=days + 2), end)
+
+
+LOCATIONS = ("sala", "cozinha", "quarto", "escritorio", "lavanderia")
+
+
+def seed_dataset(conn, users: int, sensors_per_user: int, days: float,
+                 interval_s: int = 300, seed: int = 42) -> list[dict]:
+    # Mesmo seed = mesmas leituras (setseed fixa o random() do Postgres
+    # nesta conexão); ids e tokens mudam a cada execução. setseed aceita
+    # [-1, 1]: o seed vira um float desse intervalo via random.Random, sem
+    # colisões entre seeds (ex.: 42 e 1042)
+    pg_seed = random.Random(seed).uniform(-1, 1)
+    conn.execute(text("SELECT setseed(:seed)"), {"seed": pg_seed})
+
+    fixture = []
+    for i in range(users):
+        user_id = seed_user(conn, email=f"bench-{seed}-{i}-{uuid.uuid4().hex[:6]}@bench.local")
+        sensors = []
+        for j in range(sensors_per_user):
+            token = uuid.uuid4().hex
+            sensor_id = seed_sensor(conn, user_id, days, interval_s,
+                                    location=LOCATIONS[j % len(LOCATIONS)], token=token)
+            sensors.append({"id": sensor_id, "token": token})
+        fixture.append({"user_id": user_id, "sensors": sensors})
+
+    refresh_rollups(conn, days)
+    return fixture
@@ -0,0 +1,95 @@
+import argparse
+import json
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.database import SessionLocal, engine
+from app.models.sensor_reading import SensorReading
+from app.routers.sensor_reading import parse_fields, reading_page, readings_query
+from app.schemas.sensor_reading import SensorReadingResponse
+from benchmarks.common import summarize, timed
+from benchmarks.seed import seed_sensor, seed_user
+
+# Custo de montar a resposta de list_readings: objeto ORM + modelo Pydantic
+# + jsonable_encoder (antes) contra tuplas direto para o JSON (depois), em
+# linhas e em colunas. A leitura do banco é medida à parte.
+# Uso: python -m benchmarks.serialization --rows 10000 --iterations 50
+
+
+def legacy_body(readings):
+    # Versão original: um SensorReadingResponse por linha ORM
+    items = [SensorReadingResponse.model_validate(r) for r in readings]
+    return JSONResponse(jsonable_encoder(items)).body
+
+
+def dict_body(rows, names):
+    # Tuplas já em dict, mas ainda pelo jsonable_encoder
+    return JSONResponse(jsonable_encoder([dict(zip(names, row)) for row in rows])).body
+
+
+def rows_per_second(rows: int, summary: dict) -> int:
+    return round(rows / (summary["p50_ms"] / 1000)) if summary["p50_ms"] else 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    # Uma leitura por minuto: dias suficientes para --rows linhas
+    with engine.begin() as conn:
+        user_id = seed_user(conn)
+        sensor_id = seed_sensor(conn, user_id, args.rows / 1440 + 1, 60)
+
+    names = parse_fields(None)
+    stmt = readings_query(sensor_id, names).limit(args.rows + 1)
+
+    with SessionLocal() as db:
+        def orm_fetch():
+            db.expunge_all()
+            return (
+                db.query(SensorReading)
+                .filter(SensorReading.sensor_id == sensor_id)
+                .order_by(SensorReading.timestamp.desc())
+                .limit(args.rows)
+                .all()
+            )
+
+        def tuple_fetch():
+            return db.execute(stmt).all()
+
+        readings = orm_fetch()
+        rows = tuple_fetch()
+
+        fetch = {
+            "orm": summarize(timed(orm_fetch, args.iterations)),
+            "tuples": summarize(timed(tuple_fetch, args.iterations)),
+        }
+
+        runs = {
+            "before_orm_pydantic": lambda: legacy_body(readings),
+            "before_dicts_jsonable": lambda: dict_body(rows[:args.rows], names),
+            "after_rows": lambda: reading_page(rows, names, args.rows).body,
+            "after_columns": lambda: reading_page(rows, names, args.rows, "columns").body,
+        }
+
+        serialization = {}
+        for name, fn in runs.items():
+            body = fn()  # aquecimento
+            summary = summarize(timed(fn, args.iterations))
+            serialization[name] = {
+                **summary,
+                "rows_per_s": rows_per_second(len(readings), summary),
+                "body_bytes": len(body),
+            }
+
+    print(json.dumps({
+        "dataset": {"rows": len(readings)},
+        "fetch": fetch,
+        "serialization": serialization,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
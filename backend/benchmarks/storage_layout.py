@@ -0,0 +1,138 @@
+import argparse
+import json
+import time
+import uuid
+from datetime import timedelta
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Float, Index, MetaData, REAL, Table, text
+)
+from sqlalchemy.dialects.postgresql import UUID, insert as pg_insert
+
+from app.core.database import engine
+from app.core.timeutils import utc_now
+
+# Compara o layout antigo de sensor_readings (UUID por linha, float8,
+# timestamp + índice de cobertura) com o atual ((sensor_id, timestamp), real,
+# timestamptz): tamanho de tabela + índices por milhão de linhas e vazão de
+# INSERT pelo mesmo caminho da ingestão (multi-linhas com ON CONFLICT).
+# Usa tabelas sem partição num schema temporário, removido no fim.
+# Uso: python -m benchmarks.storage_layout --rows 1000000 --sensors 200
+
+SCHEMA = "bench_layout"
+metadata = MetaData(schema=SCHEMA)
+
+legacy = Table(
+    "legacy", metadata,
+    Column("id", UUID(as_uuid=True), primary_key=True),
+    Column("sensor_id", UUID(as_uuid=True), nullable=False),
+    Column("energy_kwh", Float),
+    Column("current_a", Float),
+    Column("voltage_v", Float),
+    Column("power_w", Float),
+    Column("timestamp", DateTime, primary_key=True),
+    Column("seq", BigInteger),
+)
+Index(
+    "ix_legacy_sensor_id_timestamp",
+    legacy.c.sensor_id, legacy.c.timestamp.desc(),
+    unique=True,
+    postgresql_include=["energy_kwh", "power_w", "voltage_v", "current_a"],
+)
+
+compact = Table(
+    "compact", metadata,
+    Column("sensor_id", UUID(as_uuid=True), primary_key=True),
+    Column("timestamp", DateTime(timezone=True), primary_key=True),
+    Column("energy_kwh", REAL),
+    Column("current_a", REAL),
+    Column("voltage_v", REAL),
+    Column("power_w", REAL),
+    Column("seq", BigInteger),
+)
+
+
+def batches(rows: int, sensors: int, batch_size: int, legacy_rows: bool):
+    # Todos os sensores reportando ao mesmo tempo, como a frota real:
+    # cada instante tem uma amostra por sensor
+    sensor_ids = [uuid.UUID(int=i + 1) for i in range(sensors)]
+    start = utc_now() - timedelta(seconds=rows // sensors + 1)
+    batch = []
+
+    for i in range(rows):
+        ts = start + timedelta(seconds=i // sensors)
+        row = {
+            "sensor_id": sensor_ids[i % sensors],
+            "timestamp": ts.replace(tzinfo=None) if legacy_rows else ts,
+            "energy_kwh": 0.0125,
+            "current_a": 3.4,
+            "voltage_v": 127.1,
+            "power_w": 430.0 + i % 50,
+            "seq": i // sensors,
+        }
+        if legacy_rows:
+            row["id"] = uuid.uuid4()
+        batch.append(row)
+
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def measure(table, rows: int, sensors: int, batch_size: int) -> dict:
+    stmt = pg_insert(table).on_conflict_do_nothing(index_elements=["sensor_id", "timestamp"])
+    elapsed = 0.0
+
+    for batch in batches(rows, sensors, batch_size, table is legacy):
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(stmt, batch)
+        elapsed += time.perf_counter() - started
+
+    name = f"{SCHEMA}.{table.name}"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"VACUUM ANALYZE {name}"))
+        table_bytes, index_bytes = conn.execute(
+            text("SELECT pg_table_size(:t), pg_indexes_size(:t)"), {"t": name}
+        ).one()
+
+    per_million = 1_000_000 / rows
+    return {
+        "insert_rows_per_s": round(rows / elapsed),
+        "table_mb_per_million": round(table_bytes * per_million / 2**20, 1),
+        "index_mb_per_million": round(index_bytes * per_million / 2**20, 1),
+        "total_mb_per_million": round((table_bytes + index_bytes) * per_million / 2**20, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sensors", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=1000, help="linhas por INSERT/commit")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        metadata.create_all(conn)
+
+    try:
+        results = {
+            "before": measure(legacy, args.rows, args.sensors, args.batch),
+            "after": measure(compact, args.rows, args.sensors, args.batch),
+        }
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+    print(json.dumps({
+        "dataset": {"rows": args.rows, "sensors": args.sensors, "batch": args.batch},
+        "sensor_readings_layout": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
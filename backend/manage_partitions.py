@@ -0,0 +1,28 @@
+import sys
+
+from app.core.database import engine
+from app.core.partitions import ensure_future_partitions, drop_expired_partitions
+
+# Uso (ex.: via cron):
+#   python manage_partitions.py ensure [meses_a_frente]
+#   python manage_partitions.py prune [meses_de_retencao]
+
+def main(argv):
+    if len(argv) < 2 or argv[1] not in ("ensure", "prune"):
+        print("Uso: python manage_partitions.py ensure|prune [meses]")
+        return 1
+
+    months = int(argv[2]) if len(argv) > 2 else None
+
+    with engine.begin() as conn:
+        if argv[1] == "ensure":
+            names = ensure_future_partitions(conn, months)
+            print("✅ Partições garantidas:", ", ".join(names))
+        else:
+            names = drop_expired_partitions(conn, months)
+            print("🗑️ Partições removidas:", ", ".join(names) or "nenhuma")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
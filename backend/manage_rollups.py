@@ -0,0 +1,63 @@
+import sys
+from datetime import datetime
+
+from app.core.database import engine
+from app.core.rollups import backfill_rollups, check_rollups
+
+# Uso:
+#   python manage_rollups.py backfill 2025-01-01 2025-07-01
+#   python manage_rollups.py check 2025-06-01 2025-07-01
+# Intervalos em UTC, [início, fim), estendidos para dias inteiros.
+#
+# Não rode backfill junto com a ingestão ao vivo: cada mês é refeito com a
+# tabela de leituras travada (SHARE) e os envios dos dispositivos ficam
+# parados (ou estouram o timeout) até o commit. Use uma janela de
+# manutenção. Baldes sem leituras no intervalo (partições removidas,
+# retenção) são apagados dos agregados.
+
+def main(argv):
+    if len(argv) != 4 or argv[1] not in ("backfill", "check"):
+        print("Uso: python manage_rollups.py backfill|check INICIO FIM")
+        return 1
+
+    start = datetime.fromisoformat(argv[2])
+    end = datetime.fromisoformat(argv[3])
+
+    if argv[1] == "backfill":
+        # Um mês por transação: o lock da ingestão dura um mês de recálculo
+        current = start
+        while current < end:
+            month_end = min(end, _next_month(current))
+            with engine.begin() as conn:
+                backfill_rollups(conn, current, month_end)
+            print(f"✅ Agregados recalculados: {current:%Y-%m-%d} → {month_end:%Y-%m-%d}")
+            current = month_end
+        return 0
+
+    with engine.connect() as conn:
+        diffs = check_rollups(conn, start, end)
+
+    for row in diffs["hourly"]:
+        print("❌ horário", row)
+    for row in diffs["daily"]:
+        print("❌ diário", row)
+    for row in diffs["monthly"]:
+        print("❌ mensal", row)
+
+    if diffs["hourly"] or diffs["daily"] or diffs["monthly"]:
+        print(
+            f"{len(diffs['hourly'])} hora(s), {len(diffs['daily'])} dia(s) e "
+            f"{len(diffs['monthly'])} mês(es) divergentes"
+        )
+        return 2
+
+    print("✅ Agregados consistentes com as leituras")
+    return 0
+
+def _next_month(value: datetime) -> datetime:
+    if value.month == 12:
+        return datetime(value.year + 1, 1, 1)
+    return datetime(value.year, value.month + 1, 1)
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
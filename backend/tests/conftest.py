@@ -0,0 +1,8 @@
+import os
+
+# Carregado antes dos módulos de teste. Sem um Postgres no ambiente, o
+# DATABASE_URL fica vazio: o load_dotenv de app.core.config não o troca
+# pelo do .env (banco do docker compose), e os testes que precisam de
+# banco pulam qualquer que seja a ordem de coleta.
+if not os.getenv("DATABASE_URL", "").startswith("postgresql"):
+    os.environ["DATABASE_URL"] = ""
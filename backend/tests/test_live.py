@@ -0,0 +1,41 @@
+import asyncio
+import os
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+# Antes dos imports do app (app.core.config carrega o .env)
+if not os.getenv("DATABASE_URL", "").startswith("postgresql"):
+    pytest.skip("Requer DATABASE_URL de um Postgres", allow_module_level=True)
+
+from app.core.config import settings
+from app.core.live import live_hub
+from app.routers.live import _stream
+
+
+@pytest.fixture(autouse=True)
+def live_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "LIVE_ENABLED", True)
+
+
+def _db():
+    return SimpleNamespace(close=lambda: None)
+
+
+def test_abandoned_stream_does_not_leak_subscriber():
+    async def run():
+        # Cliente desconecta antes do corpo: a resposta nunca é iterada
+        response = await _stream(_db(), [uuid4()])
+        assert live_hub.stats()["subscribers"] == 0
+        await response.body_iterator.aclose()
+        assert live_hub.stats()["subscribers"] == 0
+
+        # Cliente recebe o primeiro frame e some no meio do stream
+        response = await _stream(_db(), [uuid4()])
+        assert await response.body_iterator.__anext__() == "retry: 3000\n\n"
+        assert live_hub.stats()["subscribers"] == 1
+        await response.body_iterator.aclose()
+        assert live_hub.stats()["subscribers"] == 0
+
+    asyncio.run(run())
@@ -0,0 +1,158 @@
+import os
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+from zoneinfo import ZoneInfo
+
+import pytest
+
+# Regressão de plano: as consultas de gráfico, série, listagem e consumo
+# precisam chegar às leituras e aos agregados pelo índice (sensor_id,
+# timestamp) / (sensor_id, bucket), com sensor_id na condição do índice.
+# Um filtro que embrulhe a coluna numa função (ex.: func.date(timestamp))
+# derruba o índice e o teste falha. Precisa de um Postgres migrado:
+# DATABASE_URL=postgresql://... python -m pytest tests/test_query_plans.py
+
+# Pula antes dos imports do app: sem DATABASE_URL nem a engine é criada
+if not os.getenv("DATABASE_URL", "").startswith("postgresql"):
+    pytest.skip("Requer DATABASE_URL de um Postgres", allow_module_level=True)
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.auth_utils import CurrentUser
+from app.core.database import engine
+from app.core.downsample import series_buckets
+from app.routers.consumption import build_dashboard, consumption_report, get_consumption
+from app.routers.sensor_reading import (
+    _daily_chart, _daily_stats, _hourly_stats, encode_cursor, readings_query
+)
+
+UTC = ZoneInfo("UTC")
+SAO_PAULO = ZoneInfo("America/Sao_Paulo")
+
+# Índices cujas duas primeiras colunas são sensor_id e timestamp/bucket
+# (PK de cada partição de sensor_readings e das tabelas de agregados)
+SENSOR_TIME_INDEXES = """
+    SELECT i.relname
+    FROM pg_index x
+    JOIN pg_class i ON i.oid = x.indexrelid
+    JOIN pg_attribute a1 ON a1.attrelid = x.indrelid AND a1.attnum = x.indkey[0]
+    JOIN pg_attribute a2 ON a2.attrelid = x.indrelid AND a2.attnum = x.indkey[1]
+    WHERE a1.attname = 'sensor_id' AND a2.attname IN ('timestamp', 'bucket')
+"""
+
+# Tabelas que não entram na verificação (posse do sensor, usuário)
+OTHER_TABLES = {"sensors", "users"}
+
+
+@pytest.fixture
+def conn():
+    # Tabelas de teste são pequenas: sem isso o planejador prefere Seq Scan
+    # mesmo com o índice utilizável. SET LOCAL some no rollback.
+    with engine.connect() as conn:
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        conn.exec_driver_sql("SET LOCAL enable_bitmapscan = off")
+        yield conn
+        conn.rollback()
+
+
+@pytest.fixture
+def sensor_time_indexes(conn):
+    return set(conn.exec_driver_sql(SENSOR_TIME_INDEXES).scalars())
+
+
+def _capture(conn, run):
+    # Executa a consulta de verdade (tabelas vazias bastam) e guarda o SQL
+    # com os parâmetros, para o EXPLAIN ver exatamente o que a rota manda
+    statements = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(conn, "before_cursor_execute", before)
+    try:
+        with Session(bind=conn) as db:
+            run(db)
+    finally:
+        event.remove(conn, "before_cursor_execute", before)
+
+    return statements
+
+
+def _nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def _explain(conn, statement, parameters):
+    result = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)
+    return result.scalar()[0]["Plan"]
+
+
+def _assert_index_scans(conn, statements, indexes):
+    scans = []
+    for statement, parameters in statements:
+        for node in _nodes(_explain(conn, statement, parameters)):
+            if "Relation Name" in node and node["Relation Name"] not in OTHER_TABLES:
+                scans.append(node)
+
+    assert scans, "Nenhuma leitura de sensor_readings ou dos agregados no plano"
+
+    for node in scans:
+        where = f"{node['Relation Name']}: {node['Node Type']}"
+        assert node["Node Type"] in ("Index Scan", "Index Only Scan"), where
+        assert node["Index Name"] in indexes, f"{where} via {node['Index Name']}"
+        assert "sensor_id" in node.get("Index Cond", ""), f"{where} sem sensor_id no índice"
+
+
+def _dashboard(db, user, sensor_id):
+    # Sem dados o sensor não existe: 404 depois da consulta, que é o que importa
+    try:
+        build_dashboard(db, user, sensor_id, SAO_PAULO)
+    except HTTPException as exc:
+        assert exc.status_code == 404
+
+
+NOW = datetime.now(timezone.utc)
+
+CASES = {
+    "by-hour": lambda db, user, sid: _hourly_stats(db, sid, date.today(), SAO_PAULO),
+    "daily": lambda db, user, sid: _daily_stats(
+        db, sid, date.today() - timedelta(days=30), date.today(), UTC
+    ),
+    "weekly": lambda db, user, sid: _daily_chart(db, sid, 7, SAO_PAULO),
+    "monthly": lambda db, user, sid: _daily_chart(db, sid, 30, UTC),
+    "series-raw": lambda db, user, sid: series_buckets(
+        db, sid, "voltage_v", NOW - timedelta(days=1), NOW, 1440
+    ),
+    "series-hourly": lambda db, user, sid: series_buckets(
+        db, sid, "power_w", NOW - timedelta(days=30), NOW, 720
+    ),
+    "list": lambda db, user, sid: db.execute(
+        readings_query(sid, ["power_w"], since=NOW - timedelta(days=1)).limit(101)
+    ).all(),
+    "list-cursor": lambda db, user, sid: db.execute(
+        readings_query(sid, ["power_w"], cursor=encode_cursor(NOW)).limit(101)
+    ).all(),
+    "consumption": lambda db, user, sid: get_consumption(
+        sensor_id=None, hours=24, db=db, user=user
+    ),
+    "consumption-report": lambda db, user, sid: consumption_report(
+        start=date(2026, 1, 15), end=date(2026, 4, 10), sensor_id=None,
+        group_by=None, bucket="day", tz=SAO_PAULO, db=db, user=user
+    ),
+    "dashboard": lambda db, user, sid: _dashboard(db, user, sid),
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_uses_sensor_time_index(conn, sensor_time_indexes, name):
+    sensor_id = uuid4()
+    user = CurrentUser(id=uuid4(), is_active=True, sensor_ids=frozenset({sensor_id}))
+
+    statements = _capture(conn, lambda db: CASES[name](db, user, sensor_id))
+
+    _assert_index_scans(conn, statements, sensor_time_indexes)
@@ -0,0 +1,82 @@
+import math
+import os
+from uuid import uuid4
+
+import msgpack
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+# Antes dos imports do app (app.core.config carrega o .env)
+HAS_DATABASE = os.getenv("DATABASE_URL", "").startswith("postgresql")
+
+from app.core.device_codec import decode_compact
+from app.schemas.sensor_reading import REAL_MAX, SensorReadingCreate
+
+# Leituras fora do que as colunas guardam (REAL, BIGINT) ou não finitas
+# param na borda com 422, antes de chegar ao banco ou aos agregados.
+
+BAD_VALUES = [math.nan, math.inf, -math.inf, 1e300, -1e300, 1e-40]
+
+
+@pytest.mark.parametrize("value", BAD_VALUES)
+def test_schema_rejects_non_finite_and_out_of_range(value):
+    with pytest.raises(ValidationError):
+        SensorReadingCreate(power_w=value)
+
+
+@pytest.mark.parametrize("body", [b'{"power_w": NaN}', b'{"energy_kwh": Infinity}'])
+def test_schema_rejects_nan_json(body):
+    with pytest.raises(ValidationError):
+        SensorReadingCreate.model_validate_json(body)
+
+
+@pytest.mark.parametrize("seq", [2 ** 63, -2 ** 63 - 1])
+def test_schema_rejects_seq_outside_int64(seq):
+    with pytest.raises(ValidationError):
+        SensorReadingCreate(seq=seq)
+
+
+def test_schema_accepts_limits():
+    reading = SensorReadingCreate(power_w=REAL_MAX, energy_kwh=0, voltage_v=-1.5, seq=2 ** 63 - 1)
+    assert reading.power_w == REAL_MAX
+
+
+def _compact(row):
+    return msgpack.packb({"t": 1_760_000_000_000, "r": [row]})
+
+
+@pytest.mark.parametrize("value", BAD_VALUES)
+def test_compact_rejects_non_finite_and_out_of_range(value):
+    with pytest.raises(HTTPException) as exc:
+        decode_compact("application/msgpack", _compact([0, None, None, None, value]))
+    assert exc.value.status_code == 422
+
+
+@pytest.mark.parametrize("seq", [2 ** 63, 2 ** 64 - 1])
+def test_compact_rejects_seq_outside_int64(seq):
+    with pytest.raises(HTTPException) as exc:
+        decode_compact("application/msgpack", _compact([0, None, None, None, 1.0, seq]))
+    assert exc.value.status_code == 422
+
+
+@pytest.mark.skipif(not HAS_DATABASE, reason="Requer DATABASE_URL de um Postgres")
+@pytest.mark.parametrize("body", [b'{"power_w": NaN}', b'[{"power_w": 1}, {"power_w": NaN}]'])
+def test_device_post_nan_is_422(body):
+    # A validação do corpo vem antes de qualquer acesso ao banco
+    from fastapi.testclient import TestClient
+    from app.core.database import get_db
+    from app.core.device_auth import DeviceIdentity, get_current_device
+    from app.main import app
+
+    app.dependency_overrides[get_current_device] = lambda: DeviceIdentity(uuid4(), None, None)
+    app.dependency_overrides[get_db] = lambda: None
+    try:
+        path = "/device/send-readings" if body.startswith(b"[") else "/device/send-reading"
+        response = TestClient(app).post(
+            path, content=body, headers={"Content-Type": "application/json"}
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 422
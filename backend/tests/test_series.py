@@ -0,0 +1,81 @@
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+
+# Série reduzida: baldes alinhados à época Unix. Com o início fora do
+# alinhamento, a resposta não pode passar de max_points baldes.
+
+if not os.getenv("DATABASE_URL", "").startswith("postgresql"):
+    pytest.skip("Requer DATABASE_URL de um Postgres", allow_module_level=True)
+
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+from app.core.downsample import _bucket_count, bucket_seconds
+from app.core.ingest import write_readings
+from app.core.timeutils import utc_now
+from app.models.sensors import Sensor
+from app.models.user import User
+from app.routers.sensor_reading import _series
+
+
+def test_bucket_seconds_fits_unaligned_ranges():
+    rng = random.Random(15)
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    for _ in range(2000):
+        start = base + timedelta(seconds=rng.uniform(0, 10 ** 7))
+        end = start + timedelta(seconds=rng.uniform(1, 10 ** 7))
+        buckets = rng.randint(3, 5000)
+
+        for step in (1, 3600):
+            width = bucket_seconds(start, end, buckets, step)
+            assert width % step == 0
+            assert _bucket_count(start, end, width) <= buckets
+
+
+def test_bucket_seconds_unaligned_start():
+    # 10 baldes de 60 s em 600 s começando no segundo 30: a largura ingênua
+    # (60 s) tocaria 11 baldes alinhados
+    start = datetime(2026, 1, 1, 0, 0, 30, tzinfo=timezone.utc)
+    end = start + timedelta(seconds=600)
+
+    width = bucket_seconds(start, end, 10)
+    assert width > 60
+    assert _bucket_count(start, end, width) <= 10
+
+
+@pytest.fixture
+def db():
+    with engine.connect() as conn:
+        conn.begin()
+        with Session(bind=conn) as session:
+            yield session
+        conn.rollback()
+
+
+@pytest.mark.parametrize("metric", ["power_w", "voltage_v"])
+def test_series_respects_max_points_with_unaligned_start(db, metric):
+    user = User(name="series", email=f"{uuid4()}@series", hashed_password="x")
+    db.add(user)
+    db.flush()
+    sensor = Sensor(name="s", location="l", user_id=user.id, device_token=str(uuid4()))
+    db.add(sensor)
+    db.flush()
+
+    # Uma leitura por minuto nas últimas 12 h; início a 30 s do alinhamento
+    end = utc_now().replace(second=30, microsecond=0)
+    start = end - timedelta(hours=12)
+    write_readings(db, [
+        {"sensor_id": sensor.id, "timestamp": start + timedelta(minutes=i),
+         "energy_kwh": 1.0, "power_w": float(i), "current_a": None,
+         "voltage_v": 220.0 + i % 7, "seq": None}
+        for i in range(12 * 60)
+    ])
+
+    for max_points in (3, 7, 10, 48, 500):
+        series = _series(db, sensor.id, metric, start, end, max_points, "minmax")
+        assert len(series["points"]) <= max_points
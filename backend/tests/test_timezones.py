@@ -0,0 +1,127 @@
+import os
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+from zoneinfo import ZoneInfo
+
+import pytest
+
+# Fusos com deslocamento fora da hora cheia (+05:30, +09:30/+10:30): a
+# meia-noite local cai no meio de uma linha da tabela horária. As pontas
+# precisam vir das leituras cruas, senão a leitura das 23:45 locais entra
+# no dia seguinte. Precisa de um Postgres migrado (como test_query_plans).
+
+if not os.getenv("DATABASE_URL", "").startswith("postgresql"):
+    pytest.skip("Requer DATABASE_URL de um Postgres", allow_module_level=True)
+
+from sqlalchemy.orm import Session
+
+from app.core.auth_utils import CurrentUser
+from app.core.database import engine
+from app.core.ingest import write_readings
+from app.core.rollups import bucket_segments, hour_segments, rollup_segments
+from app.core.timeutils import local_bucket_edges, local_days_range, local_today
+from app.models.sensor_reading import SensorReading
+from app.models.sensor_reading_rollup import SensorReadingDaily, SensorReadingHourly
+from app.models.sensors import Sensor
+from app.models.user import User
+from app.routers.consumption import consumption_report
+from app.routers.sensor_reading import _daily_chart, _daily_stats, _hourly_stats
+
+KOLKATA = ZoneInfo("Asia/Kolkata")
+ADELAIDE = ZoneInfo("Australia/Adelaide")
+UTC = ZoneInfo("UTC")
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_segments_read_partial_hours_from_raw_readings():
+    day = datetime(2026, 3, 10).date()
+    segments = bucket_segments(local_bucket_edges(day, day, "day", KOLKATA))
+
+    # 00:00 local = 18:30 UTC do dia anterior
+    assert segments == [
+        (SensorReading, _utc(2026, 3, 9, 18, 30), _utc(2026, 3, 9, 19)),
+        (SensorReadingHourly, _utc(2026, 3, 9, 19), _utc(2026, 3, 10, 18)),
+        (SensorReading, _utc(2026, 3, 10, 18), _utc(2026, 3, 10, 18, 30)),
+    ]
+
+
+def test_segments_cover_range_without_gaps():
+    for tz in (KOLKATA, ADELAIDE, UTC):
+        first = datetime(2026, 1, 20).date()
+        edges = local_bucket_edges(first, first + timedelta(days=70), "month", tz)
+        segments = bucket_segments(edges)
+
+        assert segments[0][1] == edges[0] and segments[-1][2] == edges[-1]
+        for previous, current in zip(segments, segments[1:]):
+            assert previous[2] == current[1]
+        for model, start, end in segments:
+            if model is not SensorReading:
+                assert start.minute == end.minute == 0
+
+
+def test_whole_hour_ranges_use_rollups_only():
+    assert rollup_segments(_utc(2026, 3, 1), _utc(2026, 3, 3, 5)) == [
+        (SensorReadingDaily, _utc(2026, 3, 1), _utc(2026, 3, 3)),
+        (SensorReadingHourly, _utc(2026, 3, 3), _utc(2026, 3, 3, 5)),
+    ]
+    day = datetime(2026, 3, 10).date()
+    assert hour_segments(list(local_days_range(day, day, KOLKATA))) == [
+        (SensorReading, *local_days_range(day, day, KOLKATA))
+    ]
+
+
+@pytest.fixture
+def db():
+    with engine.connect() as conn:
+        conn.begin()
+        with Session(bind=conn) as session:
+            yield session
+        conn.rollback()
+
+
+def test_half_hour_timezone_charts_and_report(db):
+    user = User(name="tz", email=f"{uuid4()}@tz", hashed_password="x")
+    db.add(user)
+    db.flush()
+    sensor = Sensor(name="s", location="l", user_id=user.id, device_token=str(uuid4()))
+    db.add(sensor)
+    db.flush()
+
+    # Ontem em Kolkata: uma leitura às 23:45 de anteontem e outra às 00:15
+    # (18:15 e 18:45 UTC, a mesma linha da tabela horária)
+    day = local_today(KOLKATA) - timedelta(days=1)
+    midnight = local_days_range(day, day, KOLKATA)[0]
+    write_readings(db, [
+        {"sensor_id": sensor.id, "timestamp": midnight - timedelta(minutes=15),
+         "energy_kwh": 1.0, "power_w": 100.0, "current_a": None, "voltage_v": None,
+         "seq": None},
+        {"sensor_id": sensor.id, "timestamp": midnight + timedelta(minutes=15),
+         "energy_kwh": 2.0, "power_w": 300.0, "current_a": None, "voltage_v": None,
+         "seq": None},
+    ])
+
+    current = CurrentUser(id=user.id, is_active=True, sensor_ids=frozenset({sensor.id}))
+    report = consumption_report(
+        start=day, end=day, sensor_id=None, group_by=None, bucket="day",
+        tz=KOLKATA, db=db, user=current
+    )
+    assert b'"samples":1' in report.body
+    assert b'"total_energy_kwh":2.0' in report.body
+
+    stats = _daily_stats(db, sensor.id, None, None, KOLKATA)
+    assert [(s["date"], s["total_energy_kwh"]) for s in stats] == [
+        (str(day - timedelta(days=1)), 1.0),
+        (str(day), 2.0),
+    ]
+
+    chart = _daily_chart(db, sensor.id, 7, KOLKATA)
+    assert [(c["day"], c["power_w"]) for c in chart] == [
+        (day - timedelta(days=1), 100.0),
+        (day, 300.0),
+    ]
+
+    hours = _hourly_stats(db, sensor.id, day, KOLKATA)
+    assert [(h["hour"], h["total_energy_kwh"]) for h in hours] == [(0, 2.0)]